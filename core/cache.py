@@ -0,0 +1,33 @@
+import os
+
+NAMESPACES = ['compiled', 'disasm']
+
+# Lookups per namespace, for the metrics
+hits   = dict.fromkeys(NAMESPACES, 0)
+misses = dict.fromkeys(NAMESPACES, 0)
+
+def cache_dir(namespace):
+    """
+    Directory holding the on-disk cache for namespace (CHIP8_CACHE_DIR, defaults to ~/.cache/chip8).
+    """
+
+    root = os.environ.get('CHIP8_CACHE_DIR') or os.path.join(os.path.expanduser('~'), '.cache', 'chip8')
+    path = os.path.join(root, namespace)
+
+    os.makedirs(path, exist_ok=True)
+
+    return path
+
+def write_atomic(path, data):
+    tmp = f"{path}.{os.getpid()}.tmp"
+
+    with open(tmp, 'wb') as f:
+        f.write(data)
+
+    os.replace(tmp, path)
+
+def record(namespace, hit):
+    if hit:
+        hits[namespace] = hits.get(namespace, 0) + 1
+    else:
+        misses[namespace] = misses.get(namespace, 0) + 1
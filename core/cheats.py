@@ -0,0 +1,300 @@
+from core.chip8 import Chip8
+from core import quirks
+
+import argparse
+import cmd
+
+import numpy
+
+class CheatFinder:
+    """
+    Memory snapshots of a machine as the rows of a uint8 matrix, and the candidate addresses left by the queries.
+
+    Every query narrows the candidates with one vectorized comparison over the (snapshots x candidates) sub-matrix.
+    Snapshot arguments are row indices (negative ones counting from the last snapshot) or sequences of them,
+    pairwise queries comparing before[k] with after[k].
+    """
+
+    def __init__(self, machine, start=0, end=None, capacity=256):
+        self.machine = machine
+        self.start   = start
+        self.end     = end if end is not None else len(machine.memory)
+
+        self._matrix = numpy.zeros((capacity, self.end - self.start), dtype=numpy.uint8)
+        self._count  = 0
+
+        # Frame number of every snapshot
+        self.frames = []
+
+        self.candidates = numpy.arange(self.start, self.end)
+        self._history = []
+
+    # Snapshots
+
+    def snapshot(self):
+        """
+        Add the current memory as a new row, returns its index.
+        """
+
+        if self._count == len(self._matrix):
+            grown = numpy.zeros((2 * len(self._matrix), self._matrix.shape[1]), dtype=numpy.uint8)
+            grown[:self._count] = self._matrix[:self._count]
+            self._matrix = grown
+
+        self._matrix[self._count] = numpy.frombuffer(
+            bytes(self.machine.memory._buffer[self.start:self.end]), dtype=numpy.uint8
+        )
+        self.frames.append(self.machine.frames)
+        self._count += 1
+
+        return self._count - 1
+
+    def run(self, frames, keys=None, every=1):
+        """
+        Emulate frames frames holding keys (when given), taking a snapshot every every frames.
+        """
+
+        if keys is not None:
+            self.machine.keypad.set_state(keys)
+
+        for frame in range(1, frames + 1):
+            self.machine.frame()
+
+            if frame % every == 0:
+                self.snapshot()
+
+    @property
+    def snapshots(self):
+        return self._matrix[:self._count]
+
+    def __len__(self):
+        return self._count
+
+    # Queries
+
+    def changed(self, snapshots=(-2, -1)):
+        """
+        Keep the addresses whose value is not the same in all these snapshots.
+        """
+
+        low, high = self._bounds(snapshots)
+
+        return self._keep(low != high)
+
+    def unchanged(self, snapshots=(-2, -1)):
+        low, high = self._bounds(snapshots)
+
+        return self._keep(low == high)
+
+    def equal(self, value, snapshots=(-1,)):
+        """
+        Keep the addresses holding value in all these snapshots.
+        """
+
+        low, high = self._bounds(snapshots)
+
+        return self._keep((low == value) & (high == value))
+
+    def increased(self, before=-2, after=-1):
+        before, after = self._pairs(before, after)
+
+        return self._keep((after > before).all(axis=0))
+
+    def decreased(self, before=-2, after=-1):
+        before, after = self._pairs(before, after)
+
+        return self._keep((after < before).all(axis=0))
+
+    def changed_by(self, delta, before=-2, after=-1):
+        """
+        Keep the addresses whose value changed by delta (modulo 256) between every pair, e.g. -1 for lives.
+        """
+
+        before, after = self._pairs(before, after)
+
+        return self._keep(((after.astype(numpy.int16) - before) % 256 == delta % 256).all(axis=0))
+
+    def undo(self):
+        """
+        Candidates before the last query, returns whether there was one to undo.
+        """
+
+        if not self._history:
+            return False
+
+        self.candidates = self._history.pop()
+
+        return True
+
+    def reset(self):
+        self._history.clear()
+        self.candidates = numpy.arange(self.start, self.end)
+
+    def values(self, address):
+        """
+        Value of address in every snapshot.
+        """
+
+        return self._matrix[:self._count, address - self.start]
+
+    def report(self, limit=20, last=8):
+        """
+        Candidates with their values in the last snapshots.
+        """
+
+        lines = [f"{len(self.candidates)} candidates"]
+
+        for address in self.candidates[:limit]:
+            values = " ".join(f"{value:02X}" for value in self.values(address)[-last:])
+            lines.append(f"0x{address:04X}: {values}")
+
+        if len(self.candidates) > limit:
+            lines.append("...")
+
+        return "\n".join(lines)
+
+    def _bounds(self, snapshots):
+        # Min and max reductions over the snapshots, no boolean matrix as large as the sub-matrix
+        values = self._values(snapshots)
+
+        return values.min(axis=0), values.max(axis=0)
+
+    def _values(self, snapshots):
+        if self._count == 0:
+            raise ValueError("No snapshot taken")
+
+        matrix = self._matrix[:self._count]
+
+        # Ranges select a view of the rows, anything else a copy
+        if isinstance(snapshots, range) and snapshots.step > 0 and snapshots.start >= 0:
+            values = matrix[snapshots.start:snapshots.stop:snapshots.step]
+        else:
+            values = matrix[[snapshots] if isinstance(snapshots, int) else list(snapshots)]
+
+        # Gathering columns costs more than comparing them: only gather the candidates once they are few, the
+        # queries mask every address otherwise (_keep() picks the candidates' results)
+        if len(self.candidates) < matrix.shape[1] // 8:
+            values = values[:, self.candidates - self.start]
+
+        return values
+
+    def _pairs(self, before, after):
+        before = [before] if isinstance(before, int) else list(before)
+        after = [after] if isinstance(after, int) else list(after)
+
+        if len(before) != len(after):
+            raise ValueError(f"{len(before)} snapshots before, {len(after)} after")
+
+        return self._values(before), self._values(after)
+
+    def _keep(self, mask):
+        if len(mask) == self.end - self.start:
+            mask = mask[self.candidates - self.start]
+
+        self._history.append(self.candidates)
+        self.candidates = self.candidates[mask]
+
+        return len(self.candidates)
+
+class CheatShell(cmd.Cmd):
+    intro  = "CHIP-8 cheat finder, type help or ? to list commands"
+    prompt = "(cheats) "
+
+    def __init__(self, finder, **kwargs):
+        super().__init__(**kwargs)
+
+        self.finder = finder
+
+    def do_run(self, arg):
+        """run FRAMES [KEYS]: emulate FRAMES frames holding the key state KEYS, then take a snapshot"""
+        args = arg.split()
+        frames = int(args[0], 0) if args else 1
+        keys = int(args[1], 0) if len(args) > 1 else 0
+
+        self.finder.run(frames, keys, every=frames)
+        print(f"snapshot {len(self.finder) - 1} at frame {self.finder.machine.frames}")
+
+    def do_snap(self, arg):
+        """snap: take a snapshot"""
+        print(f"snapshot {self.finder.snapshot()}")
+
+    def do_changed(self, arg):
+        """changed [SNAPSHOTS...]: keep addresses that changed (default: last two snapshots)"""
+        self._query(self.finder.changed, *self._snapshots(arg, (-2, -1)))
+
+    def do_unchanged(self, arg):
+        """unchanged [SNAPSHOTS...]: keep addresses that did not change (default: last two snapshots)"""
+        self._query(self.finder.unchanged, *self._snapshots(arg, (-2, -1)))
+
+    def do_inc(self, arg):
+        """inc: keep addresses that increased between the last two snapshots"""
+        self._query(self.finder.increased)
+
+    def do_dec(self, arg):
+        """dec: keep addresses that decreased between the last two snapshots"""
+        self._query(self.finder.decreased)
+
+    def do_by(self, arg):
+        """by DELTA: keep addresses that changed by DELTA between the last two snapshots"""
+        self._query(self.finder.changed_by, int(arg, 0))
+
+    def do_eq(self, arg):
+        """eq VALUE: keep addresses holding VALUE in the last snapshot"""
+        self._query(self.finder.equal, int(arg, 0))
+
+    def do_list(self, arg):
+        """list [N]: print the first N candidates and their last values"""
+        print(self.finder.report(int(arg, 0) if arg else 20))
+
+    def do_undo(self, arg):
+        """undo: cancel the last query"""
+        if not self.finder.undo():
+            print("nothing to undo")
+
+        print(f"{len(self.finder.candidates)} candidates")
+
+    def do_reset(self, arg):
+        """reset: every address is a candidate again"""
+        self.finder.reset()
+        print(f"{len(self.finder.candidates)} candidates")
+
+    def do_poke(self, arg):
+        """poke ADDRESS VALUE: write memory, to check a candidate"""
+        address, value = (int(value, 0) for value in arg.split())
+        self.finder.machine.memory[address] = value
+
+    def do_quit(self, arg):
+        """quit: exit the cheat finder"""
+        return True
+
+    do_q = do_quit
+
+    def _snapshots(self, arg, default):
+        return ([int(value, 0) for value in arg.split()],) if arg else (default,)
+
+    def _query(self, query, *args):
+        try:
+            print(f"{query(*args)} candidates")
+        except (ValueError, IndexError) as e:
+            print(e)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.cheats", description="Find variables in a ROM's memory")
+    parser.add_argument('rom')
+    parser.add_argument('--quirks', choices=quirks.PROFILES, default='modern')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--end', type=lambda value: int(value, 0), default=0x1000,
+                        help="search addresses below END (default: 0x1000, the classic CHIP-8 memory)")
+    args = parser.parse_args(argv)
+
+    machine = Chip8(headless=True, quirks=args.quirks)
+    machine.load(args.rom)
+    machine.reset(args.seed)
+
+    finder = CheatFinder(machine, end=args.end)
+    finder.snapshot()
+
+    CheatShell(finder).cmdloop()
+
+if __name__ == '__main__':
+    main()
@@ -1,21 +1,28 @@
 from core.cpu import Cpu
 from core.memory import Memory
-from core.display import Display
+from core.framebuffer import FrameBuffer
+from core.keypad import Keypad, LAYOUT
 from core.timer import Timer
-from core.sound import Sound
-
-from datetime import datetime
+from core.sound import Sound, RecordingSink, AudioPattern
+from core.rom import Rom
+from core.template import MachineTemplate
+from core import quirks
+from core.pacer import FramePacer
+from core.metrics import Histogram, FRAME_TIME_BUCKETS
 
 import random
-import time
+import sys
 import logging
-import pygame
-import pygame.time
-import pygame.event
 
 class Chip8:
     STARTING_ADDRESS = 0x200
 
+    # ~600 instructions per second at 60 frames per second
+    CYCLES_PER_FRAME = 10
+
+    # Frames between two frame pacing reports in the log
+    REPORT_FRAMES = 600
+
     HEX_SPRITES = [
         [0xF0, 0x90, 0x90, 0x90, 0xF0], # 0
         [0x20, 0x60, 0x20, 0x20, 0x70], # 1
@@ -35,73 +42,251 @@ class Chip8:
         [0xF0, 0x80, 0xF0, 0x80, 0x80] # F
     ]
 
-    def __init__(self):
-        self._memory  = Memory(0x1000)
-        self._display = Display(64, 32)
+    FONT = [byte for sprite in HEX_SPRITES for byte in sprite]
+
+    def __init__(self, compiled=True, headless=False, cycles_per_frame=CYCLES_PER_FRAME, quirks=quirks.MODERN,
+                 display=None, input=None):
+        """
+        Headless machines do not use pygame, display is then a FrameBuffer (or any subclass given, such as
+        core.terminal.TerminalDisplay) and input an optional callable polled once per frame by run(), returning False
+        to quit.
+
+        pygame and numpy are only imported by the windowed backends, so that headless machines start fast.
+        """
+
+        self._headless = headless
+        self._key_map  = None
+
+        if not headless:
+            import pygame
+
+            # Only the video subsystem, the mixer is initialized by the sound sink on the first beep
+            pygame.display.init()
+
+            self._key_map = {getattr(pygame, f'K_{name}'): key for name, key in LAYOUT.items()}
+
+        if display is None:
+            if headless:
+                display = FrameBuffer(64, 32, 128, 64)
+            else:
+                from core.display import Display
+
+                display = Display(64, 32, max_width=128, max_height=64)
+
+        # XO-CHIP address space
+        self._memory  = Memory(0x10000)
+        self._display = display
+        self._keypad  = Keypad()
+        self._random  = random.Random()
         self._delay_timer = Timer(freq=60)
         self._sound_timer = Timer(freq=60)
 
-        self._sound   = Sound(self._sound_timer)
-        self._cpu     = Cpu(self._memory, self._display, delay_timer=self._delay_timer, sound_timer=self._sound_timer)
+        self._audio   = AudioPattern()
+        self._sound   = Sound(self._sound_timer, sink=RecordingSink() if headless else None, audio=self._audio)
+        self._cpu     = Cpu(
+            self._memory, self._display,
+            delay_timer=self._delay_timer, sound_timer=self._sound_timer,
+            keypad=self._keypad, rng=self._random, quirks=quirks, audio=self._audio
+        )
 
-        self._fps_time = datetime.now()
+        self._rom = None
+        self._template = None
+        self._cycles_per_frame = cycles_per_frame
 
-        pygame.init()
+        # Use the ahead-of-time compiled version of the ROM when there is one in the cache
+        self._compiled = compiled
+        self._executor = None
+        # Cpu.tick instrumented by coverage or profiling, which compiled blocks would bypass
+        self._instrumented = False
+
+        self._pacer = None
+        self._input = input if input is not None or headless else self._handle_events
+
+        # Metrics
+        self.frames = 0
+        self._frame_times = Histogram(FRAME_TIME_BUCKETS)
+
+    @property
+    def display(self):
+        return self._display
+
+    @property
+    def keypad(self):
+        return self._keypad
+
+    @property
+    def memory(self):
+        return self._memory
+
+    @property
+    def cpu(self):
+        return self._cpu
+
+    @property
+    def cycles_per_frame(self):
+        return self._cycles_per_frame
 
     def load(self, file):
-        logging.info(f"Loading ROM [{file}] into memory (starting at 0x{self.STARTING_ADDRESS:x})")
+        self.load_rom(Rom.from_file(file))
+
+    def load_rom(self, rom):
+        logging.info(f"Loading ROM [{rom.name}] into memory (starting at 0x{self.STARTING_ADDRESS:x})")
+
+        template = MachineTemplate(
+            rom, self.FONT, self.STARTING_ADDRESS, len(self._memory), compiled=self._compiled and not self._instrumented
+        )
+
+        logging.info(f"ROM loaded (0x{len(rom):x} bytes read, sha1 {rom.hash})")
+
+        self.use_template(template)
+
+    def use_template(self, template):
+        """
+        Run the template ROM, the memory is set to the template image (reset() sets the rest of the machine).
+        """
 
-        with open(file, 'rb') as f:
-            i = self.STARTING_ADDRESS
+        self._template = template
+        self._rom      = template.rom
 
-            while byte := f.read(1):
-                self._memory[i] = byte[0]
-                i += 1
+        self._memory.restore(template.image)
 
-            logging.info(f"ROM loaded (0x{i:x} bytes read)")
+        if template.program is not None and not self._instrumented:
+            logging.info(f"Using compiled ROM ({len(template.program.blocks)} blocks)")
+            self._executor = template.program.bind(self._cpu)
+        else:
+            self._executor = None
 
-    def run(self):
-        self._reset()
+    def record_coverage(self, coverage):
+        coverage.attach(self._cpu)
 
+        self._instrumented = True
+        self._executor = None
+
+    def record_profile(self, profiler):
+        profiler.attach(self._cpu)
+
+        self._instrumented = True
+        self._executor = None
+
+    def frame(self, render=True):
+        """
+        Emulate one 60 Hz frame: cycles_per_frame instructions then one timer period, independently of the wall clock.
+        """
+
+        if self._executor is not None:
+            self._executor.run(self._cycles_per_frame)
+        else:
+            tick = self._cpu.tick
+
+            for _ in range(self._cycles_per_frame):
+                tick()
+
+        self._end_frame(render)
+
+    def _end_frame(self, render=True):
+        self._delay_timer.step()
+        self._sound_timer.step()
+
+        self._sound.play()
+
+        if render:
+            self._display.render()
+
+        self.frames += 1
+
+    def run(self, turbo=False):
+        self.reset()
+
+        self._pacer = FramePacer(fps=60, turbo=turbo, histogram=self._frame_times)
         running = True
 
         while running:
-            self._cpu.tick()
+            self._pacer.start_frame()
 
-            logging.debug(self._cpu)
-            logging.info(f"FPS: {self._fps()}")
+            running = self._input() if self._input is not None else True
+            self.frame(render=self._pacer.should_render())
 
-            self._delay_timer.tick()
-            self._sound_timer.tick()
+            self._pacer.end_frame()
 
-            self._display.render()
-            self._sound.play()
+            if self._pacer.frames % self.REPORT_FRAMES == 0:
+                logging.info(self._pacer.report())
 
-            for e in pygame.event.get():
-                if e.type == pygame.QUIT:
-                    running = False
+    @property
+    def pacer(self):
+        return self._pacer
 
-            pygame.time.wait(15)            
+    def register_metrics(self, registry, **labels):
+        """
+        Expose the machine counters in a core.metrics.Registry, labels identify the machine.
+        """
 
-    def _reset(self):
-        # TODO: self._cpu.reset()
-        # TODO: self._display.reset()
-        self._cpu.set_starting_address(self.STARTING_ADDRESS)
-        random.seed()
+        display = self._display
+
+        registry.counter('chip8_frames_total', "Emulated frames", lambda: self.frames, **labels)
+        registry.counter('chip8_instructions_total', "Executed instructions", self._instructions, **labels)
+        registry.counter(
+            'chip8_compiled_instructions_total', "Instructions executed by compiled blocks",
+            lambda: self._executor.compiled_instructions if self._executor is not None else 0, **labels
+        )
+        registry.counter('chip8_draw_calls_total', "Sprite draws", lambda: display.draw_calls, **labels)
+        registry.counter('chip8_collisions_total', "Sprite draws that erased pixels", lambda: display.collisions, **labels)
+        registry.counter('chip8_renders_total', "Rendered frames", lambda: display.renders, **labels)
+        registry.counter(
+            'chip8_timer_underflows_total', "Timer countdowns reaching 0", lambda: self._delay_timer.underflows,
+            timer='delay', **labels
+        )
+        registry.counter(
+            'chip8_timer_underflows_total', "Timer countdowns reaching 0", lambda: self._sound_timer.underflows,
+            timer='sound', **labels
+        )
+        registry.histogram('chip8_frame_seconds', "Work time of paced frames", self._frame_times, **labels)
+        registry.gauge('chip8_memory_bytes', "Memory used by the machine state", self._memory_footprint, **labels)
+
+    def _instructions(self):
+        compiled = self._executor.compiled_instructions if self._executor is not None else 0
+
+        return self._cpu.instructions + compiled
 
-        self._load_sprites_in_memory()
+    def _memory_footprint(self):
+        # Lists of small ints: the list object, ints below 257 are shared
+        return (
+            sys.getsizeof(self._memory._buffer) + sys.getsizeof(self._cpu._stack._buffer)
+            + sum(sys.getsizeof(rows) + sum(sys.getsizeof(row) for row in rows) for rows in self._display._planes)
+        )
 
-    def _load_sprites_in_memory(self):
-        i = 0
-        for font in self.HEX_SPRITES:
-            for byte in font:
-                self._memory[i] = byte
-                i += 1
+    def _handle_events(self):
+        import pygame
 
-    def _fps(self):
-        now = datetime.now()
-        d = now - self._fps_time
+        key_map = self._key_map
 
-        self._fps_time = now
+        for e in pygame.event.get():
+            if e.type == pygame.QUIT:
+                return False
+            elif e.type == pygame.KEYDOWN and e.key in key_map:
+                self._keypad.press(key_map[e.key])
+            elif e.type == pygame.KEYUP and e.key in key_map:
+                self._keypad.release(key_map[e.key])
 
-        return 1.0 / d.total_seconds()
\ No newline at end of file
+        return True
+
+    def reset(self, seed=None):
+        """
+        Power-on state running the loaded ROM, the memory being restored from the template image in one copy.
+        """
+
+        self._cpu.reset()
+        self._display.reset()
+        self._keypad.set_state(0)
+        self._audio.reset()
+        self._sound.reset()
+
+        if self._template is not None:
+            self._memory.restore(self._template.image)
+        else:
+            self._memory.load(0, self.FONT)
+
+        if self._executor is not None:
+            self._executor.reset()
+
+        self._cpu.set_starting_address(self.STARTING_ADDRESS)
+        self._random.seed(seed)
@@ -0,0 +1,253 @@
+from core.cache import cache_dir, write_atomic, record as record_cache
+from core.rom import Rom
+from core import disasm
+from core.version import VERSION
+
+import argparse
+import logging
+import marshal
+import os
+import sys
+
+STARTING_ADDRESS = 0x200
+
+class CompiledProgram:
+    def __init__(self, code):
+        self._namespace = {}
+        exec(code, self._namespace)
+
+        self.blocks = self._namespace['BLOCKS']
+        self.code_range = self._namespace['CODE_RANGE']
+
+    def bind(self, cpu):
+        return Executor(self, cpu)
+
+class Executor:
+    """
+    Runs a compiled program on a Cpu: compiled blocks are called directly, anything else (computed Bnnn
+    targets, code that was not statically reachable, blocks overwritten by the ROM) goes through Cpu.tick.
+    """
+
+    def __init__(self, program, cpu):
+        self._cpu = cpu
+        self._code_start, self._code_end = program.code_range
+
+        # Instructions run by compiled blocks and by the interpreter
+        self.compiled_instructions    = 0
+        self.interpreted_instructions = 0
+
+        self._compiled_blocks = {
+            address: (make_block(cpu, self.written), length)
+            for address, (make_block, length) in program.blocks.items()
+        }
+        self._blocks = dict(self._compiled_blocks)
+
+    def reset(self):
+        """
+        Bring back the blocks dropped by self-modifying code, for a machine reset to the original ROM image.
+        """
+
+        self._blocks = dict(self._compiled_blocks)
+
+    def tick(self):
+        """
+        Execute one compiled block or one interpreted instruction, returns the number of instructions executed.
+        """
+
+        block = self._blocks.get(self._cpu._pc)
+
+        if block is None:
+            self._interpret()
+            self.interpreted_instructions += 1
+            return 1
+
+        executed = block[0]()
+        self.compiled_instructions += executed
+        return executed
+
+    def run(self, cycles):
+        """
+        Execute exactly cycles instructions, interpreting the tail when a whole block does not fit.
+        """
+
+        cpu    = self._cpu
+        blocks = self._blocks
+
+        while cycles > 0:
+            block = blocks.get(cpu._pc)
+
+            if block is not None and block[1] <= cycles:
+                executed = block[0]()
+                cycles -= executed
+                self.compiled_instructions += executed
+            else:
+                self._interpret()
+                cycles -= 1
+                self.interpreted_instructions += 1
+
+    def written(self, start, end):
+        """
+        Called after memory [start, end) was written, drops the compiled blocks overlapping it.
+        """
+
+        if end <= self._code_start or start >= self._code_end:
+            return
+
+        for address in [a for a, (block, length) in self._blocks.items() if a < end and a + 2 * length > start]:
+            logging.debug(f"Self-modifying code at [0x{start:x}, 0x{end:x}), falling back to the interpreter for 0x{address:x}")
+            del self._blocks[address]
+
+    def _interpret(self):
+        cpu = self._cpu
+        memory = cpu._memory
+        pc = cpu._pc
+
+        write = _memory_write(memory[pc] << 8 | memory[pc + 1])
+
+        if write is None:
+            cpu.tick()
+        else:
+            start = cpu._i.get()
+            cpu.tick()
+            self.written(start, start + write)
+
+def _is_control_flow(address, instruction):
+    return disasm.decode(address, instruction).successors() is not None
+
+def _memory_write(instruction):
+    """
+    Number of bytes written at I by the instruction, None if it does not write memory.
+    """
+
+    if instruction & 0xF0FF == 0xF033:
+        return 3
+    if instruction & 0xF0FF == 0xF055:
+        return ((instruction & 0x0F00) >> 8) + 1
+    if instruction & 0xF00F == 0x5002:
+        return abs(((instruction & 0x0F00) >> 8) - ((instruction & 0x00F0) >> 4)) + 1
+
+    return None
+
+def find_blocks(rom, start=STARTING_ADDRESS):
+    """
+    Basic blocks of the code statically reachable from start.
+    """
+
+    return disasm.analyze(rom, start).blocks
+
+def translate(rom, start=STARTING_ADDRESS):
+    """
+    Generate the Python source of the compiled program, one function per basic block.
+    """
+
+    blocks = find_blocks(rom, start)
+
+    lines = [
+        f"# Generated by core.compiler {VERSION} from {rom.name} (sha1 {rom.hash}), do not edit",
+        "",
+    ]
+
+    for block in blocks:
+        lines.append(f"def make_block_{block.start:03x}(cpu, written):")
+        lines.append("    decode = cpu._decode")
+
+        for i, (address, instruction) in enumerate(block.instructions):
+            lines.append(f"    op{i}, arg{i} = decode(0x{instruction:04x})")
+
+        lines.append("")
+        lines.append("    def block():")
+
+        last = len(block) - 1
+
+        for i, (address, instruction) in enumerate(block.instructions):
+            # Only control flow instructions (always last in a block) read or write PC
+            if i == last and _is_control_flow(address, instruction):
+                lines.append(f"        cpu._pc = 0x{address + 2:03x}")
+
+            write = _memory_write(instruction)
+
+            if write is None:
+                lines.append(f"        op{i}(arg{i})")
+            else:
+                lines.append(f"        i = cpu._i.get()")
+                lines.append(f"        op{i}(arg{i})")
+                lines.append(f"        written(i, i + {write})")
+
+                # The rest of this block was overwritten: stop here, the next tick runs the new code
+                if i < last:
+                    lines.append(f"        if i < 0x{block.end:03x} and i + {write} > 0x{address + 2:03x}:")
+                    lines.append(f"            cpu._pc = 0x{address + 2:03x}")
+                    lines.append(f"            return {i + 1}")
+
+        if not _is_control_flow(*block.instructions[last]):
+            lines.append(f"        cpu._pc = 0x{block.end:03x}")
+
+        lines.append(f"        return {len(block)}")
+
+        lines.append("")
+        lines.append("    return block")
+        lines.append("")
+
+    lines.append("BLOCKS = {")
+    lines.extend(f"    0x{block.start:03x}: (make_block_{block.start:03x}, {len(block)})," for block in blocks)
+    lines.append("}")
+    lines.append("")
+
+    code_start = min((block.start for block in blocks), default=start)
+    code_end = max((block.end for block in blocks), default=start)
+    lines.append(f"CODE_RANGE = (0x{code_start:03x}, 0x{code_end:03x})")
+
+    return "\n".join(lines) + "\n"
+
+def compile_rom(rom, start=STARTING_ADDRESS):
+    code = compile(translate(rom, start), f"<chip8 {rom.name}>", 'exec')
+
+    write_atomic(_cache_path(rom), marshal.dumps(code))
+
+    return CompiledProgram(code)
+
+def load_cached(rom):
+    """
+    Compiled program for rom if it is in the on-disk cache, None otherwise.
+    """
+
+    path = _cache_path(rom)
+
+    if not os.path.exists(path):
+        record_cache('compiled', False)
+        return None
+
+    with open(path, 'rb') as f:
+        try:
+            code = marshal.load(f)
+        except (EOFError, ValueError, TypeError):
+            logging.warning(f"Ignoring corrupted compiled ROM cache [{path}]")
+            record_cache('compiled', False)
+            return None
+
+    record_cache('compiled', True)
+
+    return CompiledProgram(code)
+
+def _cache_path(rom):
+    # marshal format is specific to the interpreter version
+    return os.path.join(cache_dir('compiled'), f"{rom.hash}-{VERSION}-{disasm.ANALYSIS_VERSION}-{sys.implementation.cache_tag}.bin")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.compiler", description="Compile ROMs ahead of time into the cache")
+    parser.add_argument('roms', nargs='+')
+    parser.add_argument('--print', action='store_true', help="print the generated source instead of caching it")
+    args = parser.parse_args(argv)
+
+    for path in args.roms:
+        rom = Rom.from_file(path)
+
+        if args.print:
+            print(translate(rom))
+            continue
+
+        compile_rom(rom)
+        print(f"{path}: {len(find_blocks(rom))} blocks compiled ({rom.hash})")
+
+if __name__ == '__main__':
+    main()
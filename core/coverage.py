@@ -0,0 +1,161 @@
+from core import disasm
+from core.rom import Rom
+
+import argparse
+import json
+
+class Coverage:
+    """
+    Executed addresses (one byte per address) and handler execution counts of a Cpu.
+
+    Recording wraps the tick of the Cpu instance (the plain Cpu.tick, or the one of a Profiler attached before) and
+    detach() puts the wrapped tick back. Compiled ROMs bypass Cpu.tick, record coverage on an interpreted machine
+    (Chip8(compiled=False)).
+    """
+
+    def __init__(self, size=0x10000):
+        self.addresses = bytearray(size)
+        self.handlers  = {}
+        self._cpu      = None
+        self._tick     = None
+        self._replaced = None
+
+    def attach(self, cpu):
+        addresses = self.addresses
+        handlers  = self.handlers
+
+        memory = cpu._memory
+        decode = cpu._decode
+        tick   = cpu.tick
+
+        def covered_tick():
+            # Detached while a later instrumentation still calls it
+            if self._cpu is None:
+                return tick()
+
+            pc = cpu._pc
+            opcode, _ = decode(memory[pc] << 8 | memory[pc + 1])
+
+            addresses[pc] = 1
+            name = opcode.__name__
+            handlers[name] = handlers.get(name, 0) + 1
+
+            tick()
+
+        # The instance tick replaced (another instrumentation), None for the plain Cpu.tick
+        self._replaced = vars(cpu).get('tick')
+        self._tick = covered_tick
+
+        cpu.tick = covered_tick
+        self._cpu = cpu
+
+    def detach(self):
+        if self._cpu is None:
+            return
+
+        if vars(self._cpu).get('tick') is self._tick:
+            if self._replaced is None:
+                del self._cpu.tick
+            else:
+                self._cpu.tick = self._replaced
+
+        self._cpu = None
+
+    def merge(self, other):
+        merged = int.from_bytes(self.addresses, 'big') | int.from_bytes(other.addresses, 'big')
+        self.addresses[:] = merged.to_bytes(len(self.addresses), 'big')
+
+        for name, count in other.handlers.items():
+            self.handlers[name] = self.handlers.get(name, 0) + count
+
+    def executed(self):
+        return [address for address, hit in enumerate(self.addresses) if hit]
+
+    def handler_report(self):
+        """
+        Execution count of every Cpu handler, including the ones that never ran.
+        """
+
+        report = dict.fromkeys(disasm.MNEMONICS, 0)
+        report.update(self.handlers)
+
+        return report
+
+    def annotate(self, rom, start=disasm.STARTING_ADDRESS):
+        """
+        Disassembly of the ROM code, executed instructions marked with '*'.
+        """
+
+        analysis = disasm.analyze(rom, start)
+        end = start + len(rom)
+
+        addresses = set(analysis.code)
+        addresses.update(a for a in self.executed() if start <= a < end - 1)
+
+        static = len(analysis.code)
+        hit = sum(1 for a in analysis.code if self.addresses[a])
+
+        lines = [f"; {hit}/{static} reachable instructions executed"]
+        labels = analysis.labels()
+
+        for address in sorted(addresses):
+            if address in labels:
+                lines.append(f"{labels[address]}:")
+
+            instruction = disasm.decode(address, rom.data[address - start] << 8 | rom.data[address - start + 1])
+            marker = '*' if self.addresses[address] else ' '
+
+            lines.append(f"  {marker} {instruction!r}")
+
+        return "\n".join(lines)
+
+    def to_json(self):
+        return {
+            'size':      len(self.addresses),
+            'addresses': self.executed(),
+            'handlers':  self.handler_report(),
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        coverage = cls(data['size'])
+
+        for address in data['addresses']:
+            coverage.addresses[address] = 1
+
+        coverage.handlers = {name: count for name, count in data['handlers'].items() if count}
+
+        return coverage
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_json(), f, indent=1)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_json(json.load(f))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.coverage", description="Merge and report coverage runs")
+    parser.add_argument('runs', nargs='+', help="coverage JSON files")
+    parser.add_argument('--rom', help="print the annotated disassembly of this ROM")
+    parser.add_argument('--output', help="write the merged coverage to this file")
+    args = parser.parse_args(argv)
+
+    coverage = Coverage.load(args.runs[0])
+
+    for path in args.runs[1:]:
+        coverage.merge(Coverage.load(path))
+
+    if args.output:
+        coverage.save(args.output)
+
+    if args.rom:
+        print(coverage.annotate(Rom.from_file(args.rom)))
+    else:
+        for name, count in sorted(coverage.handler_report().items(), key=lambda item: -item[1]):
+            print(f"{count:>10}  {name}")
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,19 @@
 from core.memory import Memory
 from core.register import Register
 from core.exceptions import UnknownOpcodeError
+from core import quirks as quirk_profiles
 
 import random
 import logging
 
 class Cpu:
-    def __init__(self, memory, display, delay_timer, sound_timer):
+    def __init__(self, memory, display, delay_timer, sound_timer, keypad=None, rng=random, quirks=quirk_profiles.MODERN,
+                 audio=None):
         self._memory    = memory
         self._display   = display
+        self._keypad    = keypad
+        self._random    = rng
+        self._audio     = audio
 
         self._delay_timer = delay_timer
         self._sound_timer = sound_timer
@@ -17,31 +22,48 @@ class Cpu:
         self._i = Register(16)
         self._pc = 0x0
 
-        self._stack = Memory(12, cell_bit_size=16)
+        self._stack = Memory(16, cell_bit_size=16)
         self._sp    = 0
 
+        # Instructions run through tick (compiled blocks are counted by their Executor)
+        self.instructions = 0
+
         self._standard_ops = {
             0x1: self._jump_to_address,
             0x2: self._call_subroutine,
             0x3: self._skip_if_reg_equal_const,
             0x4: self._skip_if_reg_not_equal_const,
-            0x5: self._skip_if_reg_equal_reg,
             0x6: self._set_reg_to_const,
             0x7: self._add_const_to_reg,
             0x9: self._skip_if_reg_not_equal_reg,
             0xA: self._set_i_to_address,
             0xB: self._jump_to_address_plus_v0,
             0xC: self._set_reg_to_xor_rand_and_const,
-            0xD: self._draw_sprite,
-            0xE: self._skip_on_key_press_event,
         }
 
         self._extended_ops_decode = {
             0x0: self._decode_0_ops,
+            0x5: self._decode_5_ops,
             0x8: self._decode_8_ops,
+            0xD: self._decode_D_ops,
+            0xE: self._decode_E_ops,
             0xF: self._decode_F_ops
         }
 
+        # SUPER-CHIP display instructions
+        self._0_ops = {
+            0x0FB: self._scroll_right,
+            0x0FC: self._scroll_left,
+            0x0FE: self._low_resolution,
+            0x0FF: self._high_resolution,
+        }
+
+        self._5_ops = {
+            0x0: self._skip_if_reg_equal_reg,
+            0x2: self._save_regs_range,
+            0x3: self._load_regs_range,
+        }
+
         self._8_ops = {
             0x0: self._mov_reg_to_reg,
             0x1: self._bitwise_or,
@@ -54,28 +76,111 @@ class Cpu:
             0xE: self._left_shift,
         }
 
+        self._E_ops = {
+            0x9E: self._skip_if_key_pressed,
+            0xA1: self._skip_if_key_not_pressed,
+        }
+
         self._F_ops = {
+            0x01: self._select_planes,
+            0x02: self._load_audio_pattern,
             0x07: self._mov_delay_to_reg,
-            0x0A: self._set_delay_to_reg,
-            0x15: self._set_sound_to_reg,
+            0x0A: self._wait_for_key_press,
+            0x15: self._set_delay_to_reg,
+            0x18: self._set_sound_to_reg,
             0x1E: self._add_reg_to_i,
             0x29: self._mov_reg_sprite_addr_to_i,
             0x33: self._mov_reg_to_bcd,
+            0x3A: self._set_pitch,
             0x55: self._dump_regs,
             0x65: self._load_regs
         }
 
+        self._bind_quirks(quirk_profiles.get(quirks))
+
+    def _bind_quirks(self, quirks):
+        """
+        Swap the handlers of the quirky instructions into the dispatch tables, so the hot path never tests quirks.
+        """
+
+        self._quirks = quirks
+
+        if quirks.shift_uses_vy:
+            self._8_ops[0x6] = self._right_shift_vy
+            self._8_ops[0xE] = self._left_shift_vy
+
+        if quirks.vf_reset:
+            self._8_ops[0x1] = self._bitwise_or_reset_vf
+            self._8_ops[0x2] = self._bitwise_and_reset_vf
+            self._8_ops[0x3] = self._bitwise_xor_reset_vf
+
+        if quirks.jump_uses_vx:
+            self._standard_ops[0xB] = self._jump_to_address_plus_vx
+
+        if quirks.load_store == 'increment-x':
+            self._F_ops[0x55] = self._dump_regs_increment_x
+            self._F_ops[0x65] = self._load_regs_increment_x
+        elif quirks.load_store == 'unchanged':
+            self._F_ops[0x55] = self._dump_regs_keep_i
+            self._F_ops[0x65] = self._load_regs_keep_i
+
     def set_starting_address(self, address):
         if address > len(self._memory):
             raise OverflowError(address, len(self._memory))
 
         self._pc = address
 
+    def reset(self):
+        """
+        Power-on state: registers, stack and timers zeroed, PC to be set with set_starting_address().
+        """
+
+        for register in self._v:
+            register.set(0)
+
+        self._i.set(0)
+        self._pc = 0x0
+        self._sp = 0
+        self._stack.restore([0] * len(self._stack))
+
+        if self._delay_timer is not None:
+            self._delay_timer.set(0)
+        if self._sound_timer is not None:
+            self._sound_timer.set(0)
+
+    def snapshot(self):
+        """
+        Registers, stack and timers, to be given back to restore().
+        """
+
+        return (
+            [r.get() for r in self._v], self._i.get(), self._pc, self._sp, list(self._stack._buffer),
+            self._delay_timer.get() if self._delay_timer is not None else 0,
+            self._sound_timer.get() if self._sound_timer is not None else 0,
+        )
+
+    def restore(self, snapshot):
+        v, i, pc, sp, stack, delay, sound = snapshot
+
+        for register, value in zip(self._v, v):
+            register.set(value)
+
+        self._i.set(i)
+        self._pc = pc
+        self._sp = sp
+        self._stack.restore(stack)
+
+        if self._delay_timer is not None:
+            self._delay_timer.set(delay)
+        if self._sound_timer is not None:
+            self._sound_timer.set(sound)
+
     def tick(self):
         instruction = self._fetch()
         opcode, operands = self._decode(instruction)
 
         self._execute(opcode, operands)
+        self.instructions += 1
 
     def __repr__(self):
         registers = [
@@ -123,13 +228,29 @@ class Cpu:
         opcode(operands)
 
     def _skip_next_instruction(self):
-        self._pc += 2
+        # F000 nnnn (XO-CHIP) is skipped as a whole
+        if self._memory[self._pc] == 0xF0 and self._memory[self._pc + 1] == 0x00:
+            self._pc += 4
+        else:
+            self._pc += 2
 
     def _decode_0_ops(self, operands):
         if operands == 0x0E0:
             return (self._clear_display, 0x000)
         elif operands == 0x0EE:
             return (self._ret, 0x000)
+        elif operands & 0xFF0 == 0x0C0:
+            return (self._scroll_down, operands)
+        elif operands & 0xFF0 == 0x0D0:
+            return (self._scroll_up, operands)
+        elif operands in self._0_ops:
+            return (self._0_ops[operands], operands)
+
+    def _decode_5_ops(self, operands):
+        op = operands & 0x00F
+
+        if op in self._5_ops:
+            return self._5_ops[op], operands
 
     def _decode_8_ops(self, operands):
         op = operands & 0x00F
@@ -137,7 +258,22 @@ class Cpu:
         if op in self._8_ops:
             return self._8_ops[op], operands
 
+    def _decode_D_ops(self, operands):
+        if operands & 0x00F:
+            return self._draw_sprite, operands
+
+        return self._draw_sprite_16, operands
+
+    def _decode_E_ops(self, operands):
+        op = operands & 0xFF
+
+        if op in self._E_ops:
+            return self._E_ops[op], operands
+
     def _decode_F_ops(self, operands):
+        if operands == 0x000:
+            return self._load_i_long, operands
+
         op = operands & 0xFF
 
         if op in self._F_ops:
@@ -214,6 +350,35 @@ class Cpu:
             self._skip_next_instruction()
 
 
+    def _save_regs_range(self, operands):
+        """
+        5xy2 - LD [I], Vx-Vy (XO-CHIP)
+        Store Vx to Vy (in that order, x may be above y) in memory starting at address I. I is left unchanged.
+        """
+
+        x = (operands & 0xF00) >> 8
+        y = (operands & 0x0F0) >> 4
+        step = 1 if x <= y else -1
+        i = self._i.get()
+
+        for offset, reg in enumerate(range(x, y + step, step)):
+            self._memory[i + offset] = self._v[reg].get()
+
+    def _load_regs_range(self, operands):
+        """
+        5xy3 - LD Vx-Vy, [I] (XO-CHIP)
+        Fill Vx to Vy (in that order, x may be above y) with values from memory starting at address I. I is left
+        unchanged.
+        """
+
+        x = (operands & 0xF00) >> 8
+        y = (operands & 0x0F0) >> 4
+        step = 1 if x <= y else -1
+        i = self._i.get()
+
+        for offset, reg in enumerate(range(x, y + step, step)):
+            self._v[reg].set(self._memory[i + offset])
+
     def _set_reg_to_const(self, operands):
         """
         6xkk - LD Vx, byte
@@ -266,6 +431,16 @@ class Cpu:
 
         self._pc = operands + self._v[0x0].get()
 
+    def _jump_to_address_plus_vx(self, operands):
+        """
+        Bxnn - JP Vx, addr (CHIP-48, SUPER-CHIP)
+        Jump to location xnn + Vx. The program counter is set to xnn plus the value of Vx.
+        """
+
+        reg = (operands & 0xF00) >> 8
+
+        self._pc = operands + self._v[reg].get()
+
     def _set_reg_to_xor_rand_and_const(self, operands):
         """
         Cxkk - RND Vx, byte
@@ -275,7 +450,7 @@ class Cpu:
 
         reg     = (operands & 0xF00) >> 8
         value   = (operands & 0x0FF)
-        r       = random.randint(0x0, 0xFF)
+        r       = self._random.randint(0x0, 0xFF)
 
         self._v[reg].set(r & value)
 
@@ -299,14 +474,110 @@ class Cpu:
         n = (operands & 0x00F)
 
         x, y = self._v[vx].get(), self._v[vy].get()
+        i = self._i.get()
+        collided = False
+
+        # XO-CHIP: one sprite per selected plane, stored one after the other
+        for plane in self._display.selected_planes:
+            b = [self._memory[i + line] for line in range(0, n)]
+            collided = self._display.draw(x, y, b, plane=plane) or collided
+            i += n
+
+        self._v[0xF].set(int(collided))
+
+    def _draw_sprite_16(self, operands):
+        """
+        Dxy0 - DRW Vx, Vy, 0 (SUPER-CHIP)
+        Display the 16x16 sprite starting at memory location I at (Vx, Vy), set VF = collision.
+
+        The sprite is 32 bytes, two bytes per line, drawn as 16 lines of 16 pixels.
+        """
+
+        vx = (operands & 0xF00) >> 8
+        vy = (operands & 0x0F0) >> 4
+
+        x, y = self._v[vx].get(), self._v[vy].get()
+        i = self._i.get()
+        collided = False
 
-        b = [self._memory[self._i.get() + i] for i in range(0, n)]
+        for plane in self._display.selected_planes:
+            lines = [self._memory[i + 2 * line] << 8 | self._memory[i + 2 * line + 1] for line in range(0, 16)]
+            collided = self._display.draw(x, y, lines, sprite_width=16, plane=plane) or collided
+            i += 32
 
-        collided = self._display.draw(x, y, b)
         self._v[0xF].set(int(collided))
 
-    def _skip_on_key_press_event(self, operands):
-        raise NotImplementedError
+    def _scroll_down(self, operands):
+        """
+        00Cn - SCD nibble (SUPER-CHIP)
+        Scroll the display down by n lines.
+        """
+
+        self._display.scroll_down(operands & 0x00F)
+
+    def _scroll_up(self, operands):
+        """
+        00Dn - SCU nibble (XO-CHIP)
+        Scroll the display up by n lines.
+        """
+
+        self._display.scroll_up(operands & 0x00F)
+
+    def _scroll_right(self, operands):
+        """
+        00FB - SCR (SUPER-CHIP)
+        Scroll the display right by 4 pixels.
+        """
+
+        self._display.scroll_right(4)
+
+    def _scroll_left(self, operands):
+        """
+        00FC - SCL (SUPER-CHIP)
+        Scroll the display left by 4 pixels.
+        """
+
+        self._display.scroll_left(4)
+
+    def _low_resolution(self, operands):
+        """
+        00FE - LOW (SUPER-CHIP)
+        Switch to the 64x32 low resolution mode, the display is cleared.
+        """
+
+        self._display.set_resolution(64, 32)
+
+    def _high_resolution(self, operands):
+        """
+        00FF - HIGH (SUPER-CHIP)
+        Switch to the 128x64 high resolution mode, the display is cleared.
+        """
+
+        self._display.set_resolution(128, 64)
+
+    def _skip_if_key_pressed(self, operands):
+        """
+        Ex9E - SKP Vx
+        Skip next instruction if key with the value of Vx is pressed. Checks the keyboard, and if the key corresponding
+        to the value of Vx is currently in the down position, PC is increased by 2.
+        """
+
+        reg = (operands & 0xF00) >> 8
+
+        if self._keypad.is_pressed(self._v[reg].get() & 0xF):
+            self._skip_next_instruction()
+
+    def _skip_if_key_not_pressed(self, operands):
+        """
+        ExA1 - SKNP Vx
+        Skip next instruction if key with the value of Vx is not pressed. Checks the keyboard, and if the key
+        corresponding to the value of Vx is currently in the up position, PC is increased by 2.
+        """
+
+        reg = (operands & 0xF00) >> 8
+
+        if not self._keypad.is_pressed(self._v[reg].get() & 0xF):
+            self._skip_next_instruction()
 
     def _mov_reg_to_reg(self, operands):
         """
@@ -368,6 +639,33 @@ class Cpu:
             self._v[reg1].get() ^ self._v[reg2].get()
         )
 
+    def _bitwise_or_reset_vf(self, operands):
+        """
+        8xy1 - OR Vx, Vy (COSMAC VIP)
+        Set Vx = Vx OR Vy, then VF is reset to 0.
+        """
+
+        self._bitwise_or(operands)
+        self._v[0xF].set(0)
+
+    def _bitwise_and_reset_vf(self, operands):
+        """
+        8xy2 - AND Vx, Vy (COSMAC VIP)
+        Set Vx = Vx AND Vy, then VF is reset to 0.
+        """
+
+        self._bitwise_and(operands)
+        self._v[0xF].set(0)
+
+    def _bitwise_xor_reset_vf(self, operands):
+        """
+        8xy3 - XOR Vx, Vy (COSMAC VIP)
+        Set Vx = Vx XOR Vy, then VF is reset to 0.
+        """
+
+        self._bitwise_xor(operands)
+        self._v[0xF].set(0)
+
     def _add_reg_to_reg(self, operands):
         """
         8xy4 - ADD Vx, Vy
@@ -412,12 +710,25 @@ class Cpu:
         """
 
         reg1 = (operands & 0xF00) >> 8
-        reg2 = (operands & 0x0F0) >> 4
 
         flag = (self._v[reg1].get() & 0x80) >> 7 # 0x80 = 0b1000.0000
 
         self._v[0xF].set(flag)
-        self._v[reg2].set(self._v[reg1].get() << 1)
+        self._v[reg1].set(self._v[reg1].get() << 1)
+
+    def _left_shift_vy(self, operands):
+        """
+        8xyE - SHL Vx, Vy (COSMAC VIP)
+        Set Vx = Vy SHL 1. If the most-significant bit of Vy is 1, then VF is set to 1, otherwise to 0.
+        """
+
+        reg1 = (operands & 0xF00) >> 8
+        reg2 = (operands & 0x0F0) >> 4
+
+        flag = (self._v[reg2].get() & 0x80) >> 7 # 0x80 = 0b1000.0000
+
+        self._v[0xF].set(flag)
+        self._v[reg1].set(self._v[reg2].get() << 1)
 
     def _sub_reg_to_reg_inv(self, operands):
         """
@@ -445,11 +756,25 @@ class Cpu:
         """
 
         reg1 = (operands & 0xF00) >> 8
-        reg2 = (operands & 0x0F0) >> 4
         flag = (self._v[reg1].get() & 0x01)
 
         self._v[0xF].set(flag)
-        self._v[reg2].set(self._v[reg1].get() >> 1)
+        self._v[reg1].set(self._v[reg1].get() >> 1)
+
+    def _right_shift_vy(self, operands):
+        """
+        8xy6 - SHR Vx, Vy (COSMAC VIP)
+        Set Vx = Vy SHR 1.
+
+        If the least-significant bit of Vy is 1, then VF is set to 1, otherwise 0.
+        """
+
+        reg1 = (operands & 0xF00) >> 8
+        reg2 = (operands & 0x0F0) >> 4
+        flag = (self._v[reg2].get() & 0x01)
+
+        self._v[0xF].set(flag)
+        self._v[reg1].set(self._v[reg2].get() >> 1)
 
     def _mov_delay_to_reg(self, operands):
         """
@@ -461,6 +786,23 @@ class Cpu:
 
         self._v[reg].set(self._delay_timer.get())
 
+    def _wait_for_key_press(self, operands):
+        """
+        Fx0A - LD Vx, K
+        Wait for a key press, store the value of the key in Vx. All execution stops until a key is pressed, then the
+        value of that key is stored in Vx.
+        """
+
+        reg = (operands & 0xF00) >> 8
+        key = self._keypad.first_pressed()
+
+        if key is None:
+            # Execute this instruction again until a key is pressed
+            self._pc -= 2
+            return
+
+        self._v[reg].set(key)
+
     def _set_delay_to_reg(self, operands):
         """
         Fx15 - LD DT, Vx
@@ -485,6 +827,43 @@ class Cpu:
 
         self._sound_timer.set(self._v[reg].get())
 
+    def _load_i_long(self, operands):
+        """
+        F000 nnnn - LD I, long (XO-CHIP)
+        Set I = nnnn, the 16-bit address stored in the word following the instruction.
+        """
+
+        self._i.set(self._memory[self._pc] << 8 | self._memory[self._pc + 1])
+        self._pc += 2
+
+    def _select_planes(self, operands):
+        """
+        Fx01 - PLANE x (XO-CHIP)
+        Select the bit planes drawn, cleared and scrolled by the display instructions, x is a mask of planes.
+        """
+
+        self._display.select_planes((operands & 0xF00) >> 8)
+
+    def _load_audio_pattern(self, operands):
+        """
+        F002 - AUDIO (XO-CHIP)
+        Load the 16 bytes (128 1-bit samples) starting at I into the audio pattern buffer.
+        """
+
+        i = self._i.get()
+
+        self._audio.load([self._memory[i + offset] for offset in range(0, 16)])
+
+    def _set_pitch(self, operands):
+        """
+        Fx3A - PITCH Vx (XO-CHIP)
+        Set the playback rate of the audio pattern to 4000 * 2 ^ ((Vx - 64) / 48) Hz.
+        """
+
+        reg = (operands & 0xF00) >> 8
+
+        self._audio.set_pitch(self._v[reg].get())
+
     def _add_reg_to_i(self, operands):
         """
         Fx1E - ADD I, Vx
@@ -553,3 +932,42 @@ class Cpu:
 
         self._i.set(self._i.get() + end_register + 1)
 
+    def _dump_regs_increment_x(self, operands):
+        """
+        Fx55 - LD [I], Vx (CHIP-48)
+        Stores V0 to VX in memory starting at address I. I is then set to I + x.
+        """
+
+        self._dump_regs_keep_i(operands)
+        self._i.set(self._i.get() + ((operands & 0xF00) >> 8))
+
+    def _load_regs_increment_x(self, operands):
+        """
+        Fx65 - LD Vx, [I] (CHIP-48)
+        Fills V0 to VX with values from memory starting at address I. I is then set to I + x.
+        """
+
+        self._load_regs_keep_i(operands)
+        self._i.set(self._i.get() + ((operands & 0xF00) >> 8))
+
+    def _dump_regs_keep_i(self, operands):
+        """
+        Fx55 - LD [I], Vx (SUPER-CHIP)
+        Stores V0 to VX in memory starting at address I. I is left unchanged.
+        """
+
+        end_register = (operands & 0xF00) >> 8
+
+        for i in range(0x0, end_register + 1):
+            self._memory[self._i.get() + i] = self._v[i].get()
+
+    def _load_regs_keep_i(self, operands):
+        """
+        Fx65 - LD Vx, [I] (SUPER-CHIP)
+        Fills V0 to VX with values from memory starting at address I. I is left unchanged.
+        """
+
+        end_register = (operands & 0xF00) >> 8
+
+        for i in range(0x0, end_register + 1):
+            self._v[i].set(self._memory[self._i.get() + i])
@@ -0,0 +1,327 @@
+from core.chip8 import Chip8
+from core.rom import Rom
+from core.template import MachineTemplate
+
+from concurrent.futures import ProcessPoolExecutor
+
+import argparse
+import glob
+import json
+import os
+import random
+
+import numpy
+
+VERSION = 1
+
+def sample_dtype(width, height, memory_size):
+    """
+    One sample: the packed framebuffer (8 pixels per byte, 256 bytes at 64x32), the key state held during the step,
+    the recorded memory bytes, and where the sample comes from.
+    """
+
+    return numpy.dtype([
+        ('frame', numpy.uint8, (height, width // 8)),
+        ('keys', numpy.uint16),
+        ('memory', numpy.uint8, (memory_size,)),
+        ('episode', numpy.uint32),
+        ('step', numpy.uint32),
+    ])
+
+def _memory_size(ranges):
+    return sum(end - start for start, end in ranges)
+
+class DatasetWriter:
+    """
+    Appends samples to a dataset directory in fixed size chunks, one memory-mapped .npy file per chunk, so only the
+    chunk being written is ever mapped.
+
+    Every writer (one per worker process) writes its own chunks and its own index file (index-<worker>.jsonl): a
+    line is appended when a chunk is sealed, chunks being renamed into place before. Readers only ever see complete
+    chunks, and workers never share a file.
+    """
+
+    def __init__(self, path, worker=0, width=64, height=32, memory=(), chunk_size=65536):
+        self.path       = path
+        self.worker     = worker
+        self.width      = width
+        self.height     = height
+        self.memory     = [tuple(r) for r in memory]
+        self.chunk_size = chunk_size
+
+        self._dtype  = sample_dtype(width, height, _memory_size(self.memory))
+        self._chunk  = None
+        self._count  = 0
+        self._chunks = 0
+
+        self.samples = 0
+
+        os.makedirs(path, exist_ok=True)
+        _write_meta(path, width, height, self.memory, chunk_size)
+
+    def append(self, machine, keys, episode, step):
+        if self._chunk is None:
+            self._open_chunk()
+
+        sample = self._chunk[self._count]
+        sample['frame'] = numpy.frombuffer(
+            machine.display.to_bytes(self.width, self.height), dtype=numpy.uint8
+        ).reshape(self.height, self.width // 8)
+        sample['keys'] = keys
+        sample['episode'] = episode
+        sample['step'] = step
+
+        if self.memory:
+            buffer = machine.memory._buffer
+            memory = sample['memory']
+            offset = 0
+
+            for start, end in self.memory:
+                memory[offset:offset + end - start] = buffer[start:end]
+                offset += end - start
+
+        self._count += 1
+        self.samples += 1
+
+        if self._count == self.chunk_size:
+            self._seal()
+
+    def close(self):
+        if self._chunk is not None:
+            self._seal()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _name(self):
+        return f"chunk-{self.worker:03d}-{self._chunks:06d}.npy"
+
+    def _open_chunk(self):
+        path = os.path.join(self.path, self._name() + '.partial')
+
+        self._chunk = numpy.lib.format.open_memmap(path, mode='w+', dtype=self._dtype, shape=(self.chunk_size,))
+        self._count = 0
+
+    def _seal(self):
+        name = self._name()
+
+        self._chunk.flush()
+        self._chunk = None
+
+        os.replace(os.path.join(self.path, name + '.partial'), os.path.join(self.path, name))
+
+        with open(os.path.join(self.path, f"index-{self.worker:03d}.jsonl"), 'a') as f:
+            f.write(json.dumps({'chunk': name, 'count': self._count}) + "\n")
+
+        self._chunks += 1
+        self._count = 0
+
+def _write_meta(path, width, height, memory, chunk_size):
+    meta = {'version': VERSION, 'width': width, 'height': height, 'memory': memory, 'chunk_size': chunk_size}
+    meta_path = os.path.join(path, 'meta.json')
+
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            existing = json.load(f)
+
+        existing['memory'] = [tuple(r) for r in existing['memory']]
+        meta['memory'] = [tuple(r) for r in memory]
+
+        if existing != meta:
+            raise ValueError(f"Dataset [{path}] was written with other settings: {existing}")
+
+        return
+
+    partial = f"{meta_path}.{os.getpid()}.partial"
+
+    with open(partial, 'w') as f:
+        json.dump(meta, f)
+
+    # Several workers may create the dataset at once: they all write the same settings, the last rename wins
+    os.replace(partial, meta_path)
+
+class Dataset:
+    """
+    Read side: the sealed chunks listed by the index files, memory-mapped read-only on access.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+
+        self.width  = meta['width']
+        self.height = meta['height']
+        self.memory = [tuple(r) for r in meta['memory']]
+
+        self.chunks = []
+
+        for index in sorted(glob.glob(os.path.join(path, 'index-*.jsonl'))):
+            with open(index) as f:
+                self.chunks.extend((entry['chunk'], entry['count']) for entry in map(json.loads, f) if entry)
+
+        self._offsets = numpy.cumsum([0] + [count for _, count in self.chunks])
+        self._mapped = {}
+
+    def __len__(self):
+        return int(self._offsets[-1])
+
+    def chunk(self, n):
+        """
+        Samples of the n-th chunk, a read-only memory-mapped structured array.
+        """
+
+        name, count = self.chunks[n]
+
+        if name not in self._mapped:
+            self._mapped[name] = numpy.load(os.path.join(self.path, name), mmap_mode='r')[:count]
+
+        return self._mapped[name]
+
+    def __iter__(self):
+        for n in range(0, len(self.chunks)):
+            yield self.chunk(n)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+
+        n = int(numpy.searchsorted(self._offsets, index, side='right')) - 1
+
+        return self.chunk(n)[index - self._offsets[n]]
+
+    @staticmethod
+    def unpack(frames):
+        """
+        Packed frames (..., height, width / 8) as pixels (..., height, width) of 0/1.
+        """
+
+        return numpy.unpackbits(frames, axis=-1)
+
+def random_keys(rng, keys, step):
+    """
+    Default policy: keep the held key state, switching to no key or a single random key now and then.
+    """
+
+    if rng.random() < 0.1:
+        return rng.choice([0, 1 << rng.randrange(0, 16)])
+
+    return keys
+
+def _record_worker(job):
+    rom, path, worker, episodes, options = job
+
+    template = MachineTemplate(rom, Chip8.FONT, Chip8.STARTING_ADDRESS, compiled=options['compiled'])
+    machine = Chip8(
+        compiled=options['compiled'], headless=True, cycles_per_frame=options['cycles_per_frame'],
+        quirks=options['quirks']
+    )
+    machine.use_template(template)
+
+    policy = options['policy']
+
+    with DatasetWriter(
+        path, worker, options['width'], options['height'], options['memory'], options['chunk_size']
+    ) as writer:
+        for episode in episodes:
+            rng = random.Random(options['seed'] * 1000003 + episode)
+            machine.reset(options['seed'] + episode)
+            keys = 0
+
+            for step in range(0, options['steps']):
+                keys = policy(rng, keys, step)
+                machine.keypad.set_state(keys)
+
+                try:
+                    for _ in range(0, options['frame_skip']):
+                        machine.frame()
+                except Exception:
+                    # The machine crashed, the episode is over
+                    break
+
+                writer.append(machine, keys, episode, step)
+
+        return writer.samples
+
+def record(rom, path, episodes, steps, workers=1, seed=0, frame_skip=4, memory=(), width=64, height=32,
+           chunk_size=65536, policy=random_keys, compiled=True, cycles_per_frame=Chip8.CYCLES_PER_FRAME,
+           quirks='modern'):
+    """
+    Run episodes headless episodes of steps steps spread over workers processes, appending every step into the
+    dataset at path. policy(rng, keys, step) returns the key state of the step (picklable with workers > 1).
+    Returns the number of samples written.
+    """
+
+    rom = rom if isinstance(rom, Rom) else Rom.from_file(rom)
+
+    options = {
+        'steps': steps, 'seed': seed, 'frame_skip': frame_skip, 'memory': [tuple(r) for r in memory],
+        'width': width, 'height': height, 'chunk_size': chunk_size, 'policy': policy, 'compiled': compiled,
+        'cycles_per_frame': cycles_per_frame, 'quirks': quirks,
+    }
+
+    # Workers appending to an existing dataset continue after its workers
+    first_worker = _next_worker(path)
+    jobs = [
+        (rom, path, first_worker + worker, list(range(worker, episodes, workers)), options)
+        for worker in range(0, min(workers, episodes))
+    ]
+
+    if workers == 1:
+        return sum(map(_record_worker, jobs))
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return sum(executor.map(_record_worker, jobs))
+
+def _next_worker(path):
+    """
+    Worker number after the highest one of the chunks and index files in path: a worker that wrote no sample has
+    no index file, but may have left chunk files.
+    """
+
+    workers = [
+        int(name.split('-')[1].split('.')[0]) for name in os.listdir(path)
+        if name.startswith(('chunk-', 'index-'))
+    ] if os.path.isdir(path) else []
+
+    return max(workers) + 1 if workers else 0
+
+def _memory_range(value):
+    start, end = value.split(':')
+
+    return int(start, 0), int(end, 0)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.dataset", description="Record training samples")
+    parser.add_argument('rom')
+    parser.add_argument('path', help="dataset directory, appended to when it exists")
+    parser.add_argument('--episodes', type=int, default=100)
+    parser.add_argument('--steps', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--frame-skip', type=int, default=4)
+    parser.add_argument('--memory', type=_memory_range, action='append', default=[], metavar='START:END',
+                        help="memory range recorded with every sample, e.g. 0x300:0x310 (repeatable)")
+    parser.add_argument('--width', type=int, default=64)
+    parser.add_argument('--height', type=int, default=32)
+    parser.add_argument('--chunk-size', type=int, default=65536)
+    parser.add_argument('--quirks', default='modern')
+    args = parser.parse_args(argv)
+
+    samples = record(
+        args.rom, args.path, args.episodes, args.steps, args.workers, args.seed, args.frame_skip, args.memory,
+        args.width, args.height, args.chunk_size, quirks=args.quirks
+    )
+
+    dataset = Dataset(args.path)
+    print(f"{samples} samples written, {len(dataset)} samples in {len(dataset.chunks)} chunks")
+
+if __name__ == '__main__':
+    main()
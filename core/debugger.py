@@ -0,0 +1,479 @@
+from core.chip8 import Chip8
+from core.memory import ObservedMemory
+from core import disasm
+from core import quirks
+
+from collections import deque
+
+import argparse
+import cmd
+import operator
+import re
+
+_OPERATORS = {
+    '==': operator.eq, '!=': operator.ne, '<=': operator.le, '>=': operator.ge, '<': operator.lt, '>': operator.gt,
+}
+
+_CONDITION = re.compile(r'^\s*(V[0-9A-F]|I|PC|SP)\s*(==|!=|<=|>=|<|>)\s*(0x[0-9A-F]+|\d+)\s*$', re.IGNORECASE)
+
+class Condition:
+    """
+    Register condition such as "V3 == 0x10", "I >= 0x300" or "SP > 2".
+    """
+
+    def __init__(self, expression):
+        match = _CONDITION.match(expression)
+
+        if match is None:
+            raise ValueError(f"Invalid condition [{expression}], expected <V0-VF|I|PC|SP> <op> <value>")
+
+        self.expression = expression.strip()
+        self._register  = match.group(1).upper()
+        self._operator  = _OPERATORS[match.group(2)]
+        self._value     = int(match.group(3), 0)
+
+    def __call__(self, cpu):
+        register = self._register
+
+        if register == 'I':
+            value = cpu._i.get()
+        elif register == 'PC':
+            value = cpu._pc
+        elif register == 'SP':
+            value = cpu._sp
+        else:
+            value = cpu._v[int(register[1], 16)].get()
+
+        return self._operator(value, self._value)
+
+    def __repr__(self):
+        return self.expression
+
+class Debugger:
+    """
+    Breakpoints, watchpoints and register conditions over a Chip8 machine.
+
+    Without any of them, cont() runs whole frames through the normal (compiled) loop. Breakpoints and conditions
+    only add a set lookup and the condition checks per instruction, memory is switched to ObservedMemory only while
+    cont() runs with watchpoints or while stepping, and is switched back afterwards.
+
+    Every instruction executed by step(), step_over() and step_out() is recorded (registers, display and the memory
+    writes it made) so that reverse() can undo it, up to history instructions back. cont() clears the history.
+
+    On a compiled machine, memory is observed whenever the debugger executes instructions itself, and every write
+    (reverse() ones included) invalidates the compiled blocks it overlaps, as the Executor does.
+    """
+
+    def __init__(self, machine, history=10000):
+        self.machine = machine
+
+        self.breakpoints = set()
+        self.watchpoints = []   # [(start, end)]
+        self.conditions  = []
+
+        self._cpu     = machine.cpu
+        self._memory  = machine.memory
+        self._display = machine.display
+
+        # Instructions executed in the current frame
+        self._cycle = 0
+
+        self._history = deque(maxlen=history)
+        self._writes  = None
+        self._hit     = None
+
+    # Breakpoints
+
+    def break_at(self, address):
+        self.breakpoints.add(address)
+
+    def delete(self, address):
+        self.breakpoints.discard(address)
+
+    def watch(self, start, end=None):
+        """
+        Stop after an instruction writes memory in [start, end).
+        """
+
+        self.watchpoints.append((start, end if end is not None else start + 1))
+
+    def unwatch(self, start):
+        self.watchpoints = [(s, e) for s, e in self.watchpoints if s != start]
+
+    def when(self, expression):
+        condition = Condition(expression)
+        self.conditions.append(condition)
+
+        return condition
+
+    # Execution
+
+    def step(self):
+        """
+        Execute one instruction, returns why execution should stop after it (see cont()), None otherwise.
+        """
+
+        self._observe()
+
+        try:
+            return self._step()
+        finally:
+            self._unobserve()
+
+    def step_over(self):
+        """
+        Step, running a whole subroutine when the instruction is a CALL.
+        """
+
+        pc = self._cpu._pc
+        instruction = disasm.decode(pc, self._memory[pc] << 8 | self._memory[pc + 1])
+
+        if instruction.handler not in disasm.CALLS:
+            return self.step()
+
+        sp = self._cpu._sp
+
+        return self._run_instrumented(lambda cpu: cpu._pc == pc + 2 and cpu._sp == sp)
+
+    def step_out(self):
+        """
+        Run until the current subroutine returns.
+        """
+
+        sp = self._cpu._sp
+
+        if sp == 0:
+            return self.step()
+
+        return self._run_instrumented(lambda cpu: cpu._sp < sp)
+
+    def reverse(self):
+        """
+        Undo the last recorded instruction, returns False when there is no history left.
+        """
+
+        if not self._history:
+            return False
+
+        cpu_state, display_state, cycle, writes = self._history.pop()
+
+        # Undo the writes, newest first
+        for address, old in reversed(writes):
+            self._memory[address] = old
+            self._invalidate(address)
+
+        self._cpu.restore(cpu_state)
+        self._display.restore(display_state)
+        self._cycle = cycle
+
+        return True
+
+    def cont(self, frames=None):
+        """
+        Run until a breakpoint, watchpoint or condition stops execution, or for at most frames frames.
+
+        Returns ('breakpoint', address), ('watchpoint', address, old, new), ('condition', condition) or None.
+        """
+
+        self._history.clear()
+
+        if not self.breakpoints and not self.watchpoints and not self.conditions:
+            if self.machine._executor is not None:
+                self._observe()
+
+            try:
+                self._finish_frame()
+            finally:
+                if self.machine._executor is not None:
+                    self._unobserve()
+
+            frame = 0
+
+            while frames is None or frame < frames:
+                self.machine.frame()
+                frame += 1
+
+            return None
+
+        instructions = None if frames is None else frames * self.machine.cycles_per_frame - self._cycle
+
+        observed = self.watchpoints or self.machine._executor is not None
+
+        if observed:
+            self._observe()
+
+        try:
+            return self._run(instructions)
+        finally:
+            if observed:
+                self._unobserve()
+
+    @property
+    def history(self):
+        return len(self._history)
+
+    # Internals
+
+    def _run_instrumented(self, done):
+        cpu = self._cpu
+
+        self._observe()
+
+        try:
+            while True:
+                reason = self._step()
+
+                if reason is not None or done(cpu):
+                    return reason
+        finally:
+            self._unobserve()
+
+    def _run(self, instructions):
+        """
+        Plain interpreter loop checking the stops after every instruction, nothing is recorded.
+        """
+
+        cpu = self._cpu
+        tick = cpu.tick
+        breakpoints = self.breakpoints
+        conditions = self.conditions
+        cycles_per_frame = self.machine.cycles_per_frame
+        count = 0
+
+        while instructions is None or count < instructions:
+            self._hit = None
+            tick()
+            count += 1
+
+            self._cycle += 1
+
+            if self._cycle == cycles_per_frame:
+                self.machine._end_frame()
+                self._cycle = 0
+
+            if self._hit is not None:
+                return self._hit
+
+            for condition in conditions:
+                if condition(cpu):
+                    return ('condition', condition)
+
+            if cpu._pc in breakpoints:
+                return ('breakpoint', cpu._pc)
+
+        return None
+
+    def _step(self):
+        cpu = self._cpu
+
+        self._writes = []
+        self._hit = None
+        state = (cpu.snapshot(), self._display.snapshot(), self._cycle)
+
+        cpu.tick()
+
+        self._history.append(state + (self._writes,))
+        self._writes = None
+
+        self._cycle += 1
+
+        if self._cycle == self.machine.cycles_per_frame:
+            self.machine._end_frame()
+            self._cycle = 0
+
+        if self._hit is not None:
+            return self._hit
+
+        for condition in self.conditions:
+            if condition(cpu):
+                return ('condition', condition)
+
+        if cpu._pc in self.breakpoints:
+            return ('breakpoint', cpu._pc)
+
+        return None
+
+    def _finish_frame(self):
+        while self._cycle:
+            self._cpu.tick()
+            self._cycle += 1
+
+            if self._cycle == self.machine.cycles_per_frame:
+                self.machine._end_frame()
+                self._cycle = 0
+
+    def _observe(self):
+        ObservedMemory.observe(self._memory, self._on_write)
+
+    def _unobserve(self):
+        ObservedMemory.unobserve(self._memory)
+
+    def _invalidate(self, address):
+        executor = self.machine._executor
+
+        if executor is not None:
+            executor.written(address, address + 1)
+
+    def _on_write(self, address, old, new):
+        self._invalidate(address)
+
+        if self._writes is not None:
+            self._writes.append((address, old))
+
+        if self._hit is None:
+            for start, end in self.watchpoints:
+                if start <= address < end:
+                    self._hit = ('watchpoint', address, old, new)
+                    break
+
+class DebuggerShell(cmd.Cmd):
+    intro  = "CHIP-8 debugger, type help or ? to list commands"
+    prompt = "(chip8) "
+
+    def __init__(self, debugger, **kwargs):
+        super().__init__(**kwargs)
+
+        self.debugger = debugger
+
+    def do_break(self, arg):
+        """break ADDRESS: stop before executing the instruction at ADDRESS"""
+        self.debugger.break_at(int(arg, 0))
+
+    def do_delete(self, arg):
+        """delete ADDRESS: remove a breakpoint"""
+        self.debugger.delete(int(arg, 0))
+
+    def do_watch(self, arg):
+        """watch START [END]: stop after a write into memory [START, END)"""
+        bounds = [int(value, 0) for value in arg.split()]
+        self.debugger.watch(*bounds)
+
+    def do_cond(self, arg):
+        """cond EXPRESSION: stop when a register condition holds, e.g. cond V3 == 0x10"""
+        try:
+            self.debugger.when(arg)
+        except ValueError as e:
+            print(e)
+
+    def do_info(self, arg):
+        """info: list breakpoints, watchpoints and conditions"""
+        debugger = self.debugger
+
+        print("breakpoints: " + " ".join(f"0x{a:03X}" for a in sorted(debugger.breakpoints)))
+        print("watchpoints: " + " ".join(f"[0x{s:03X}, 0x{e:03X})" for s, e in debugger.watchpoints))
+        print("conditions:  " + ", ".join(repr(c) for c in debugger.conditions))
+
+    def do_step(self, arg):
+        """step [N]: execute N instructions"""
+        for _ in range(int(arg, 0) if arg else 1):
+            if self._report(self.debugger.step()):
+                break
+
+        self._where()
+
+    def do_next(self, arg):
+        """next: step over subroutine calls"""
+        self._report(self.debugger.step_over())
+        self._where()
+
+    def do_finish(self, arg):
+        """finish: run until the current subroutine returns"""
+        self._report(self.debugger.step_out())
+        self._where()
+
+    def do_back(self, arg):
+        """back [N]: undo the last N instructions"""
+        for _ in range(int(arg, 0) if arg else 1):
+            if not self.debugger.reverse():
+                print("no history")
+                break
+
+        self._where()
+
+    def do_continue(self, arg):
+        """continue [FRAMES]: run until something stops execution (Ctrl-C to interrupt)"""
+        try:
+            self._report(self.debugger.cont(int(arg, 0) if arg else None))
+        except KeyboardInterrupt:
+            print("interrupted")
+
+        self._where()
+
+    def do_regs(self, arg):
+        """regs: print the registers"""
+        print(self.debugger.machine.cpu)
+
+    def do_mem(self, arg):
+        """mem ADDRESS [LENGTH]: dump memory"""
+        args = arg.split()
+        address = int(args[0], 0)
+        length = int(args[1], 0) if len(args) > 1 else 16
+        memory = self.debugger.machine.memory
+
+        for row in range(address, address + length, 16):
+            values = " ".join(f"{memory[a]:02X}" for a in range(row, min(row + 16, address + length)))
+            print(f"0x{row:04X}  {values}")
+
+    def do_list(self, arg):
+        """list [ADDRESS] [COUNT]: disassemble from ADDRESS (default PC)"""
+        args = arg.split()
+        memory = self.debugger.machine.memory
+        address = int(args[0], 0) if args else self.debugger.machine.cpu._pc
+        count = int(args[1], 0) if len(args) > 1 else 8
+
+        for a in range(address, address + 2 * count, 2):
+            marker = '=>' if a == self.debugger.machine.cpu._pc else '  '
+            print(f"{marker} {disasm.decode(a, memory[a] << 8 | memory[a + 1])!r}")
+
+    def do_screen(self, arg):
+        """screen: print the display"""
+        display = self.debugger.machine.display
+
+        for y in range(display.height):
+            print("".join('#' if display.pixel(x, y) else '.' for x in range(display.width)))
+
+    def do_quit(self, arg):
+        """quit: exit the debugger"""
+        return True
+
+    do_b = do_break
+    do_s = do_step
+    do_n = do_next
+    do_c = do_continue
+    do_q = do_quit
+
+    def _report(self, reason):
+        if reason is None:
+            return False
+
+        if reason[0] == 'watchpoint':
+            _, address, old, new = reason
+            print(f"watchpoint: 0x{address:03X} 0x{old:02X} -> 0x{new:02X}")
+        elif reason[0] == 'condition':
+            print(f"condition: {reason[1]!r}")
+        else:
+            print(f"breakpoint: 0x{reason[1]:03X}")
+
+        return True
+
+    def _where(self):
+        cpu = self.debugger.machine.cpu
+        memory = self.debugger.machine.memory
+
+        print(disasm.decode(cpu._pc, memory[cpu._pc] << 8 | memory[cpu._pc + 1]))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.debugger", description="Debug a ROM on a headless machine")
+    parser.add_argument('rom')
+    parser.add_argument('--quirks', choices=quirks.PROFILES, default='modern')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    machine = Chip8(compiled=False, headless=True, quirks=args.quirks)
+    machine.load(args.rom)
+    machine.reset(args.seed)
+
+    DebuggerShell(Debugger(machine)).cmdloop()
+
+if __name__ == '__main__':
+    main()
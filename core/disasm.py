@@ -0,0 +1,401 @@
+from core.cache import cache_dir, write_atomic, record as record_cache
+from core.cpu import Cpu
+from core.exceptions import UnknownOpcodeError
+from core.memory import Memory
+from core.rom import Rom
+from core.version import VERSION
+
+import argparse
+import json
+import logging
+import os
+
+STARTING_ADDRESS = 0x200
+
+# Bumped whenever decoding or the control-flow analysis changes: cached analyses, and the compiled blocks cut from
+# them, are keyed on it
+ANALYSIS_VERSION = 2
+
+# Mnemonics of the Cpu handlers, formatted with the instruction fields
+MNEMONICS = {
+    '_clear_display':                   "CLS",
+    '_ret':                             "RET",
+    '_jump_to_address':                 "JP 0x{nnn:03X}",
+    '_call_subroutine':                 "CALL 0x{nnn:03X}",
+    '_skip_if_reg_equal_const':         "SE V{x:X}, 0x{kk:02X}",
+    '_skip_if_reg_not_equal_const':     "SNE V{x:X}, 0x{kk:02X}",
+    '_skip_if_reg_equal_reg':           "SE V{x:X}, V{y:X}",
+    '_save_regs_range':                 "LD [I], V{x:X}-V{y:X}",
+    '_load_regs_range':                 "LD V{x:X}-V{y:X}, [I]",
+    '_set_reg_to_const':                "LD V{x:X}, 0x{kk:02X}",
+    '_add_const_to_reg':                "ADD V{x:X}, 0x{kk:02X}",
+    '_skip_if_reg_not_equal_reg':       "SNE V{x:X}, V{y:X}",
+    '_set_i_to_address':                "LD I, 0x{nnn:03X}",
+    '_jump_to_address_plus_v0':         "JP V0, 0x{nnn:03X}",
+    '_jump_to_address_plus_vx':         "JP V{x:X}, 0x{nnn:03X}",
+    '_set_reg_to_xor_rand_and_const':   "RND V{x:X}, 0x{kk:02X}",
+    '_draw_sprite':                     "DRW V{x:X}, V{y:X}, {n}",
+    '_draw_sprite_16':                  "DRW V{x:X}, V{y:X}, 0",
+    '_scroll_down':                     "SCD {n}",
+    '_scroll_up':                       "SCU {n}",
+    '_scroll_right':                    "SCR",
+    '_scroll_left':                     "SCL",
+    '_low_resolution':                  "LOW",
+    '_high_resolution':                 "HIGH",
+    '_skip_if_key_pressed':             "SKP V{x:X}",
+    '_skip_if_key_not_pressed':         "SKNP V{x:X}",
+    '_mov_reg_to_reg':                  "LD V{x:X}, V{y:X}",
+    '_bitwise_or':                      "OR V{x:X}, V{y:X}",
+    '_bitwise_and':                     "AND V{x:X}, V{y:X}",
+    '_bitwise_xor':                     "XOR V{x:X}, V{y:X}",
+    '_bitwise_or_reset_vf':             "OR V{x:X}, V{y:X}",
+    '_bitwise_and_reset_vf':            "AND V{x:X}, V{y:X}",
+    '_bitwise_xor_reset_vf':            "XOR V{x:X}, V{y:X}",
+    '_add_reg_to_reg':                  "ADD V{x:X}, V{y:X}",
+    '_sub_reg_to_reg':                  "SUB V{x:X}, V{y:X}",
+    '_right_shift':                     "SHR V{x:X}, V{y:X}",
+    '_right_shift_vy':                  "SHR V{x:X}, V{y:X}",
+    '_sub_reg_to_reg_inv':              "SUBN V{x:X}, V{y:X}",
+    '_left_shift':                      "SHL V{x:X}, V{y:X}",
+    '_left_shift_vy':                   "SHL V{x:X}, V{y:X}",
+    '_mov_delay_to_reg':                "LD V{x:X}, DT",
+    '_wait_for_key_press':              "LD V{x:X}, K",
+    '_set_delay_to_reg':                "LD DT, V{x:X}",
+    '_set_sound_to_reg':                "LD ST, V{x:X}",
+    '_add_reg_to_i':                    "ADD I, V{x:X}",
+    '_mov_reg_sprite_addr_to_i':        "LD F, V{x:X}",
+    '_mov_reg_to_bcd':                  "LD B, V{x:X}",
+    '_dump_regs':                       "LD [I], V{x:X}",
+    '_load_regs':                       "LD V{x:X}, [I]",
+    '_load_i_long':                     "LD I, long",
+    '_select_planes':                   "PLANE {x}",
+    '_load_audio_pattern':              "AUDIO",
+    '_set_pitch':                       "PITCH V{x:X}",
+    '_dump_regs_increment_x':           "LD [I], V{x:X}",
+    '_load_regs_increment_x':           "LD V{x:X}, [I]",
+    '_dump_regs_keep_i':                "LD [I], V{x:X}",
+    '_load_regs_keep_i':                "LD V{x:X}, [I]",
+}
+
+# Control flow handlers, by kind
+JUMPS           = {'_jump_to_address'}
+CALLS           = {'_call_subroutine'}
+RETURNS         = {'_ret'}
+COMPUTED_JUMPS  = {'_jump_to_address_plus_v0', '_jump_to_address_plus_vx'}
+SKIPS           = {
+    '_skip_if_reg_equal_const', '_skip_if_reg_not_equal_const', '_skip_if_reg_equal_reg',
+    '_skip_if_reg_not_equal_reg', '_skip_if_key_pressed', '_skip_if_key_not_pressed',
+}
+WAITS           = {'_wait_for_key_press'}
+# Instructions followed by a 16-bit operand word
+LONG            = {'_load_i_long'}
+
+_decoder = Cpu(Memory(0x10), None, delay_timer=None, sound_timer=None)
+
+class Instruction:
+    def __init__(self, address, word, handler):
+        self.address = address
+        self.word    = word
+        self.handler = handler  # Name of the Cpu handler, None when the word is not a valid instruction
+
+    @property
+    def mnemonic(self):
+        if self.handler is None:
+            return f"DW 0x{self.word:04X}"
+
+        fields = {
+            'nnn': self.word & 0x0FFF,
+            'kk':  self.word & 0x00FF,
+            'n':   self.word & 0x000F,
+            'x':   (self.word & 0x0F00) >> 8,
+            'y':   (self.word & 0x00F0) >> 4,
+        }
+
+        if self.handler not in MNEMONICS:
+            return f"{self.handler}(0x{self.word & 0x0FFF:03X})"
+
+        return MNEMONICS[self.handler].format(**fields)
+
+    def successors(self, next_word=None):
+        """
+        Statically known (address, kind) successors, None when execution falls through to the next instruction.
+
+        next_word is the word after the instruction: a skip jumps over F000 nnnn (XO-CHIP) as a whole.
+        """
+
+        name = self.handler
+        next = self.address + 2
+
+        if name in JUMPS:
+            return [(self.word & 0x0FFF, 'jump')]
+        if name in CALLS:
+            return [(self.word & 0x0FFF, 'call'), (next, 'return')]
+        if name in RETURNS or name in COMPUTED_JUMPS:
+            return []
+        if name in SKIPS:
+            return [(next, 'next'), (next + 4 if next_word == 0xF000 else next + 2, 'skip')]
+        if name in WAITS:
+            return [(self.address, 'wait'), (next, 'next')]
+        if name in LONG:
+            return [(next + 2, 'next')]
+
+        return None
+
+    def __repr__(self):
+        return f"0x{self.address:03X}  {self.word:04X}  {self.mnemonic}"
+
+def decode(address, word):
+    try:
+        handler, _ = _decoder._decode(word)
+    except UnknownOpcodeError:
+        return Instruction(address, word, None)
+
+    return Instruction(address, word, handler.__name__)
+
+def disassemble(data, start=STARTING_ADDRESS):
+    """
+    Linear sweep over data, every word decoded as an instruction.
+    """
+
+    return [
+        decode(start + offset, data[offset] << 8 | data[offset + 1])
+        for offset in range(0, len(data) - 1, 2)
+    ]
+
+class Block:
+    def __init__(self, start):
+        self.start        = start
+        self.instructions = []  # [(address, instruction)]
+
+    @property
+    def end(self):
+        return self.start + 2 * len(self.instructions)
+
+    def __len__(self):
+        return len(self.instructions)
+
+class Analysis:
+    """
+    Reachable code of a ROM and its control-flow graph.
+
+    - code:     {address: Instruction} reachable from start
+    - blocks:   basic blocks of the reachable code, sorted by address
+    - edges:    [(from, to, kind)] control flow transfers, kind in jump/call/return/next/skip/wait
+    - sprites:  {address: size} sprite data (bytes) drawn with a statically known I
+    """
+
+    def __init__(self, rom, start, code, leaders, edges, sprites):
+        self.rom     = rom
+        self.start   = start
+        self.code    = code
+        self.edges   = edges
+        self.sprites = sprites
+        self.blocks  = _cut_blocks(code, leaders)
+
+    @property
+    def end(self):
+        return self.start + len(self.rom)
+
+    def subroutines(self):
+        return sorted({to for _, to, kind in self.edges if kind == 'call'})
+
+    def labels(self):
+        labels = {self.start: 'start'}
+
+        for _, to, kind in self.edges:
+            if kind == 'jump':
+                labels.setdefault(to, f"L{to:03X}")
+
+        for address in self.subroutines():
+            labels[address] = f"sub_{address:03X}"
+
+        return labels
+
+    def kind(self, address):
+        """
+        What the byte at address is: code, sprite or data.
+        """
+
+        if address in self.code or address - 1 in self.code:
+            return 'code'
+
+        for sprite, height in self.sprites.items():
+            if sprite <= address < sprite + height:
+                return 'sprite'
+
+        return 'data'
+
+    def listing(self):
+        labels = self.labels()
+        lines = []
+        address = self.start
+
+        while address < self.end:
+            if address in labels:
+                lines.append(f"{labels[address]}:")
+
+            offset = address - self.start
+
+            if address in self.code:
+                lines.append(f"    {self.code[address]!r}")
+                address += 2
+                continue
+
+            byte = self.rom.data[offset]
+
+            if self.kind(address) == 'sprite':
+                pixels = f"{byte:08b}".replace('0', '.').replace('1', '#')
+                lines.append(f"    0x{address:03X}  {byte:02X}    {pixels}")
+            else:
+                lines.append(f"    0x{address:03X}  {byte:02X}    DB 0x{byte:02X}")
+
+            address += 1
+
+        return "\n".join(lines)
+
+    def to_json(self):
+        return {
+            'start':    self.start,
+            'code':     sorted(i.address for i in self.code.values()),
+            'leaders':  sorted(block.start for block in self.blocks),
+            'edges':    self.edges,
+            'sprites':  sorted(self.sprites.items()),
+        }
+
+    @classmethod
+    def from_json(cls, rom, data):
+        start = data['start']
+        code = {
+            address: decode(address, rom.data[address - start] << 8 | rom.data[address - start + 1])
+            for address in data['code']
+        }
+
+        return cls(rom, start, code, set(data['leaders']), [tuple(edge) for edge in data['edges']], dict(data['sprites']))
+
+def analyze(rom, start=STARTING_ADDRESS, cache=True):
+    """
+    Disassemble the code reachable from start and build its control-flow graph, cached by ROM hash.
+    """
+
+    path = os.path.join(cache_dir('disasm'), f"{rom.hash}-{start:03x}-{VERSION}-{ANALYSIS_VERSION}.json")
+
+    if cache and os.path.exists(path):
+        try:
+            with open(path) as f:
+                analysis = Analysis.from_json(rom, json.load(f))
+                record_cache('disasm', True)
+
+                return analysis
+        except (ValueError, KeyError):
+            logging.warning(f"Ignoring corrupted analysis cache [{path}]")
+
+    analysis = _analyze(rom, start)
+
+    if cache:
+        record_cache('disasm', False)
+        write_atomic(path, json.dumps(analysis.to_json()).encode())
+
+    return analysis
+
+def _analyze(rom, start):
+    end = start + len(rom.data)
+
+    def fetch(address):
+        if address < start or address + 1 >= end:
+            return None
+
+        instruction = decode(address, rom.data[address - start] << 8 | rom.data[address - start + 1])
+
+        return instruction if instruction.handler is not None else None
+
+    code = {}
+    leaders = {start}
+    edges = []
+    sprites = {}
+    pending = [start]
+
+    while pending:
+        address = pending.pop()
+        # Value of I when it is known statically, to find the sprites
+        i = None
+
+        while address not in code:
+            instruction = fetch(address)
+
+            if instruction is None:
+                break
+
+            code[address] = instruction
+
+            if instruction.handler == '_set_i_to_address':
+                i = instruction.word & 0x0FFF
+            elif instruction.handler == '_load_i_long':
+                i = _word_after(rom, start, address)
+            elif instruction.handler in ('_draw_sprite', '_draw_sprite_16'):
+                height = instruction.word & 0x000F or 32
+
+                if i is not None and i >= start:
+                    sprites[i] = max(sprites.get(i, 0), height)
+            elif instruction.handler in ('_add_reg_to_i', '_mov_reg_sprite_addr_to_i', '_dump_regs', '_load_regs'):
+                i = None
+
+            successors = instruction.successors(_word_after(rom, start, address))
+
+            if successors is None:
+                address += 2
+                continue
+
+            for to, kind in successors:
+                edges.append((address, to, kind))
+                leaders.add(to)
+                pending.append(to)
+
+            break
+
+    return Analysis(rom, start, code, leaders, edges, sprites)
+
+def _word_after(rom, start, address):
+    offset = address + 2 - start
+
+    return rom.data[offset] << 8 | rom.data[offset + 1] if offset + 1 < len(rom.data) else None
+
+def _cut_blocks(code, leaders):
+    blocks = []
+
+    for leader in sorted(leaders):
+        if leader not in code:
+            continue
+
+        block = Block(leader)
+        address = leader
+
+        while address in code:
+            instruction = code[address]
+            block.instructions.append((address, instruction.word))
+
+            if instruction.successors() is not None or address + 2 in leaders:
+                break
+
+            address += 2
+
+        blocks.append(block)
+
+    return blocks
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.disasm", description="Disassemble a ROM")
+    parser.add_argument('rom')
+    parser.add_argument('--linear', action='store_true', help="decode every word instead of following the control flow")
+    args = parser.parse_args(argv)
+
+    rom = Rom.from_file(args.rom)
+
+    if args.linear:
+        for instruction in disassemble(rom.data):
+            print(instruction)
+        return
+
+    print(analyze(rom).listing())
+
+if __name__ == '__main__':
+    main()
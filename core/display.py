@@ -1,59 +1,44 @@
+from core.framebuffer import FrameBuffer
+
+import numpy
 import pygame
 import pygame.display
-import pygame.draw
+import pygame.surfarray
+import pygame.transform
+
+class Display(FrameBuffer):
+    # Colors of the plane combinations: none, plane 0, plane 1, both
+    PALETTE = numpy.array([(0, 0, 0), (255, 255, 255), (170, 170, 170), (85, 85, 85)], dtype=numpy.uint8)
 
-class Display:
-    def __init__(self, width, height, scaling=10):
-        self._width     = width
-        self._height    = height
-        self._scaling   = scaling
+    def __init__(self, width, height, scaling=10, max_width=None, max_height=None):
+        super().__init__(width, height, max_width, max_height)
 
-        self._screen = [[0] * height for _ in range(0, width)]
+        self._scaling = scaling
 
         self._surface = pygame.display.set_mode(
             size=(self._width * self._scaling, self._height * self._scaling),
             flags=pygame.HWSURFACE | pygame.DOUBLEBUF
         )
 
-    def draw(self, x, y, bytes):
-        collided = False
-
-        for line in range(len(bytes)):
-            for col in range(8):
-                state = (bytes[line] & (1 << (7 - col))) >> (7 - col)
-
-                collided |= self._draw_pixel(x + col, y + line, state)
+    def set_resolution(self, width, height):
+        # Keep the window, only the size of a pixel changes
+        self._scaling = self._surface.get_width() // width
 
-        return collided
-
-    def clear(self):
-        for x in range(self._width):
-            for y in range(self._height):
-                self._screen[x][y] = 0
+        super().set_resolution(width, height)
 
     def render(self):
-        self._surface.fill((0, 0, 0))
-
-        for x in range(self._width):
-            for y in range(self._height):
-                if self._screen[x][y]:
-                    pygame.draw.rect(
-                        self._surface,
-                        (255, 255, 255),
-                        (
-                            (x * self._scaling, y * self._scaling),
-                            (self._scaling, self._scaling)
-                        )
-                    )
+        # Composite the planes into palette indices (plane 0 is bit 0), then scale the frame up to the window
+        indices = self._plane_pixels(0) | (self._plane_pixels(1) << 1)
+        pixels = self.PALETTE[indices.T]
 
-        pygame.display.flip()
+        frame = pygame.surfarray.make_surface(pixels)
+        pygame.transform.scale(frame, (self._width * self._scaling, self._height * self._scaling), self._surface)
 
-    def _draw_pixel(self, x, y, state):
-        x_wrap = x % self._width
-        y_wrap = y % self._height
+        pygame.display.flip()
 
-        collided = not (state ^ self._screen[x_wrap][y_wrap])
+        super().render()
 
-        self._screen[x_wrap][y_wrap] ^= state
+    def _plane_pixels(self, plane):
+        data = numpy.frombuffer(self.to_bytes(plane=plane), dtype=numpy.uint8)
 
-        return collided
+        return numpy.unpackbits(data).reshape(self._height, self._width)
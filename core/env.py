@@ -0,0 +1,292 @@
+from core.chip8 import Chip8
+from core.rom import Rom
+from core.template import MachineTemplate
+
+from multiprocessing import shared_memory
+
+import multiprocessing
+import numpy
+
+# Row of 8 pixels (0/1) for every packed byte value
+_UNPACK = numpy.unpackbits(numpy.arange(256, dtype=numpy.uint8)[:, None], axis=1)
+
+class Chip8Env:
+    """
+    Vector of headless machines stepped in lockstep, Gym style.
+
+    Observations are a single preallocated array, refreshed in place by reset() and step(): (num_envs, height, width)
+    pixels (0/1) or, with packed=True, (num_envs, height, width / 8) bytes with 8 pixels per byte.
+
+    Frames are observed at width x height, use 128 x 64 for SUPER-CHIP ROMs: low resolution frames are then scaled
+    up.
+
+    Actions are 16-bit key states, bit k set when key k is held during the step.
+
+    With shards > 0, the machines are spread over that many worker processes which write their frames into shared
+    memory, rewards callable must then be picklable.
+    """
+
+    def __init__(self, rom, num_envs=1, frame_skip=4, packed=False, reward=None, shards=0,
+                 cycles_per_frame=Chip8.CYCLES_PER_FRAME, compiled=True, width=64, height=32, quirks='modern'):
+        self._rom = rom if isinstance(rom, Rom) else Rom.from_file(rom)
+
+        self.num_envs   = num_envs
+        self.frame_skip = frame_skip
+        self.packed     = packed
+
+        self._options = {
+            'frame_skip': frame_skip,
+            'reward': reward,
+            'cycles_per_frame': cycles_per_frame,
+            'compiled': compiled,
+            'quirks': quirks,
+        }
+
+        shape = (num_envs, height, width // 8)
+
+        self._shm       = None
+        self._shards    = []
+        self._processes = []
+
+        if shards:
+            self._shm = shared_memory.SharedMemory(create=True, size=int(numpy.prod(shape)))
+            self._frames = numpy.ndarray(shape, dtype=numpy.uint8, buffer=self._shm.buf)
+            self._start_shards(shards, shape)
+        else:
+            self._frames = numpy.zeros(shape, dtype=numpy.uint8)
+            self._batch = _Batch(self._rom, range(0, num_envs), self._frames, self._options)
+
+        self._rewards = numpy.zeros(num_envs, dtype=numpy.float32)
+        self._dones   = numpy.zeros(num_envs, dtype=bool)
+        self._infos   = {'errors': {}}
+
+        if packed:
+            self._observations = self._frames
+        else:
+            self._observations = numpy.zeros((num_envs, height, width), dtype=numpy.uint8)
+            # View of the observations with one row of 8 pixels per packed byte, for numpy.take(out=...)
+            self._unpacked = self._observations.reshape(num_envs, height, width // 8, 8)
+
+    def reset(self, seed=None):
+        seeds = [None if seed is None else seed + i for i in range(0, self.num_envs)]
+
+        if self._shards:
+            for connection, indices in self._shards:
+                connection.send(('reset', [seeds[i] for i in indices]))
+
+            self._receive()
+        else:
+            self._batch.reset(seeds)
+
+        self._dones[:] = False
+        self._infos['errors'].clear()
+
+        return self._observe()
+
+    def step(self, actions):
+        """
+        Run frame_skip frames on every machine with the given key states, returns (observations, rewards, dones, infos).
+        """
+
+        if self._shards:
+            for connection, indices in self._shards:
+                connection.send(('step', [int(actions[i]) for i in indices]))
+
+            for (_, indices), (rewards, dones, errors) in zip(self._shards, self._receive()):
+                self._rewards[indices] = rewards
+                self._dones[indices] = dones
+                self._infos['errors'].update(errors)
+        else:
+            self._batch.step(actions, self._rewards, self._dones, self._infos['errors'])
+
+        return self._observe(), self._rewards, self._dones, self._infos
+
+    def close(self):
+        for connection, _ in self._shards:
+            connection.send(('close', None))
+            connection.close()
+
+        for process in self._processes:
+            process.join()
+
+        self._shards = []
+
+        if self._shm is not None:
+            del self._frames
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _receive(self):
+        """
+        Replies of every shard to the last command, raises the exception a shard failed with.
+        """
+
+        replies = [connection.recv() for connection, _ in self._shards]
+
+        for error, _ in replies:
+            if error is not None:
+                raise error
+
+        return [result for _, result in replies]
+
+    def _observe(self):
+        if not self.packed:
+            numpy.take(_UNPACK, self._frames, axis=0, out=self._unpacked)
+
+        return self._observations
+
+    def _start_shards(self, shards, shape):
+        context = multiprocessing.get_context('spawn')
+
+        for indices in numpy.array_split(numpy.arange(self.num_envs), shards):
+            if not len(indices):
+                continue
+
+            parent, child = context.Pipe()
+            process = context.Process(
+                target=_shard_worker,
+                args=(child, self._shm.name, shape, self._rom, list(indices), self._options),
+                daemon=True
+            )
+            process.start()
+            child.close()
+
+            self._shards.append((parent, list(indices)))
+            self._processes.append(process)
+
+class _Batch:
+    """
+    Machines for a subset of the environments, writing their packed frames into frames[index].
+    """
+
+    def __init__(self, rom, indices, frames, options):
+        self._indices  = list(indices)
+        self._frames   = frames
+        self._options  = options
+        self._done     = []
+
+        # Machines are built once, episodes reset them from the template
+        template = MachineTemplate(rom, Chip8.FONT, Chip8.STARTING_ADDRESS, compiled=options['compiled'])
+        self._machines = []
+
+        for _ in self._indices:
+            machine = Chip8(
+                compiled=options['compiled'], headless=True,
+                cycles_per_frame=options['cycles_per_frame'], quirks=options['quirks']
+            )
+            machine.use_template(template)
+
+            self._machines.append(machine)
+
+        # Flat byte views of the machines' frames rows, and the (digest, width) of the frame last written there
+        self._views   = [memoryview(frames[index]).cast('B') for index in self._indices]
+        self._written = [None] * len(self._machines)
+
+    def reset(self, seeds):
+        for n, (index, machine, seed) in enumerate(zip(self._indices, self._machines, seeds)):
+            machine.reset(seed)
+            self._written[n] = None
+            self._write_frame(n, machine)
+
+        self._done = [False] * len(self._machines)
+
+    def step(self, actions, rewards, dones, errors):
+        """
+        Step the machines, actions and outputs are indexed by environment index.
+        """
+
+        frame_skip = self._options['frame_skip']
+        reward = self._options['reward']
+
+        for n, (index, machine) in enumerate(zip(self._indices, self._machines)):
+            if self._done[n]:
+                rewards[index] = 0
+                continue
+
+            machine.keypad.set_state(int(actions[index]))
+
+            try:
+                for _ in range(0, frame_skip):
+                    machine.frame()
+            except Exception as e:
+                # The machine crashed (unknown opcode, stack overflow...): the episode is over
+                self._done[n] = True
+                errors[index] = repr(e)
+
+            rewards[index] = reward(machine) if reward is not None else 0
+            dones[index] = self._done[n]
+
+            self._write_frame(n, machine)
+
+    def close(self):
+        # Views into the frames must be released before their shared memory is closed
+        for view in self._views:
+            view.release()
+
+    def _write_frame(self, n, machine):
+        display = machine.display
+        state = (display.digest(), display.width)
+
+        # Unchanged since the last write: its frames row already holds it
+        if state == self._written[n]:
+            return
+
+        height, stride = self._frames.shape[1:]
+        display.write_into(self._views[n], stride * 8, height)
+        self._written[n] = state
+
+def _shard_worker(connection, shm_name, shape, rom, indices, options):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    frames = numpy.ndarray(shape, dtype=numpy.uint8, buffer=shm.buf)
+    batch = None
+
+    # Outputs indexed by environment index, only this shard's entries are used
+    rewards = numpy.zeros(shape[0], dtype=numpy.float32)
+    dones = numpy.zeros(shape[0], dtype=bool)
+
+    try:
+        # Every command gets an (exception, result) reply, the parent raising the exception
+        try:
+            batch = _Batch(rom, indices, frames, options)
+            failure = None
+        except Exception as e:
+            failure = e
+
+        while True:
+            command, argument = connection.recv()
+
+            if command == 'close':
+                break
+
+            if failure is not None:
+                connection.send((failure, None))
+                continue
+
+            try:
+                if command == 'reset':
+                    batch.reset(argument)
+                    result = None
+                elif command == 'step':
+                    actions = dict(zip(indices, argument))
+                    errors = {}
+
+                    batch.step(actions, rewards, dones, errors)
+                    result = (rewards[indices].tolist(), dones[indices].tolist(), errors)
+            except Exception as e:
+                connection.send((e, None))
+                continue
+
+            connection.send((None, result))
+    finally:
+        if batch is not None:
+            batch.close()
+
+        del frames
+        shm.close()
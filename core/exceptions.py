@@ -3,4 +3,12 @@ class UnknownOpcodeError(Exception):
         self.opcode = opcode
 
     def __str__(self):
-        return f"Unknown opcode 0x{self.opcode:x}"
\ No newline at end of file
+        return f"Unknown opcode 0x{self.opcode:x}"
+
+class RomTooLargeError(Exception):
+    def __init__(self, size, max_size):
+        self.size     = size
+        self.max_size = max_size
+
+    def __str__(self):
+        return f"ROM is 0x{self.size:x} bytes, at most 0x{self.max_size:x} bytes fit in memory"
\ No newline at end of file
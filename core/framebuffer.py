@@ -0,0 +1,354 @@
+_MASK64 = (1 << 64) - 1
+
+def _row_hash(y, row):
+    """
+    64-bit hash of a row, 0 for an empty row so that a cleared framebuffer hashes to 0.
+    """
+
+    if not row:
+        return 0
+
+    x = (row & _MASK64) ^ ((row >> 64) * 0xFF51AFD7ED558CCD) ^ ((y + 1) * 0x9E3779B97F4A7C15)
+    x &= _MASK64
+
+    # splitmix64 finalizer
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK64
+
+    return x ^ (x >> 31)
+
+class FrameBuffer:
+    """
+    Headless display: each row is an int bitmask, the leftmost pixel being the most significant bit.
+
+    The resolution can be switched at runtime (SUPER-CHIP hi-res) up to max_width x max_height. There are two bit
+    planes (XO-CHIP), draw, clear and scrolls only apply to the selected ones, plane 0 being the only one selected by
+    default. rows(), pixel() and to_bytes() are plane 0.
+    """
+
+    PLANES = 2
+
+    def __init__(self, width, height, max_width=None, max_height=None):
+        self._width  = width
+        self._height = height
+        self._mask   = (1 << width) - 1
+
+        self._max_width  = max_width or width
+        self._max_height = max_height or height
+        self._initial    = (width, height)
+
+        self._planes   = [[0] * height for _ in range(self.PLANES)]
+        self._rows     = self._planes[0]
+        self._selected = [0]
+        # XOR of the row hashes of every plane, updated on every row change
+        self._hash = 0
+
+        # Called with the framebuffer on every render
+        self._listeners = []
+
+        # Metrics
+        self.draw_calls = 0
+        self.collisions = 0
+        self.renders    = 0
+
+    @property
+    def width(self):
+        return self._width
+
+    @property
+    def height(self):
+        return self._height
+
+    @property
+    def max_width(self):
+        return self._max_width
+
+    @property
+    def max_height(self):
+        return self._max_height
+
+    @property
+    def selected_planes(self):
+        return self._selected
+
+    def select_planes(self, mask):
+        self._selected = [plane for plane in range(self.PLANES) if mask & (1 << plane)]
+
+    def set_resolution(self, width, height):
+        """
+        Switch the resolution, clearing every plane.
+        """
+
+        if width > self._max_width or height > self._max_height:
+            raise ValueError(f"Resolution {width}x{height} above {self._max_width}x{self._max_height}")
+
+        self._width  = width
+        self._height = height
+        self._mask   = (1 << width) - 1
+
+        self._planes = [[0] * height for _ in range(self.PLANES)]
+        self._rows   = self._planes[0]
+        self._hash   = 0
+
+    def reset(self):
+        """
+        Power-on state: initial resolution, every plane cleared, plane 0 selected.
+        """
+
+        self.set_resolution(*self._initial)
+        self._selected = [0]
+
+    def draw(self, x, y, bytes, sprite_width=8, plane=0):
+        """
+        XOR a sprite at (x, y), one sprite_width bits int per line, returns whether a pixel was erased.
+        """
+
+        width  = self._width
+        height = self._height
+        mask   = self._mask
+        rows   = self._planes[plane]
+        key    = plane << 8
+
+        # Sprite lines are placed at the left of the row then rotated right by x, which wraps them around
+        shift = width - sprite_width
+        x %= width
+        collided = False
+
+        self.draw_calls += 1
+
+        for line in range(len(bytes)):
+            if not bytes[line]:
+                continue
+
+            sprite = bytes[line] << shift
+            sprite = ((sprite >> x) | (sprite << (width - x))) & mask
+
+            row = (y + line) % height
+            old = rows[row]
+
+            if old & sprite:
+                collided = True
+
+            rows[row] = old ^ sprite
+            self._hash ^= _row_hash(key | row, old) ^ _row_hash(key | row, old ^ sprite)
+
+        if collided:
+            self.collisions += 1
+
+        return collided
+
+    def clear(self):
+        for plane in self._selected:
+            self._planes[plane][:] = [0] * self._height
+
+        self._rehash()
+
+    def scroll_down(self, n):
+        n = min(n, self._height)
+
+        for plane in self._selected:
+            rows = self._planes[plane]
+            rows[n:] = rows[:self._height - n]
+            rows[:n] = [0] * n
+
+        self._rehash()
+
+    def scroll_up(self, n):
+        n = min(n, self._height)
+
+        for plane in self._selected:
+            rows = self._planes[plane]
+            rows[:self._height - n] = rows[n:]
+            rows[self._height - n:] = [0] * n
+
+        self._rehash()
+
+    def scroll_right(self, n):
+        for plane in self._selected:
+            rows = self._planes[plane]
+            rows[:] = [row >> n for row in rows]
+
+        self._rehash()
+
+    def scroll_left(self, n):
+        mask = self._mask
+
+        for plane in self._selected:
+            rows = self._planes[plane]
+            rows[:] = [(row << n) & mask for row in rows]
+
+        self._rehash()
+
+    def snapshot(self):
+        return self._width, self._height, [list(rows) for rows in self._planes], list(self._selected), self._hash
+
+    def restore(self, snapshot):
+        width, height, planes, selected, digest = snapshot
+
+        self._width  = width
+        self._height = height
+        self._mask   = (1 << width) - 1
+
+        self._planes   = [list(rows) for rows in planes]
+        self._rows     = self._planes[0]
+        self._selected = list(selected)
+        self._hash     = digest
+
+    def render(self):
+        self.renders += 1
+
+        for listener in self._listeners:
+            listener(self)
+
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self._listeners.remove(listener)
+
+    def publish(self, name=None):
+        """
+        Publish every rendered frame into a shared memory segment, see core.sharedframe.FrameReader.
+        """
+
+        from core.sharedframe import FramePublisher
+
+        publisher = FramePublisher(name, self._max_width, self._max_height)
+        self.subscribe(publisher.publish)
+
+        return publisher
+
+    def pixel(self, x, y):
+        return (self._rows[y] >> (self._width - 1 - x)) & 1
+
+    def digest(self):
+        """
+        64-bit hash of the framebuffer contents, maintained incrementally.
+        """
+
+        return self._hash
+
+    def rows(self, plane=0):
+        return list(self._planes[plane])
+
+    def to_bytes(self, width=None, height=None, plane=0):
+        """
+        Framebuffer packed 8 pixels per byte, row after row.
+
+        With width and height, pixels are scaled to that resolution so that consumers get a constant frame size:
+        scaled up when it is a multiple of the current resolution, down when it divides it (a pixel is set when any
+        pixel of its block is).
+        """
+
+        width  = width or self._width
+        height = height or self._height
+        size   = width // 8
+
+        rows, repeat = self._scaled_rows(width, height, plane)
+
+        return b''.join(row.to_bytes(size, 'big') * repeat for row in rows)
+
+    def write_into(self, buffer, width=None, height=None, plane=0):
+        """
+        Write to_bytes() into buffer (a writable flat memoryview, e.g. of a preallocated numpy frame) row by row,
+        without building the whole frame.
+        """
+
+        width  = width or self._width
+        height = height or self._height
+        size   = width // 8
+        offset = 0
+
+        rows, repeat = self._scaled_rows(width, height, plane)
+
+        for row in rows:
+            data = row.to_bytes(size, 'big')
+
+            for _ in range(0, repeat):
+                buffer[offset:offset + size] = data
+                offset += size
+
+    def _scaled_rows(self, width, height, plane):
+        rows = self._planes[plane]
+
+        if height < self._height:
+            factor = _factor(self._height, height)
+            rows = [_or_rows(rows[y:y + factor]) for y in range(0, self._height, factor)]
+
+        if width > self._width:
+            rows = [_widen(row, _factor(width, self._width)) for row in rows]
+        elif width < self._width:
+            rows = [_narrow(row, _factor(self._width, width)) for row in rows]
+
+        repeat = _factor(height, self._height) if height > self._height else 1
+
+        return rows, repeat
+
+    def _rehash(self):
+        self._hash = 0
+
+        for plane, rows in enumerate(self._planes):
+            for y, row in enumerate(rows):
+                self._hash ^= _row_hash(plane << 8 | y, row)
+
+def _factor(large, small):
+    if large % small:
+        raise ValueError(f"Cannot scale between {large} and {small} pixels")
+
+    return large // small
+
+def _or_rows(rows):
+    merged = 0
+
+    for row in rows:
+        merged |= row
+
+    return merged
+
+# Every byte with each bit repeated factor times, by factor
+_widen_tables = {}
+
+def _widen(row, factor):
+    table = _widen_tables.get(factor)
+
+    if table is None:
+        table = _widen_tables[factor] = [
+            sum(((byte >> bit) & 1) * (((1 << factor) - 1) << (bit * factor)) for bit in range(8))
+            for byte in range(256)
+        ]
+
+    widened = 0
+    shift = 0
+
+    while row:
+        widened |= table[row & 0xFF] << shift
+        row >>= 8
+        shift += 8 * factor
+
+    return widened
+
+# Every byte as 8 / factor bits, each set when any bit of its group of factor bits is, by factor
+_narrow_tables = {}
+
+def _narrow(row, factor):
+    table = _narrow_tables.get(factor)
+
+    if table is None:
+        if 8 % factor:
+            raise ValueError(f"Cannot narrow pixels by {factor}")
+
+        mask = (1 << factor) - 1
+        table = _narrow_tables[factor] = [
+            sum(((byte >> (bit * factor)) & mask != 0) << bit for bit in range(8 // factor))
+            for byte in range(256)
+        ]
+
+    narrowed = 0
+    shift = 0
+
+    while row:
+        narrowed |= table[row & 0xFF] << shift
+        row >>= 8
+        shift += 8 // factor
+
+    return narrowed
@@ -0,0 +1,466 @@
+from core.chip8 import Chip8
+from core.compiler import CompiledProgram, translate
+from core.rom import Rom
+from core import disasm
+from core import quirks
+
+from concurrent.futures import ProcessPoolExecutor
+
+import argparse
+import json
+import os
+import random
+import sys
+
+STARTING_ADDRESS = Chip8.STARTING_ADDRESS
+
+class CompiledEngine:
+    """
+    Block translation (core.compiler): one step runs a whole compiled block, or one interpreted instruction.
+    """
+
+    name = 'compiled'
+
+    def __init__(self, machine, rom):
+        code = compile(translate(rom, STARTING_ADDRESS), f"<fuzz {rom.name}>", 'exec')
+        self._executor = CompiledProgram(code).bind(machine.cpu)
+
+    def step(self):
+        return self._executor.tick()
+
+    def snapshot(self):
+        return dict(self._executor._blocks)
+
+    def restore(self, snapshot):
+        self._executor._blocks = dict(snapshot)
+
+    def block_at(self, pc):
+        """
+        Number of instructions the next step runs from pc.
+        """
+
+        block = self._executor._blocks.get(pc)
+
+        return block[1] if block is not None else 1
+
+ENGINES = {
+    CompiledEngine.name: CompiledEngine,
+}
+
+class Case:
+    """
+    Fuzz input: a program loaded at 0x200 and the machine state it starts from.
+    """
+
+    def __init__(self, program, registers, i, delay, sound, keys, seed, quirks):
+        self.program   = bytes(program)
+        self.registers = list(registers)
+        self.i         = i
+        self.delay     = delay
+        self.sound     = sound
+        self.keys      = keys
+        self.seed      = seed
+        self.quirks    = quirks
+
+    def machine(self):
+        machine = Chip8(compiled=False, headless=True, quirks=self.quirks)
+        machine.load_rom(self.rom())
+        machine.reset(self.seed)
+
+        cpu = machine.cpu
+
+        for register, value in zip(cpu._v, self.registers):
+            register.set(value)
+
+        cpu._i.set(self.i)
+        cpu._delay_timer.set(self.delay)
+        cpu._sound_timer.set(self.sound)
+        machine.keypad.set_state(self.keys)
+
+        return machine
+
+    def rom(self):
+        return Rom(f"fuzz-{self.seed}", self.program)
+
+    def to_dict(self):
+        return dict(vars(self), program=self.program.hex())
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**dict(data, program=bytes.fromhex(data['program'])))
+
+# Share of the generated instructions that are F000 nnnn, which random words almost never hit
+LONG_RATE = 1 / 16
+
+def random_instruction(rng, size):
+    """
+    Bytes of a random valid instruction, jumps and calls staying inside the size bytes program: 2 bytes, or 4 for
+    F000 nnnn (XO-CHIP LD I, long), so that skips over 4-byte instructions get generated too.
+    """
+
+    if rng.random() < LONG_RATE:
+        return bytes([0xF0, 0x00]) + rng.getrandbits(16).to_bytes(2, 'big')
+
+    while True:
+        word = rng.getrandbits(16)
+        instruction = disasm.decode(0, word)
+
+        if instruction.handler is None or instruction.handler in disasm.LONG:
+            continue
+
+        if instruction.successors() is not None and word & 0x0FFF:
+            # Keep static targets inside the program, on instruction boundaries
+            if instruction.handler in disasm.JUMPS or instruction.handler in disasm.CALLS:
+                word = (word & 0xF000) | (STARTING_ADDRESS + rng.randrange(0, size, 2))
+
+        return word.to_bytes(2, 'big')
+
+def random_case(rng, length=64):
+    size = 2 * length
+    program = bytearray()
+
+    while len(program) < size:
+        program += random_instruction(rng, size)
+
+    del program[size:]
+
+    return Case(
+        program,
+        registers=[rng.getrandbits(8) for _ in range(0, 16)],
+        # I anywhere in the program or the free memory above it
+        i=rng.randrange(STARTING_ADDRESS, 0x1000),
+        delay=rng.choice([0, 0, rng.getrandbits(8)]),
+        sound=rng.choice([0, rng.getrandbits(8)]),
+        keys=rng.choice([0, 1 << rng.randrange(0, 16), rng.getrandbits(16)]),
+        seed=rng.getrandbits(32),
+        quirks=rng.choice(list(quirks.PROFILES)),
+    )
+
+def mutate(rng, case):
+    """
+    Copy of case with a few instructions replaced, inserted or removed, or its initial state re-rolled.
+    """
+
+    program = bytearray(case.program)
+    size = len(program)
+
+    for _ in range(0, rng.randint(1, 4)):
+        offset = rng.randrange(0, size, 2)
+        kind = rng.random()
+
+        if kind < 0.6:
+            program[offset:offset + 2] = random_instruction(rng, size)
+        elif kind < 0.8:
+            program[offset:offset] = random_instruction(rng, size)
+        else:
+            del program[offset:offset + 2]
+            program += random_instruction(rng, size)
+
+        # Instructions are 2 or 4 bytes, the program only ever grows: cut it back to its size
+        del program[size:]
+
+    other = random_case(rng, size // 2)
+    mutated = Case(program, case.registers, case.i, case.delay, case.sound, case.keys, case.seed, case.quirks)
+
+    if rng.random() < 0.3:
+        mutated.registers = other.registers
+        mutated.i = other.i
+    if rng.random() < 0.3:
+        mutated.quirks = other.quirks
+
+    return mutated
+
+class Divergence:
+    """
+    First step where an engine and the reference interpreter disagree.
+
+    Engines may run several instructions per step (a whole compiled block): instructions lists the instructions of
+    that step, the first one at pc.
+    """
+
+    def __init__(self, engine, case, step, pc, instructions, reference, actual, fields):
+        self.engine       = engine
+        self.case         = case
+        self.step         = step
+        self.pc           = pc
+        self.instructions = instructions
+        self.reference    = reference
+        self.actual       = actual
+        self.fields       = fields
+
+    def __repr__(self):
+        listing = "\n".join(f"    {instruction!r}" for instruction in self.instructions)
+        fields = ", ".join(
+            f"{name}: {self.reference.get(name)!r} != {self.actual.get(name)!r}" for name in self.fields
+        )
+
+        return (
+            f"Divergence of {self.engine} at step {self.step} (seed {self.case.seed}, quirks {self.case.quirks}), "
+            f"PC 0x{self.pc:03X}:\n{listing}\n  {fields}"
+        )
+
+def _state(machine, error=None):
+    cpu = machine.cpu
+    v, i, pc, sp, stack, delay, sound = cpu.snapshot()
+    display = machine.display
+
+    return {
+        'v': v, 'i': i, 'pc': pc, 'sp': sp, 'stack': stack, 'delay': delay, 'sound': sound,
+        'display': display.snapshot()[:4], 'memory': machine.memory._buffer, 'error': error,
+    }
+
+def _differences(reference, actual):
+    return [name for name in reference if reference[name] != actual[name]]
+
+def _snapshot(machine):
+    # The random generator too, so that Cxkk replays the same values while bisecting
+    return (
+        machine.cpu.snapshot(), machine.memory.dump(), machine.display.snapshot(), machine._random.getstate(),
+        machine.keypad.get_state(),
+    )
+
+def _restore(machine, snapshot):
+    cpu, memory, display, random_state, keys = snapshot
+
+    machine.cpu.restore(cpu)
+    machine.memory.restore(memory)
+    machine.display.restore(display)
+    machine._random.setstate(random_state)
+    machine.keypad.set_state(keys)
+
+class Lockstep:
+    """
+    Runs a case on the reference interpreter and an engine side by side, comparing the whole machine states every
+    check_every engine steps. On a mismatch, both are restored from the last matching check and the first
+    mismatching step is bisected.
+    """
+
+    def __init__(self, case, engine=CompiledEngine, check_every=16):
+        self.case = case
+        self.check_every = check_every
+
+        self._reference = case.machine()
+        self._machine = case.machine()
+        self._engine = engine(self._machine, case.rom())
+
+        self.instructions = 0
+
+    def run(self, steps=256):
+        """
+        Returns the Divergence found within steps engine steps, None when the engine agrees with the reference.
+        """
+
+        step = 0
+
+        while step < steps:
+            checkpoint = self._checkpoint()
+            count = min(self.check_every, steps - step)
+            executed, reference_error, engine_error = self._advance(count)
+
+            if not self._agree(reference_error, engine_error):
+                return self._bisect(checkpoint, step, count)
+
+            if executed < count:
+                # Both stopped on the same error
+                return None
+
+            step += count
+
+        return None
+
+    def _advance(self, count):
+        """
+        Run count engine steps and as many reference instructions, stopping at the first error.
+        """
+
+        cpu = self._reference.cpu
+
+        for done in range(0, count):
+            length = self._engine.block_at(self._machine.cpu._pc)
+
+            try:
+                instructions = self._engine.step()
+            except Exception as e:
+                # The engine stopped somewhere in its step, the reference has to fail within as many instructions
+                return done, self._reference_tick(cpu, length), _error(e)
+
+            self.instructions += instructions
+
+            error = self._reference_tick(cpu, instructions)
+
+            if error is not None:
+                return done, error, None
+
+        return count, None, None
+
+    def _reference_tick(self, cpu, count):
+        try:
+            for _ in range(0, count):
+                cpu.tick()
+        except Exception as e:
+            return _error(e)
+
+        return None
+
+    def _agree(self, reference_error, engine_error):
+        # A failing step leaves the machine half way through it, only the errors are compared then
+        if reference_error is not None or engine_error is not None:
+            return reference_error == engine_error
+
+        return not _differences(self._reference_state(None), self._engine_state(None))
+
+    def _reference_state(self, error):
+        return _state(self._reference, error)
+
+    def _engine_state(self, error):
+        return _state(self._machine, error)
+
+    def _checkpoint(self):
+        return _snapshot(self._reference), _snapshot(self._machine), self._engine.snapshot()
+
+    def _rewind(self, checkpoint):
+        reference, machine, engine = checkpoint
+
+        _restore(self._reference, reference)
+        _restore(self._machine, machine)
+        self._engine.restore(engine)
+
+    def _bisect(self, checkpoint, step, count):
+        # Smallest number of steps after the checkpoint showing a difference
+        low, high = 1, count
+
+        while low < high:
+            middle = (low + high) // 2
+
+            self._rewind(checkpoint)
+
+            if self._diverges(middle):
+                high = middle
+            else:
+                low = middle + 1
+
+        self._rewind(checkpoint)
+        self._advance(low - 1)
+
+        pc = self._machine.cpu._pc
+        memory = self._machine.memory
+        length = self._engine.block_at(pc)
+        instructions = [
+            disasm.decode(address, memory[address] << 8 | memory[address + 1])
+            for address in range(pc, min(pc + 2 * length, len(memory) - 1), 2)
+        ]
+
+        _, reference_error, engine_error = self._advance(1)
+        reference = self._reference_state(reference_error)
+        actual = self._engine_state(engine_error)
+        fields = ['error'] if reference_error is not None or engine_error is not None else _differences(reference, actual)
+
+        return Divergence(
+            self._engine.name, self.case, step + low, pc, instructions, _printable(reference), _printable(actual), fields
+        )
+
+    def _diverges(self, count):
+        _, reference_error, engine_error = self._advance(count)
+
+        return not self._agree(reference_error, engine_error)
+
+def _error(e):
+    return f"{type(e).__name__}: {e}"
+
+def _printable(state):
+    # The memory is only reported through its differing cells
+    return dict(state, memory=None)
+
+def fuzz_chunk(seed, cases, engines=tuple(ENGINES), steps=256, mutations=0.5):
+    """
+    Run cases cases derived from seed against every engine, returns (divergences, cases run, instructions run).
+
+    Cases that ran all their steps without an error form a corpus that later cases are mutated from.
+    """
+
+    rng = random.Random(seed)
+    corpus = []
+    divergences = []
+    instructions = 0
+
+    for _ in range(0, cases):
+        if corpus and rng.random() < mutations:
+            case = mutate(rng, rng.choice(corpus))
+        else:
+            case = random_case(rng)
+
+        for name in engines:
+            lockstep = Lockstep(case, ENGINES[name])
+            divergence = lockstep.run(steps)
+            instructions += lockstep.instructions
+
+            if divergence is not None:
+                divergence.fields = [
+                    field if field != 'memory' else _memory_difference(case, lockstep) for field in divergence.fields
+                ]
+                divergences.append(divergence)
+            elif lockstep.instructions >= steps and len(corpus) < 256:
+                corpus.append(case)
+
+    return divergences, cases, instructions
+
+def _memory_difference(case, lockstep):
+    reference = lockstep._reference.memory._buffer
+    actual = lockstep._machine.memory._buffer
+    address = next(a for a in range(0, len(reference)) if reference[a] != actual[a])
+
+    return f"memory[0x{address:03X}]"
+
+def fuzz(cases, seed=0, workers=None, engines=tuple(ENGINES), steps=256, chunk=100):
+    """
+    Spread cases over worker processes in chunks of chunk cases, returns (divergences, cases run, instructions run).
+    """
+
+    chunks = [(seed * 1000003 + index, min(chunk, cases - start)) for index, start in enumerate(range(0, cases, chunk))]
+    divergences = []
+    total_cases = 0
+    total_instructions = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        jobs = [executor.submit(fuzz_chunk, chunk_seed, count, engines, steps) for chunk_seed, count in chunks]
+
+        for job in jobs:
+            found, count, instructions = job.result()
+            divergences.extend(found)
+            total_cases += count
+            total_instructions += instructions
+
+    return divergences, total_cases, total_instructions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.fuzz", description="Differential fuzzing of the execution engines")
+    parser.add_argument('--cases', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--steps', type=int, default=256, help="engine steps per case")
+    parser.add_argument('--engine', action='append', choices=ENGINES, help="engines to check (default: all)")
+    parser.add_argument('--save', metavar='DIR', help="write the ROMs of the diverging cases into DIR")
+    args = parser.parse_args(argv)
+
+    divergences, cases, instructions = fuzz(
+        args.cases, args.seed, args.workers, tuple(args.engine or ENGINES), args.steps
+    )
+
+    for divergence in divergences:
+        print(divergence)
+
+        if args.save:
+            os.makedirs(args.save, exist_ok=True)
+
+            name = divergence.case.rom().name
+
+            with open(os.path.join(args.save, f"{name}.ch8"), 'wb') as f:
+                f.write(divergence.case.program)
+            with open(os.path.join(args.save, f"{name}.json"), 'w') as f:
+                json.dump(divergence.case.to_dict(), f, indent=2)
+
+    print(f"{cases} cases, {instructions} instructions, {len(divergences)} divergences")
+    sys.exit(1 if divergences else 0)
+
+if __name__ == '__main__':
+    main()
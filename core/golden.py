@@ -0,0 +1,155 @@
+from core.chip8 import Chip8
+from core.rom import Rom
+
+from concurrent.futures import ProcessPoolExecutor
+
+import argparse
+import json
+import os
+import sys
+
+DEFAULT_CHECKPOINTS = [1, 30, 120, 300]
+
+def run_rom(path, checkpoints, seed=0, inputs=None, compiled=False):
+    """
+    Run a ROM headless and return the framebuffer digest (hex) at every checkpoint frame.
+
+    inputs maps frame numbers to the key state held from that frame on.
+    """
+
+    machine = Chip8(compiled=compiled, headless=True)
+    machine.load_rom(Rom.from_file(path))
+    machine.reset(seed)
+
+    inputs = {int(frame): state for frame, state in (inputs or {}).items()}
+    checkpoints = set(checkpoints)
+    digests = {}
+
+    for frame in range(1, max(checkpoints) + 1):
+        if frame in inputs:
+            machine.keypad.set_state(inputs[frame])
+
+        machine.frame()
+
+        if frame in checkpoints:
+            digests[str(frame)] = f"{machine.display.digest():016x}"
+
+    return digests
+
+class Golden:
+    """
+    Golden framebuffer digests of a ROM corpus, stored as JSON next to the ROMs they reference:
+
+    {"roms": {name: {"path": ..., "sha1": ..., "seed": 0, "inputs": {frame: keys}, "checkpoints": {frame: digest}}}}
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.roms = {}
+
+        if os.path.exists(path):
+            with open(path) as f:
+                self.roms = json.load(f)['roms']
+
+    def save(self):
+        with open(self.path, 'w') as f:
+            json.dump({'roms': self.roms}, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+    def add(self, rom_path, checkpoints=DEFAULT_CHECKPOINTS, seed=0, inputs=None):
+        if not checkpoints:
+            raise ValueError(f"No checkpoint for [{rom_path}]")
+
+        name = os.path.basename(rom_path)
+
+        self.roms[name] = {
+            'path':         os.path.relpath(rom_path, os.path.dirname(os.path.abspath(self.path))),
+            'sha1':         Rom.from_file(rom_path).hash,
+            'seed':         seed,
+            'inputs':       inputs or {},
+            'checkpoints':  {str(frame): None for frame in checkpoints},
+        }
+
+    def update(self, workers=None):
+        for name, digests in self._run_all(sorted(self.roms), workers):
+            self.roms[name]['sha1'] = Rom.from_file(self._rom_path(self.roms[name])).hash
+            self.roms[name]['checkpoints'] = digests
+
+    def check(self, workers=None):
+        """
+        Run the whole corpus, returns the list of (rom, frame, expected, actual) mismatches.
+
+        A ROM file that changed since its digests were recorded is not run: its mismatch is (rom, None, expected
+        sha1, actual sha1).
+        """
+
+        failures = []
+        names = []
+
+        for name in sorted(self.roms):
+            sha1 = Rom.from_file(self._rom_path(self.roms[name])).hash
+
+            if sha1 != self.roms[name]['sha1']:
+                failures.append((name, None, self.roms[name]['sha1'], sha1))
+            else:
+                names.append(name)
+
+        for name, digests in self._run_all(names, workers):
+            for frame, expected in sorted(self.roms[name]['checkpoints'].items(), key=lambda item: int(item[0])):
+                if digests.get(frame) != expected:
+                    failures.append((name, int(frame), expected, digests.get(frame)))
+
+        return failures
+
+    def _rom_path(self, entry):
+        return os.path.join(os.path.dirname(os.path.abspath(self.path)), entry['path'])
+
+    def _run_all(self, names, workers):
+        jobs = [
+            (
+                self._rom_path(self.roms[name]),
+                [int(frame) for frame in self.roms[name]['checkpoints']],
+                self.roms[name]['seed'],
+                self.roms[name]['inputs'],
+            )
+            for name in names
+        ]
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(zip(names, executor.map(_run_job, jobs)))
+
+def _run_job(job):
+    return run_rom(*job)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.golden", description="Golden framebuffer regression tests")
+    parser.add_argument('golden', help="golden digests file (JSON)")
+    parser.add_argument('--add', nargs='+', metavar='ROM', default=[], help="add ROMs to the corpus")
+    parser.add_argument('--update', action='store_true', help="record the current digests as the golden ones")
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    golden = Golden(args.golden)
+
+    for rom in args.add:
+        golden.add(rom)
+
+    if args.update or args.add:
+        golden.update(args.workers)
+        golden.save()
+        print(f"{len(golden.roms)} ROMs recorded in {args.golden}")
+        return
+
+    failures = golden.check(args.workers)
+
+    for name, frame, expected, actual in failures:
+        if frame is None:
+            print(f"{name}: ROM changed (sha1 {actual}, recorded {expected}), run with --update if intended")
+        else:
+            print(f"{name} frame {frame}: expected {expected}, got {actual}")
+
+    print(f"{len(golden.roms)} ROMs checked, {len(failures)} mismatches")
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,295 @@
+from core.pool import MachinePool
+from core.rom import Rom
+
+from collections import deque
+
+import argparse
+import asyncio
+import logging
+import struct
+
+# Frame message: frame number, width, height, followed by the packed framebuffer (plane 0)
+FRAME_HEADER = struct.Struct('<IHH')
+# Input message: 16-bit key state, bit k set when key k is held
+KEYS = struct.Struct('<H')
+
+RUNNING     = 'running'
+PARKED_KEY  = 'key'
+PARKED_TIME = 'timer'
+
+class Session:
+    """
+    One machine run by a Host. Sessions waiting on Fx0A for a key, or spinning on the delay timer
+    (LD Vx, DT / SE Vx, 0 / JP back), are parked: their frames only step the timers until a key is pressed or the
+    delay timer runs out, instead of executing the same few instructions over and over.
+    """
+
+    def __init__(self, host, name, machine):
+        self.host    = host
+        self.name    = name
+        self.machine = machine
+        self.state   = RUNNING
+
+        # Called with the session after a tick that changed the framebuffer
+        self.listener = None
+
+        self.frames        = 0
+        self.parked_frames = 0
+
+        # Set when the session is closed, its machine then belongs to the pool again
+        self.closed = False
+        # repr() of the exception that crashed the machine
+        self.error = None
+
+        self._digest = None
+
+    def set_keys(self, state):
+        self.machine.keypad.set_state(state)
+
+        if self.state == PARKED_KEY and state:
+            self.state = RUNNING
+
+    def frame(self):
+        """
+        Emulate one frame: a full cycles quota, or only the timers when parked.
+        """
+
+        machine = self.machine
+
+        if self.state == PARKED_TIME and machine.cpu._delay_timer.get() == 0:
+            self.state = RUNNING
+
+        if self.state == RUNNING:
+            machine.frame(render=False)
+            self.state = _parked_state(machine)
+        else:
+            machine._end_frame(render=False)
+            self.parked_frames += 1
+
+        self.frames += 1
+
+        display = machine.display
+
+        if self.listener is not None and display.digest() != self._digest:
+            self._digest = display.digest()
+            self.listener(self)
+
+    def frame_message(self):
+        display = self.machine.display
+
+        return FRAME_HEADER.pack(self.frames, display.width, display.height) + display.to_bytes()
+
+    def close(self):
+        self.host.close(self)
+
+def _parked_state(machine):
+    cpu = machine.cpu
+    memory = machine.memory
+    pc = cpu._pc
+
+    if pc + 1 >= len(memory):
+        return RUNNING
+
+    high, low = memory[pc], memory[pc + 1]
+
+    if high & 0xF0 == 0xF0 and low == 0x0A and not machine.keypad.get_state():
+        return PARKED_KEY
+
+    if cpu._delay_timer.get() and _in_delay_loop(memory, pc):
+        return PARKED_TIME
+
+    return RUNNING
+
+def _in_delay_loop(memory, pc):
+    """
+    Whether pc is inside LD Vx, DT / SE Vx, 0 / JP <LD Vx, DT>.
+    """
+
+    for start in (pc, pc - 2, pc - 4):
+        if start < 0 or start + 5 >= len(memory):
+            continue
+
+        load = memory[start] << 8 | memory[start + 1]
+        skip = memory[start + 2] << 8 | memory[start + 3]
+        jump = memory[start + 4] << 8 | memory[start + 5]
+
+        x = (load & 0x0F00) >> 8
+
+        if (load & 0xF0FF == 0xF007 and skip == 0x3000 | x << 8 and jump == 0x1000 | start):
+            return True
+
+    return False
+
+class Host:
+    """
+    Runs many headless sessions cooperatively on one asyncio event loop.
+
+    Every 60 Hz tick, each session gets one frame (cycles_per_frame instructions) in round-robin order, the
+    starting session rotating from tick to tick so that no session is always served last. The loop yields to the
+    socket I/O every yield_every sessions. When a tick overruns its period the next one starts right away, and the
+    schedule restarts from now when more than max_behind ticks late.
+
+    Machines come from one MachinePool per ROM and go back to it when their session closes.
+    """
+
+    def __init__(self, fps=60, yield_every=8, max_behind=5, compiled=True, **options):
+        self.fps         = fps
+        self.yield_every = yield_every
+        self.max_behind  = max_behind
+
+        self._pools    = {}
+        self._options  = dict(options, compiled=compiled)
+        self._sessions = deque()
+        self._servers  = []
+
+        self.ticks = 0
+
+    def add_rom(self, name, rom, size=0):
+        rom = rom if isinstance(rom, Rom) else Rom.from_file(rom)
+
+        self._pools[name] = MachinePool(rom, size=size, **self._options)
+
+    def open(self, name, seed=None):
+        if name not in self._pools:
+            raise KeyError(f"Unknown ROM [{name}]")
+
+        session = Session(self, name, self._pools[name].acquire(seed))
+        self._sessions.append(session)
+
+        return session
+
+    def close(self, session):
+        if session in self._sessions:
+            session.closed = True
+            self._sessions.remove(session)
+            self._pools[session.name].release(session.machine)
+
+    @property
+    def sessions(self):
+        return list(self._sessions)
+
+    async def tick(self):
+        sessions = list(self._sessions)
+
+        for i, session in enumerate(sessions):
+            # Closed while the loop yielded: its machine may already run another session
+            if session.closed:
+                continue
+
+            try:
+                session.frame()
+            except Exception as e:
+                # The machine crashed (unknown opcode, stack overflow...): only its session is over
+                logging.warning(f"Session [{session.name}] crashed: {e!r}")
+                session.error = repr(e)
+                self.close(session)
+
+            if (i + 1) % self.yield_every == 0:
+                await asyncio.sleep(0)
+
+        self._sessions.rotate(-1)
+        self.ticks += 1
+
+    async def run(self, ticks=None):
+        loop = asyncio.get_running_loop()
+        period = 1.0 / self.fps
+        deadline = loop.time()
+
+        while ticks is None or self.ticks < ticks:
+            await self.tick()
+
+            deadline += period
+            remaining = deadline - loop.time()
+
+            if remaining > 0:
+                await asyncio.sleep(remaining)
+            else:
+                if -remaining > self.max_behind * period:
+                    deadline = loop.time()
+
+                await asyncio.sleep(0)
+
+    async def serve(self, path=None, port=None, host='127.0.0.1'):
+        """
+        Accept clients on the unix socket path, or on host:port.
+
+        A client sends the ROM name and a newline, then 2-byte key states (little endian) whenever they change. It
+        receives a frame message (FRAME_HEADER then the packed frame) after every tick that changed the
+        framebuffer, frames being dropped while the client does not keep up.
+        """
+
+        if path is not None:
+            server = await asyncio.start_unix_server(self._handle_client, path)
+        else:
+            server = await asyncio.start_server(self._handle_client, host, port)
+
+        self._servers.append(server)
+
+        return server
+
+    async def close_servers(self):
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+
+        self._servers = []
+
+    async def _handle_client(self, reader, writer):
+        session = None
+
+        try:
+            name = (await reader.readline()).decode().strip()
+
+            try:
+                session = self.open(name)
+            except KeyError as e:
+                logging.warning(str(e))
+                return
+
+            session.listener = lambda s: _send_latest(writer, s)
+
+            while True:
+                data = await reader.readexactly(KEYS.size)
+                session.set_keys(KEYS.unpack(data)[0])
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if session is not None:
+                session.close()
+
+            writer.close()
+
+# Bytes left unsent above which frames are dropped for a client
+HIGH_WATER = 64 * 1024
+
+def _send_latest(writer, session):
+    if writer.is_closing() or writer.transport.get_write_buffer_size() > HIGH_WATER:
+        return
+
+    writer.write(session.frame_message())
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.host", description="Serve CHIP-8 sessions over a socket")
+    parser.add_argument('roms', nargs='+', help="ROM files, clients open them by file name")
+    parser.add_argument('--socket', metavar='PATH', help="unix socket to listen on")
+    parser.add_argument('--port', type=int, default=8808, help="TCP port on 127.0.0.1 when no socket is given")
+    parser.add_argument('--quirks', default='modern')
+    args = parser.parse_args(argv)
+
+    host = Host(quirks=args.quirks)
+
+    for path in args.roms:
+        rom = Rom.from_file(path)
+        host.add_rom(rom.name, rom)
+
+    async def serve():
+        await host.serve(path=args.socket, port=args.port)
+        await host.run()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+# Keyboard layout of the keypad, by key name
+# 1 2 3 C      1 2 3 4
+# 4 5 6 D  <-  Q W E R
+# 7 8 9 E      A S D F
+# A 0 B F      Z X C V
+LAYOUT = {
+    '1': 0x1, '2': 0x2, '3': 0x3, '4': 0xC,
+    'q': 0x4, 'w': 0x5, 'e': 0x6, 'r': 0xD,
+    'a': 0x7, 's': 0x8, 'd': 0x9, 'f': 0xE,
+    'z': 0xA, 'x': 0x0, 'c': 0xB, 'v': 0xF,
+}
+
+class Keypad:
+    """
+    State of the 16 keys (0x0 - 0xF), bit k set when key k is pressed.
+    """
+
+    def __init__(self):
+        self._state = 0
+
+    def press(self, key):
+        self._state |= 1 << key
+
+    def release(self, key):
+        self._state &= ~(1 << key)
+
+    def set_state(self, state):
+        self._state = state & 0xFFFF
+
+    def get_state(self):
+        return self._state
+
+    def is_pressed(self, key):
+        return (self._state >> key) & 1 == 1
+
+    def first_pressed(self):
+        """
+        Lowest pressed key, None when no key is pressed.
+        """
+
+        if not self._state:
+            return None
+
+        return (self._state & -self._state).bit_length() - 1
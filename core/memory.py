@@ -15,6 +15,34 @@ class Memory:
 
         self._buffer[index] = value
 
+    def load(self, offset, data):
+        """
+        Bulk copy data into memory starting at offset, bounds are checked once for the whole range.
+        """
+
+        if not data:
+            return
+
+        self._assert_in_bounds(offset)
+        self._assert_in_bounds(offset + len(data) - 1)
+        self._assert_value_size(min(data))
+        self._assert_value_size(max(data))
+
+        self._buffer[offset:offset + len(data)] = data
+
+    def dump(self):
+        return list(self._buffer)
+
+    def restore(self, image):
+        """
+        Replace the whole memory contents with image (a dump() of a memory of the same size) in one copy.
+        """
+
+        if len(image) != self._max_size:
+            raise ValueError(f"Memory image of {len(image)} cells, expected {self._max_size}")
+
+        self._buffer[:] = image
+
     def __len__(self):
         return self._max_size
 
@@ -24,4 +52,48 @@ class Memory:
 
     def _assert_value_size(self, value):
         if value & self._value_mask != value:
-            raise OverflowError(value)
\ No newline at end of file
+            raise OverflowError(value)
+
+class ObservedMemory(Memory):
+    """
+    Memory calling observer(address, old, new) on every write.
+
+    A plain Memory is switched to it in place (observe()) only while something watches the writes, so that
+    unobserved memory keeps the plain __setitem__. A Memory subclass already switched in (HashedMemory...) keeps
+    its behaviour while observed, and is switched back to on unobserve().
+    """
+
+    # Memory subclass -> observed version of it
+    _subclasses = {}
+
+    @classmethod
+    def observe(cls, memory, observer):
+        unobserved = type(memory)
+
+        if unobserved is not Memory and unobserved not in cls._subclasses:
+            cls._subclasses[unobserved] = type(f"Observed{unobserved.__name__}", (cls, unobserved), {})
+
+        memory.__class__ = cls._subclasses.get(unobserved, cls)
+        memory._observer = observer
+        memory._unobserved = unobserved
+
+    @staticmethod
+    def unobserve(memory):
+        memory.__class__ = memory._unobserved
+        del memory._observer
+        del memory._unobserved
+
+    def __setitem__(self, index, value):
+        old = self[index]
+
+        super().__setitem__(index, value)
+        self._observer(index, old, value)
+
+    def load(self, offset, data):
+        old = self._buffer[offset:offset + len(data)]
+
+        super().load(offset, data)
+
+        for address, (before, after) in enumerate(zip(old, data), offset):
+            if before != after:
+                self._observer(address, before, after)
@@ -0,0 +1,207 @@
+from core import cache
+from core.cache import write_atomic
+
+from bisect import bisect_left
+
+import json
+import threading
+
+class Histogram:
+    """
+    Cumulative-on-export histogram: observe() is a bisect and two integer increments.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = list(buckets)
+        self.counts  = [0] * (len(self.buckets) + 1)
+        self.sum     = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def cumulative(self):
+        """
+        [(upper bound, count of observations <= bound)], the last bound being +Inf.
+        """
+
+        total = 0
+        result = []
+
+        for bound, count in zip(self.buckets + [float('inf')], self.counts):
+            total += count
+            result.append((bound, total))
+
+        return result
+
+# Frame work time buckets, in seconds
+FRAME_TIME_BUCKETS = [0.001, 0.002, 0.004, 0.008, 0.016, 0.033, 0.066]
+
+class Registry:
+    """
+    Pull-based metrics: the instrumented objects keep plain int attributes that they increment, the registry only
+    holds how to read them and reads them on export.
+    """
+
+    def __init__(self):
+        # name -> (kind, help, [(labels, getter)])
+        self._metrics = {}
+
+    def counter(self, name, help, getter, **labels):
+        self._add(name, 'counter', help, getter, labels)
+
+    def gauge(self, name, help, getter, **labels):
+        self._add(name, 'gauge', help, getter, labels)
+
+    def histogram(self, name, help, histogram, **labels):
+        self._add(name, 'histogram', help, lambda: histogram, labels)
+
+    def remove(self, **labels):
+        """
+        Drop every sample with these labels (a machine that was shut down).
+        """
+
+        for _, _, samples in self._metrics.values():
+            samples[:] = [(l, getter) for l, getter in samples if any(l.get(k) != v for k, v in labels.items())]
+
+    def collect(self):
+        """
+        Current values as [(name, kind, help, [(labels, value)])], histograms values being Histogram objects.
+        """
+
+        return [
+            (name, kind, help, [(labels, getter()) for labels, getter in samples])
+            for name, (kind, help, samples) in sorted(self._metrics.items())
+        ]
+
+    def to_prometheus(self):
+        lines = []
+
+        for name, kind, help, samples in self.collect():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+
+            for labels, value in samples:
+                if kind != 'histogram':
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+                    continue
+
+                for bound, count in value.cumulative():
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f"{name}_bucket{_format_labels(dict(labels, le=le))} {count}")
+
+                lines.append(f"{name}_sum{_format_labels(labels)} {value.sum}")
+                lines.append(f"{name}_count{_format_labels(labels)} {sum(value.counts)}")
+
+        return "\n".join(lines) + "\n"
+
+    def to_json(self):
+        metrics = {}
+
+        for name, kind, help, samples in self.collect():
+            metrics[name] = [
+                {
+                    'labels': labels,
+                    'value': value if kind != 'histogram' else {
+                        'buckets': [['+Inf' if b == float('inf') else b, c] for b, c in value.cumulative()],
+                        'sum': value.sum,
+                        'count': sum(value.counts),
+                    },
+                }
+                for labels, value in samples
+            ]
+
+        return metrics
+
+    def _add(self, name, kind, help, getter, labels):
+        if name not in self._metrics:
+            self._metrics[name] = (kind, help, [])
+
+        self._metrics[name][2].append((labels, getter))
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+
+    return "{" + ",".join(f'{key}="{value}"' for key, value in sorted(labels.items())) + "}"
+
+def register_caches(registry):
+    """
+    Hits and misses of the on-disk caches (compiled ROMs, disassembly), by cache namespace.
+    """
+
+    for namespace in cache.NAMESPACES:
+        registry.counter('chip8_cache_hits_total', "On-disk cache hits", lambda n=namespace: cache.hits[n], cache=namespace)
+        registry.counter('chip8_cache_misses_total', "On-disk cache misses", lambda n=namespace: cache.misses[n], cache=namespace)
+
+class FileExporter:
+    """
+    Writes the registry to path every interval seconds (and on close), in Prometheus text format or JSON.
+    """
+
+    def __init__(self, registry, path, interval=10.0, format='prometheus'):
+        self._registry = registry
+        self._path     = path
+        self._interval = interval
+        self._format   = format
+
+        self._stop   = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def export(self):
+        if self._format == 'json':
+            data = json.dumps(self._registry.to_json(), indent=1)
+        else:
+            data = self._registry.to_prometheus()
+
+        write_atomic(self._path, data.encode())
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self.export()
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            self.export()
+
+class HttpExporter:
+    """
+    Serves the registry on http://host:port/metrics (Prometheus text) and /metrics.json, localhost only by default.
+    """
+
+    def __init__(self, registry, port=9108, host='127.0.0.1'):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/metrics':
+                    body, content_type = registry.to_prometheus().encode(), 'text/plain; version=0.0.4'
+                elif self.path == '/metrics.json':
+                    body, content_type = json.dumps(registry.to_json()).encode(), 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    @property
+    def address(self):
+        return self._server.server_address
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
@@ -0,0 +1,125 @@
+from collections import deque
+
+import time
+
+class FramePacer:
+    """
+    Paces a frame loop at fps frames per second of wall clock time.
+
+    The work time of every frame is measured, only the remainder of the frame period is slept. When the loop falls
+    behind, should_render() tells to drop renders (emulation keeps running every frame) until it catches up, at most
+    max_dropped renders in a row. In turbo mode frames are not throttled and renders are limited to fps per second.
+    """
+
+    def __init__(self, fps=60, turbo=False, max_dropped=5, history=600, histogram=None, clock=time.perf_counter,
+                 sleep=time.sleep):
+        self.fps         = fps
+        self.turbo       = turbo
+        self.max_dropped = max_dropped
+
+        self._period = 1.0 / fps
+        self._clock  = clock
+        self._sleep  = sleep
+
+        # Work time of the last frames, in seconds
+        self._work_times = deque(maxlen=history)
+        # core.metrics.Histogram of the work times, optional
+        self._histogram = histogram
+
+        self.frames   = 0
+        self.rendered = 0
+        self.dropped  = 0
+
+        self._dropped_in_row = 0
+        self._started = None
+        self._frame_start = None
+        self._deadline = None
+        self._last_render = None
+
+    def start_frame(self):
+        now = self._clock()
+
+        if self._started is None:
+            self._started = now
+            self._deadline = now + self._period
+
+        self._frame_start = now
+
+    def should_render(self):
+        now = self._clock()
+
+        if self.turbo:
+            render = self._last_render is None or now - self._last_render >= self._period
+        else:
+            render = now <= self._deadline or self._dropped_in_row >= self.max_dropped
+
+        if render:
+            self._last_render = now
+            self._dropped_in_row = 0
+            self.rendered += 1
+        else:
+            self._dropped_in_row += 1
+            self.dropped += 1
+
+        return render
+
+    def end_frame(self):
+        """
+        Record the frame work time then sleep until the next frame is due.
+        """
+
+        now = self._clock()
+        work = now - self._frame_start
+
+        self._work_times.append(work)
+        self.frames += 1
+
+        if self._histogram is not None:
+            self._histogram.observe(work)
+
+        if self.turbo:
+            return
+
+        remaining = self._deadline - now
+
+        if remaining > 0:
+            self._sleep(remaining)
+            self._deadline += self._period
+        elif -remaining > self.max_dropped * self._period:
+            # Too far behind to ever catch up (stalled window, debugger...): restart the schedule from now
+            self._deadline = now + self._period
+        else:
+            self._deadline += self._period
+
+    def percentiles(self, *percents):
+        """
+        Frame work time percentiles in milliseconds, {percent: ms}.
+        """
+
+        if not self._work_times:
+            return {percent: 0.0 for percent in percents}
+
+        times = sorted(self._work_times)
+        last = len(times) - 1
+
+        return {percent: times[round(percent / 100 * last)] * 1000 for percent in percents}
+
+    def fps_average(self):
+        """
+        Frames per second since the first frame.
+        """
+
+        if self._started is None or not self.frames:
+            return 0.0
+
+        elapsed = self._clock() - self._started
+
+        return self.frames / elapsed if elapsed > 0 else 0.0
+
+    def report(self):
+        p = self.percentiles(50, 95, 99)
+
+        return (
+            f"{self.fps_average():.1f} fps, frame work p50 {p[50]:.2f} ms p95 {p[95]:.2f} ms p99 {p[99]:.2f} ms, "
+            f"{self.dropped} renders dropped"
+        )
@@ -0,0 +1,66 @@
+from core.chip8 import Chip8
+from core.template import MachineTemplate
+from core.rom import Rom
+
+from contextlib import contextmanager
+
+import threading
+
+class MachinePool:
+    """
+    Warm headless machines running the same ROM, checked out by batch jobs and given back when done.
+
+    Machines are built once (memory, dispatch tables, compiled blocks) and only reset from the template when
+    acquired, so an episode does not pay for constructing a machine.
+    """
+
+    def __init__(self, rom, size=0, compiled=True, **options):
+        rom = rom if isinstance(rom, Rom) else Rom.from_file(rom)
+
+        self.template = MachineTemplate(rom, Chip8.FONT, Chip8.STARTING_ADDRESS, compiled=compiled)
+
+        self._options = dict(options, compiled=compiled, headless=True)
+        self._free    = [self._build() for _ in range(0, size)]
+        self._lock    = threading.Lock()
+
+        self.created = size
+
+    def acquire(self, seed=None):
+        with self._lock:
+            machine = self._free.pop() if self._free else None
+
+        if machine is None:
+            machine = self._build()
+
+            with self._lock:
+                self.created += 1
+
+        machine.reset(seed)
+
+        return machine
+
+    def release(self, machine):
+        with self._lock:
+            self._free.append(machine)
+
+    @contextmanager
+    def machine(self, seed=None):
+        machine = self.acquire(seed)
+
+        try:
+            yield machine
+        finally:
+            self.release(machine)
+
+    def __len__(self):
+        """
+        Machines available without building a new one.
+        """
+
+        return len(self._free)
+
+    def _build(self):
+        machine = Chip8(**self._options)
+        machine.use_template(self.template)
+
+        return machine
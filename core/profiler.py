@@ -0,0 +1,173 @@
+from core.chip8 import Chip8
+from core.rom import Rom
+from core import disasm
+from core import quirks
+
+import argparse
+
+class Profiler:
+    """
+    Cycles executed by a Cpu attributed to CHIP-8 call stacks.
+
+    The call stack is followed from the stack pointer: an instruction that increments SP (CALL) enters the routine
+    at the new PC, one that decrements it (RET) leaves the current routine. The CALL is counted in the caller, the
+    RET in the routine it returns from.
+
+    Like Coverage, recording wraps the tick of the Cpu instance (detach() puts it back), which compiled blocks
+    bypass: profile interpreted machines (Chip8.record_profile() loads ROMs without their compiled version).
+    """
+
+    def __init__(self, root=disasm.STARTING_ADDRESS, addresses=False):
+        # Entry addresses of the routines of a stack path (root first) -> cycles, plus the address of the
+        # instruction as last element with addresses=True
+        self.cycles = {}
+        # Entry address -> times called
+        self.calls = {}
+
+        self.root = root
+        self.addresses = addresses
+
+        self._cpu = None
+        self._tick = None
+        self._replaced = None
+
+    def attach(self, cpu):
+        cycles = self.cycles
+        calls = self.calls
+        addresses = self.addresses
+        tick = cpu.tick
+        path = (self.root,)
+
+        def profiled_tick():
+            nonlocal path
+
+            # Detached while a later instrumentation still calls it
+            if self._cpu is None:
+                return tick()
+
+            sp = cpu._sp
+            pc = cpu._pc
+
+            tick()
+
+            key = path + (pc,) if addresses else path
+            cycles[key] = cycles.get(key, 0) + 1
+
+            if cpu._sp > sp:
+                entry = cpu._pc
+                path += (entry,)
+                calls[entry] = calls.get(entry, 0) + 1
+            elif cpu._sp < sp and len(path) > 1:
+                path = path[:-1]
+
+        # The instance tick replaced (another instrumentation), None for the plain Cpu.tick
+        self._replaced = vars(cpu).get('tick')
+        self._tick = profiled_tick
+
+        cpu.tick = profiled_tick
+        self._cpu = cpu
+
+    def detach(self):
+        if self._cpu is None:
+            return
+
+        if vars(self._cpu).get('tick') is self._tick:
+            if self._replaced is None:
+                del self._cpu.tick
+            else:
+                self._cpu.tick = self._replaced
+
+        self._cpu = None
+
+    def routines(self):
+        """
+        {entry: (self cycles, total cycles, calls)}, total cycles including the routines called, once per path
+        for recursive routines.
+        """
+
+        report = {}
+
+        for key, count in self.cycles.items():
+            path = key[:-1] if self.addresses else key
+
+            for entry in set(path):
+                own, total, calls = report.get(entry, (0, 0, self.calls.get(entry, 0)))
+                report[entry] = (own + (count if entry == path[-1] else 0), total + count, calls)
+
+        return report
+
+    def collapsed(self, labels=None):
+        """
+        Collapsed stacks ("start;sub_2A4;sub_2F0 1234" lines) for flame graph tools.
+        """
+
+        labels = labels or {}
+        lines = []
+
+        for key, count in self.cycles.items():
+            path = key[:-1] if self.addresses else key
+            frames = [self._name(entry, labels) for entry in path]
+
+            if self.addresses:
+                frames.append(f"0x{key[-1]:03X}")
+
+            lines.append(f"{';'.join(frames)} {count}")
+
+        return "\n".join(sorted(lines)) + "\n"
+
+    def report(self, labels=None, top=20):
+        labels = labels or {}
+        total = sum(self.cycles.values()) or 1
+        routines = sorted(self.routines().items(), key=lambda item: -item[1][1])
+
+        lines = [f"{'total':>10} {'%':>6} {'self':>10} {'calls':>8}  routine"]
+
+        for entry, (own, inclusive, calls) in routines[:top]:
+            lines.append(
+                f"{inclusive:>10} {100 * inclusive / total:>5.1f}% {own:>10} {calls:>8}  {self._name(entry, labels)}"
+            )
+
+        return "\n".join(lines)
+
+    def save(self, path, labels=None):
+        with open(path, 'w') as f:
+            f.write(self.collapsed(labels))
+
+    def _name(self, entry, labels):
+        if entry in labels:
+            return labels[entry]
+
+        return 'start' if entry == self.root else f"sub_{entry:03X}"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.profiler", description="Profile a ROM's subroutines")
+    parser.add_argument('rom')
+    parser.add_argument('--frames', type=int, default=600, help="frames to run (default: 10 s)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--keys', type=lambda value: int(value, 0), default=0, help="key state held during the run")
+    parser.add_argument('--quirks', choices=quirks.PROFILES, default='modern')
+    parser.add_argument('--addresses', action='store_true', help="add the instruction addresses as leaf frames")
+    parser.add_argument('--output', metavar='FILE', help="write the collapsed stacks into FILE")
+    args = parser.parse_args(argv)
+
+    rom = Rom.from_file(args.rom)
+    profiler = Profiler(addresses=args.addresses)
+
+    machine = Chip8(headless=True, quirks=args.quirks)
+    machine.record_profile(profiler)
+    machine.load_rom(rom)
+    machine.reset(args.seed)
+    machine.keypad.set_state(args.keys)
+
+    for _ in range(0, args.frames):
+        machine.frame()
+
+    labels = disasm.analyze(rom).labels()
+
+    if args.output:
+        profiler.save(args.output, labels)
+
+    print(profiler.report(labels))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+class Quirks:
+    """
+    Behaviors that differ between CHIP-8 interpreters, resolved once by Cpu when building its dispatch tables.
+
+    - shift_uses_vy:    8xy6/8xyE shift Vy into Vx (COSMAC VIP) instead of shifting Vx in place
+    - load_store:       what Fx55/Fx65 do to I: 'increment' (I += x + 1), 'increment-x' (I += x) or 'unchanged'
+    - jump_uses_vx:     Bnnn jumps to xnn + Vx instead of nnn + V0
+    - vf_reset:         8xy1/8xy2/8xy3 reset VF to 0
+    """
+
+    LOAD_STORE = ('increment', 'increment-x', 'unchanged')
+
+    def __init__(self, name, shift_uses_vy=False, load_store='increment', jump_uses_vx=False, vf_reset=False):
+        if load_store not in self.LOAD_STORE:
+            raise ValueError(f"Unknown load/store behavior {load_store}")
+
+        self.name           = name
+        self.shift_uses_vy  = shift_uses_vy
+        self.load_store     = load_store
+        self.jump_uses_vx   = jump_uses_vx
+        self.vf_reset       = vf_reset
+
+    def __repr__(self):
+        return f"Quirks({self.name})"
+
+COSMAC_VIP  = Quirks('cosmac-vip', shift_uses_vy=True, load_store='increment', vf_reset=True)
+CHIP_48     = Quirks('chip-48', load_store='increment-x', jump_uses_vx=True)
+SUPER_CHIP  = Quirks('super-chip', load_store='unchanged', jump_uses_vx=True)
+MODERN      = Quirks('modern')
+
+PROFILES = {quirks.name: quirks for quirks in [COSMAC_VIP, CHIP_48, SUPER_CHIP, MODERN]}
+
+def get(name):
+    if isinstance(name, Quirks):
+        return name
+
+    if name not in PROFILES:
+        raise ValueError(f"Unknown quirks profile {name}, expected one of {', '.join(PROFILES)}")
+
+    return PROFILES[name]
@@ -0,0 +1,211 @@
+import queue
+import struct
+import threading
+
+class GifWriter:
+    """
+    Minimal animated GIF encoder for 2-color frames given as packed rows.
+    """
+
+    PALETTE = bytes([0x00, 0x00, 0x00, 0xFF, 0xFF, 0xFF])
+
+    def __init__(self, file, width, height, scale=4, fps=60):
+        self._file   = file
+        self._width  = width
+        self._height = height
+        self._scale  = scale
+        self._fps    = fps
+
+        # Time already written as frame delays, in 1/100 s, to keep delays from drifting while rounding
+        self._frames_written = 0
+        self._delay_written  = 0
+
+        # Color indices of the scaled pixels of every packed byte
+        self._pixels = [
+            bytes(b for bit in range(7, -1, -1) for b in [(byte >> bit) & 1] * scale)
+            for byte in range(256)
+        ]
+
+        self._write_header()
+
+    def write(self, data, hold):
+        """
+        Add a frame displayed for hold frames.
+        """
+
+        self._frames_written += hold
+        delay = round(self._frames_written * 100 / self._fps) - self._delay_written
+        self._delay_written += delay
+
+        width  = self._width * self._scale
+        height = self._height * self._scale
+        stride = self._width // 8
+
+        indices = bytearray()
+
+        for y in range(self._height):
+            row = b''.join(self._pixels[b] for b in data[y * stride:(y + 1) * stride])
+            indices += row * self._scale
+
+        f = self._file
+
+        # Graphic Control Extension (delay), Image Descriptor then LZW data in sub-blocks
+        f.write(struct.pack('<BBBBHBB', 0x21, 0xF9, 0x04, 0x00, delay, 0x00, 0x00))
+        f.write(struct.pack('<BHHHHB', 0x2C, 0, 0, width, height, 0x00))
+        f.write(bytes([2]))
+
+        compressed = _lzw_encode(indices, 2)
+
+        for i in range(0, len(compressed), 255):
+            chunk = compressed[i:i + 255]
+            f.write(bytes([len(chunk)]))
+            f.write(chunk)
+
+        f.write(b'\x00')
+
+    def close(self):
+        self._file.write(b'\x3B')
+        self._file.close()
+
+    def _write_header(self):
+        f = self._file
+
+        f.write(b'GIF89a')
+        # Logical Screen Descriptor, 2-entry global color table
+        f.write(struct.pack('<HHBBB', self._width * self._scale, self._height * self._scale, 0x80, 0, 0))
+        f.write(self.PALETTE)
+        # Loop forever
+        f.write(b'\x21\xFF\x0BNETSCAPE2.0\x03\x01\x00\x00\x00')
+
+def _lzw_encode(indices, min_code_size):
+    clear = 1 << min_code_size
+    end   = clear + 1
+
+    out    = bytearray()
+    buffer = 0
+    bits   = 0
+
+    def emit(code, size):
+        nonlocal buffer, bits
+
+        buffer |= code << bits
+        bits += size
+
+        while bits >= 8:
+            out.append(buffer & 0xFF)
+            buffer >>= 8
+            bits -= 8
+
+    # Table entries are keyed by (prefix code << 8 | next index)
+    table = {}
+    next_code = end + 1
+    code_size = min_code_size + 1
+
+    emit(clear, code_size)
+
+    prefix = indices[0]
+
+    for index in indices[1:]:
+        key = prefix << 8 | index
+        code = table.get(key)
+
+        if code is not None:
+            prefix = code
+            continue
+
+        emit(prefix, code_size)
+
+        if next_code < 4096:
+            table[key] = next_code
+            next_code += 1
+
+            if next_code > 1 << code_size and code_size < 12:
+                code_size += 1
+        else:
+            emit(clear, code_size)
+
+            table = {}
+            next_code = end + 1
+            code_size = min_code_size + 1
+
+        prefix = index
+
+    emit(prefix, code_size)
+    emit(end, code_size)
+
+    if bits:
+        out.append(buffer & 0xFF)
+
+    return bytes(out)
+
+class Recorder:
+    """
+    Records the frames rendered by a framebuffer. Only frame changes are kept, with how many frames they were held
+    for, and are encoded on a background thread: memory use is proportional to the distinct frames waiting to be
+    encoded, not to the duration of the run.
+
+    Frames are recorded at width x height, lower resolutions being scaled up to it.
+
+    Attached with the machine, frames are held for the frames it emulated, renders skipped by the pacer (late or
+    turbo frames) included. Without it, every render counts as one frame.
+    """
+
+    def __init__(self, path, width=64, height=32, scale=4, fps=60):
+        self._writer = GifWriter(open(path, 'wb'), width, height, scale=scale, fps=fps)
+        self._width  = width
+        self._height = height
+        self._queue  = queue.Queue()
+
+        self._last = None
+        # Frame number the last frame was first captured at
+        self._since = 0
+
+        self._framebuffer = None
+        self._machine = None
+        self._thread = threading.Thread(target=self._encode, daemon=True)
+        self._thread.start()
+
+    def attach(self, framebuffer, machine=None):
+        framebuffer.subscribe(self.capture)
+        self._framebuffer = framebuffer
+        self._machine = machine
+
+    def capture(self, framebuffer):
+        data = framebuffer.to_bytes(self._width, self._height)
+
+        if data == self._last:
+            return
+
+        # Number of the frame being rendered: the machine counts it once the render is done
+        frame = self._machine.frames if self._machine is not None else framebuffer.renders - 1
+
+        if self._last is not None:
+            self._queue.put((self._last, frame - self._since))
+
+        self._last = data
+        self._since = frame
+
+    def _frames(self):
+        if self._machine is not None:
+            return self._machine.frames
+
+        return self._framebuffer.renders
+
+    def close(self):
+        if self._last is not None:
+            self._queue.put((self._last, max(1, self._frames() - self._since)))
+            self._last = None
+
+        if self._framebuffer is not None:
+            self._framebuffer.unsubscribe(self.capture)
+            self._framebuffer = None
+            self._machine = None
+
+        self._queue.put(None)
+        self._thread.join()
+
+    def _encode(self):
+        while (item := self._queue.get()) is not None:
+            self._writer.write(*item)
+
+        self._writer.close()
@@ -0,0 +1,115 @@
+from core.exceptions import RomTooLargeError
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+
+class Rom:
+    def __init__(self, name, data, digest=None):
+        self.name    = name
+        self.data    = bytes(data)
+        self._digest = digest
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, 'rb') as f:
+            return cls(os.path.basename(path), f.read())
+
+    @property
+    def hash(self):
+        """
+        Content hash of the ROM, used as a key for everything cached per ROM.
+        """
+
+        if self._digest is None:
+            self._digest = hashlib.sha1(self.data).hexdigest()
+
+        return self._digest
+
+    def load_into(self, memory, address):
+        max_size = len(memory) - address
+
+        if len(self.data) > max_size:
+            raise RomTooLargeError(len(self.data), max_size)
+
+        memory.load(address, self.data)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __repr__(self):
+        return f"Rom({self.name}, 0x{len(self.data):x} bytes, {self.hash[:12]})"
+
+class RomLibrary:
+    """
+    Many ROMs packed in a single memory-mapped file.
+
+    Layout: MAGIC, header length (uint32 LE), JSON header {name: [offset, size, hash]}, then the ROM contents
+    (offsets are relative to the end of the header).
+    """
+
+    MAGIC = b'C8RL'
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self._map  = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._map[:4] != self.MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a ROM library")
+
+        (header_size,) = struct.unpack_from('<I', self._map, 4)
+        self._index = json.loads(self._map[8:8 + header_size])
+        self._base  = 8 + header_size
+
+    @classmethod
+    def build(cls, path, files):
+        roms = [Rom.from_file(f) for f in files]
+
+        index = {}
+        offset = 0
+
+        for rom in roms:
+            index[rom.name] = [offset, len(rom), rom.hash]
+            offset += len(rom)
+
+        header = json.dumps(index).encode()
+
+        with open(path, 'wb') as f:
+            f.write(cls.MAGIC)
+            f.write(struct.pack('<I', len(header)))
+            f.write(header)
+
+            for rom in roms:
+                f.write(rom.data)
+
+    def names(self):
+        return list(self._index.keys())
+
+    def __getitem__(self, name):
+        offset, size, digest = self._index[name]
+        offset += self._base
+
+        return Rom(name, self._map[offset:offset + size], digest=digest)
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __iter__(self):
+        for name in self._index:
+            yield self[name]
+
+    def __len__(self):
+        return len(self._index)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
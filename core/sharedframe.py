@@ -0,0 +1,117 @@
+from multiprocessing import shared_memory
+
+import argparse
+import struct
+import time
+
+# Sequence number, width, height, followed by the packed framebuffer
+HEADER = struct.Struct('<QHH')
+
+class FramePublisher:
+    """
+    Writes frames into a shared memory segment that other processes read with FrameReader.
+
+    The sequence number is odd while a frame is being written and is incremented by 2 per frame (seqlock), so
+    readers never need a lock to get a consistent frame.
+    """
+
+    def __init__(self, name=None, width=64, height=32):
+        self._shm = shared_memory.SharedMemory(name=name, create=True, size=HEADER.size + width * height // 8)
+        self._sequence = 0
+
+        HEADER.pack_into(self._shm.buf, 0, 0, width, height)
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def publish(self, framebuffer):
+        data = framebuffer.to_bytes()
+        buf  = self._shm.buf
+
+        HEADER.pack_into(buf, 0, self._sequence + 1, framebuffer.width, framebuffer.height)
+        buf[HEADER.size:HEADER.size + len(data)] = data
+
+        self._sequence += 2
+        HEADER.pack_into(buf, 0, self._sequence, framebuffer.width, framebuffer.height)
+
+    def close(self):
+        self._shm.close()
+        self._shm.unlink()
+
+class FrameReader:
+    def __init__(self, name):
+        self._shm = shared_memory.SharedMemory(name=name)
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def sequence(self):
+        return HEADER.unpack_from(self._shm.buf, 0)[0]
+
+    def read(self):
+        """
+        Latest complete frame as (frame number, width, height, packed rows), None before the first frame.
+        """
+
+        buf = self._shm.buf
+
+        while True:
+            sequence, width, height = HEADER.unpack_from(buf, 0)
+
+            if sequence == 0:
+                return None
+
+            if sequence & 1:
+                # Frame being written
+                continue
+
+            data = bytes(buf[HEADER.size:HEADER.size + width * height // 8])
+
+            if HEADER.unpack_from(buf, 0)[0] == sequence:
+                return sequence // 2, width, height, data
+
+    def wait(self, after, timeout=None, interval=0.001):
+        """
+        Wait for a frame newer than frame number after, None on timeout.
+        """
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while self.sequence() // 2 <= after:
+            if deadline is not None and time.monotonic() > deadline:
+                return None
+
+            time.sleep(interval)
+
+        return self.read()
+
+    def close(self):
+        self._shm.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.sharedframe", description="Monitor published framebuffers")
+    parser.add_argument('names', nargs='+', help="shared memory segment names")
+    parser.add_argument('--interval', type=float, default=1.0, help="seconds between reports")
+    args = parser.parse_args(argv)
+
+    readers = [FrameReader(name) for name in args.names]
+    last = [reader.sequence() // 2 for reader in readers]
+
+    try:
+        while True:
+            time.sleep(args.interval)
+
+            for i, reader in enumerate(readers):
+                frame = reader.sequence() // 2
+                print(f"{reader.name}: frame {frame} ({(frame - last[i]) / args.interval:.1f} fps)")
+                last[i] = frame
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for reader in readers:
+            reader.close()
+
+if __name__ == '__main__':
+    main()
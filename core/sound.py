@@ -1,25 +1,144 @@
-import pygame
-import pygame.mixer
-import pygame.sndarray
 import math
-import numpy
 
-class Sound:
-    def __init__(self, timer):
-        self._timer = timer
+class MixerSink:
+    """
+    Plays beeps through pygame.mixer. The mixer is initialized and the tone built on the first beep, not at
+    startup: many ROMs never beep before their first frames.
+    """
+
+    def __init__(self, frequency=44100):
+        self._frequency = frequency
+        self._tone  = None
+        self._sound = None
+
+    def start(self, frame, audio=None):
+        import pygame.sndarray
+
+        if self._tone is None:
+            self._open()
+
+        if audio is not None and audio.pattern is not None:
+            self._sound = pygame.sndarray.make_sound(audio.build_samples(rate=self._frequency))
+        else:
+            self._sound = self._tone
+
+        self._sound.play(-1)
+
+    def stop(self, frame):
+        self._sound.stop()
 
-        pygame.mixer.pre_init(frequency=44100, channels=1)
+    def _open(self):
+        import pygame.mixer
+        import pygame.sndarray
+
+        pygame.mixer.pre_init(frequency=self._frequency, channels=1)
         pygame.mixer.init()
 
-        self._sound = pygame.sndarray.make_sound(self.build_samples())
+        self._tone = pygame.sndarray.make_sound(Sound.build_samples(rate=self._frequency))
+
+class RecordingSink:
+    def __init__(self):
+        # List of [start_frame, stop_frame] beeps, stop_frame is None while the beep is playing
+        self.timeline = []
+
+    def start(self, frame, audio=None):
+        self.timeline.append([frame, None])
+
+    def stop(self, frame):
+        self.timeline[-1][1] = frame
+
+class AudioPattern:
+    """
+    XO-CHIP audio pattern buffer: 128 1-bit samples looped at 4000 * 2 ^ ((pitch - 64) / 48) Hz.
+    """
+
+    def __init__(self):
+        self.pattern = None
+        self.pitch   = 64
+        # Incremented on every change, so a playing sound knows it has to restart
+        self.version = 0
+
+    def reset(self):
+        self.pattern = None
+        self.pitch   = 64
+        self.version += 1
+
+    def load(self, data):
+        self.pattern = bytes(data)
+        self.version += 1
+
+    def set_pitch(self, pitch):
+        self.pitch = pitch
+        self.version += 1
+
+    @property
+    def rate(self):
+        return 4000 * 2 ** ((self.pitch - 64) / 48)
+
+    def build_samples(self, rate=44100):
+        import numpy
+
+        bits = numpy.unpackbits(numpy.frombuffer(self.pattern, dtype=numpy.uint8))
+
+        # One loop of the pattern resampled at the output rate
+        length = max(1, round(len(bits) * rate / self.rate))
+        indices = (numpy.arange(length) * self.rate / rate).astype(numpy.int64) % len(bits)
+
+        return numpy.where(bits[indices], Sound.AMPLITUDE, -Sound.AMPLITUDE).astype(numpy.int16)
+
+class Sound:
+    TONE      = 440
+    AMPLITUDE = 4096
+
+    _samples_cache = {}
+
+    def __init__(self, timer, sink=None, audio=None):
+        self._timer   = timer
+        self._sink    = sink if sink is not None else MixerSink()
+        self._audio   = audio
+        self._playing = False
+        self._frame   = 0
+        self._version = None
 
     def play(self):
-        if self._timer.get() > 0:
-            self._sound.play(-1)
-        else:
-            self._sound.stop()
+        playing = self._timer.get() > 0
+        version = self._audio.version if self._audio is not None else None
+
+        # Only talk to the sink on 0 -> nonzero and nonzero -> 0 transitions, or when the pattern changes while playing
+        if playing != self._playing or (playing and version != self._version):
+            if playing:
+                if self._playing:
+                    self._sink.stop(self._frame)
+
+                self._sink.start(self._frame, self._audio)
+            else:
+                self._sink.stop(self._frame)
+
+            self._playing = playing
+            self._version = version
+
+        self._frame += 1
+
+    def reset(self):
+        if self._playing:
+            self._sink.stop(self._frame)
+
+        self._playing = False
+        self._version = None
+
+    @classmethod
+    def build_samples(cls, rate=44100):
+        if rate in cls._samples_cache:
+            return cls._samples_cache[rate]
+
+        import numpy
+
+        # Shortest buffer holding a whole number of periods, so play(-1) loops without a click
+        # (440 Hz at 44100 Hz: 2205 samples = 22 periods)
+        length = rate // math.gcd(rate, cls.TONE)
+        t = numpy.arange(length, dtype=numpy.float64)
+
+        samples = (cls.AMPLITUDE * numpy.sin(2.0 * numpy.pi * cls.TONE * t / rate)).astype(numpy.int16)
+        cls._samples_cache[rate] = samples
 
-    def build_samples(self):
-        return numpy.array([
-            4096 * math.sin(2.0 * math.pi * 440 * t / 44100) for t in range(44100)
-        ]).astype(numpy.int16)
\ No newline at end of file
+        return samples
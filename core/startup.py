@@ -0,0 +1,98 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Startup milestones, in order
+MILESTONES = ('import', 'machine', 'first_instruction', 'first_frame')
+
+def _child(rom, headless, started):
+    """
+    Runs in a fresh interpreter: prints the seconds from started (the parent's time.time() before spawning it) to
+    every milestone, as JSON.
+    """
+
+    times = {}
+
+    from core.chip8 import Chip8
+
+    times['import'] = time.time() - started
+
+    machine = Chip8(headless=headless)
+    times['machine'] = time.time() - started
+
+    machine.load(rom)
+    machine.reset()
+    machine.cpu.tick()
+    times['first_instruction'] = time.time() - started
+
+    machine.frame()
+    times['first_frame'] = time.time() - started
+
+    print(json.dumps(times))
+
+def measure(rom, headless=True, runs=5, env=None):
+    """
+    Startup times of runs cold processes, [{milestone: seconds since the process was spawned}].
+    """
+
+    results = []
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    for _ in range(0, runs):
+        command = [sys.executable, '-m', 'core.startup', rom, '--child', str(time.time())]
+
+        if not headless:
+            command.append('--windowed')
+
+        output = subprocess.run(
+            command, cwd=root, env=env, check=True, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        ).stdout
+
+        results.append(json.loads(output.decode().strip().splitlines()[-1]))
+
+    return results
+
+def report(results):
+    """
+    Median milliseconds of every milestone.
+    """
+
+    return {milestone: statistics.median(r[milestone] for r in results) * 1000 for milestone in MILESTONES}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.startup", description="Measure the emulator cold start")
+    parser.add_argument('rom')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--windowed', action='store_true', help="only measure the windowed mode")
+    parser.add_argument('--headless', action='store_true', help="only measure the headless mode")
+    parser.add_argument('--child', metavar='STARTED', type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child is not None:
+        _child(args.rom, not args.windowed, args.child)
+        return
+
+    modes = []
+
+    if not args.windowed:
+        modes.append(('headless', True))
+    if not args.headless:
+        modes.append(('windowed', False))
+
+    print(f"{'mode':<10}" + "".join(f"{milestone:>20}" for milestone in MILESTONES) + "   (ms, median)")
+
+    for name, headless in modes:
+        try:
+            times = report(measure(args.rom, headless, args.runs))
+        except subprocess.CalledProcessError:
+            print(f"{name:<10}  failed (no display? try SDL_VIDEODRIVER=dummy)")
+            continue
+
+        print(f"{name:<10}" + "".join(f"{times[milestone]:>20.1f}" for milestone in MILESTONES))
+
+if __name__ == '__main__':
+    main()
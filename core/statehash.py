@@ -0,0 +1,252 @@
+from core.memory import Memory
+from core.register import Register
+
+from collections import OrderedDict
+
+_MASK64 = (1 << 64) - 1
+
+def _mix(key):
+    """
+    splitmix64 of key, the random-looking 64-bit value of a (location, value) pair.
+    """
+
+    x = (key * 0x9E3779B97F4A7C15) & _MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK64
+
+    return x ^ (x >> 31)
+
+def _cell(key, value):
+    # Zero cells hash to 0, so an all-zero area costs nothing to hash
+    return _mix(key << 16 | value) if value else 0
+
+# Key spaces of the hashed locations
+_MEMORY    = 0
+_STACK     = 1 << 20
+_REGISTERS = 2 << 20
+_SCALARS   = 3 << 20
+
+class HashedMemory(Memory):
+    """
+    Memory keeping the XOR of its cells hashes (_hash), updated on every write. Switched in place by StateHash.
+    """
+
+    def __setitem__(self, index, value):
+        old = self[index]
+
+        super().__setitem__(index, value)
+
+        if old != value:
+            self._hash ^= _cell(self._key + index, old) ^ _cell(self._key + index, value)
+
+    def load(self, offset, data):
+        old = self._buffer[offset:offset + len(data)]
+
+        super().load(offset, data)
+
+        key = self._key + offset
+        h = 0
+
+        for i, (before, after) in enumerate(zip(old, data)):
+            if before != after:
+                h ^= _cell(key + i, before) ^ _cell(key + i, after)
+
+        self._hash ^= h
+
+    def restore(self, image):
+        super().restore(image)
+
+        self._hash = self._state.image_hash(self._key, image)
+
+class HashedRegister(Register):
+    def set(self, value):
+        old = self._value
+
+        super().set(value)
+
+        if old != self._value:
+            self._state.hash ^= _cell(self._key, old) ^ _cell(self._key, self._value)
+
+class StateHash:
+    """
+    Zobrist-style 64-bit hash of a machine state: memory, stack, registers, PC, SP, timers and framebuffer.
+
+    Memory, stack and registers are switched to hashing subclasses that update their hash on every write, the
+    framebuffer maintains its own digest. digest() only combines them with the few plain int fields (PC, SP, timers).
+
+    Memory images given to Memory.restore() (template images on every reset) are hashed once, they must not be
+    modified afterwards.
+    """
+
+    def __init__(self, machine):
+        self._machine = machine
+        self._cpu     = machine.cpu
+
+        # Hash of the registers
+        self.hash = 0
+        # Hash of the memory images given to restore(), by identity (template images are restored on every reset)
+        self._images = {}
+
+        self._attach()
+
+    def digest(self):
+        cpu = self._cpu
+        display = self._machine.display
+
+        return (
+            self.hash
+            ^ cpu._memory._hash
+            ^ cpu._stack._hash
+            ^ display.digest()
+            ^ _cell(_SCALARS, cpu._pc + 1)
+            ^ _cell(_SCALARS + 1, cpu._sp + 1)
+            ^ _cell(_SCALARS + 2, cpu._delay_timer.get() + 1)
+            ^ _cell(_SCALARS + 3, cpu._sound_timer.get() + 1)
+            ^ _cell(_SCALARS + 4, display.width)
+        )
+
+    def full(self):
+        """
+        Hash recomputed from scratch, equal to digest() (for checking).
+        """
+
+        cpu = self._cpu
+        incremental = self.hash ^ cpu._memory._hash ^ cpu._stack._hash
+
+        h = self.image_hash(_MEMORY, cpu._memory._buffer, cache=False)
+        h ^= self.image_hash(_STACK, cpu._stack._buffer, cache=False)
+        h ^= self._registers_hash()
+
+        return self.digest() ^ incremental ^ h
+
+    def image_hash(self, key, image, cache=True):
+        if cache and id(image) in self._images and self._images[id(image)][0] is image:
+            return self._images[id(image)][1]
+
+        h = 0
+
+        for address, value in enumerate(image):
+            if value:
+                h ^= _mix((key + address) << 16 | value)
+
+        if cache and len(image) > 0x100:
+            self._images[id(image)] = (image, h)
+
+        return h
+
+    def detach(self):
+        cpu = self._cpu
+
+        cpu._memory.__class__ = Memory
+        cpu._stack.__class__ = Memory
+
+        for register in cpu._v + [cpu._i]:
+            register.__class__ = Register
+
+    def _registers_hash(self):
+        cpu = self._cpu
+        h = 0
+
+        for key, register in enumerate(cpu._v + [cpu._i]):
+            h ^= _cell(_REGISTERS + key, register.get())
+
+        return h
+
+    def _attach(self):
+        cpu = self._cpu
+
+        for memory, key in [(cpu._memory, _MEMORY), (cpu._stack, _STACK)]:
+            memory.__class__ = HashedMemory
+            memory._state = self
+            memory._key = key
+            memory._hash = self.image_hash(key, memory._buffer, cache=False)
+
+        for key, register in enumerate(cpu._v + [cpu._i]):
+            register.__class__ = HashedRegister
+            register._state = self
+            register._key = _REGISTERS + key
+
+        self.hash = self._registers_hash()
+
+class TranspositionTable:
+    """
+    Bounded map of state hashes to search data, the least recently used entries being evicted first.
+
+    Entries also carry the generation they were stored in, new_generation() then lets drivers evict entries not seen
+    for a number of generations (age eviction) with evict_older_than().
+    """
+
+    def __init__(self, capacity=1 << 20):
+        self.capacity   = capacity
+        self.generation = 0
+
+        self._entries = OrderedDict()
+
+        self.hits   = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        entry = self._entries.get(key)
+
+        if entry is None:
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        self._entries.move_to_end(key)
+
+        return entry[0]
+
+    def put(self, key, value=True):
+        entries = self._entries
+
+        if key in entries:
+            entries.move_to_end(key)
+        elif len(entries) >= self.capacity:
+            entries.popitem(last=False)
+
+        entries[key] = (value, self.generation)
+
+    def seen(self, key):
+        """
+        Whether key was already stored, storing it when it was not: the usual duplicate state check.
+        """
+
+        entries = self._entries
+
+        if key in entries:
+            self.hits += 1
+            entries.move_to_end(key)
+            entries[key] = (entries[key][0], self.generation)
+            return True
+
+        self.misses += 1
+
+        if len(entries) >= self.capacity:
+            entries.popitem(last=False)
+
+        entries[key] = (True, self.generation)
+
+        return False
+
+    def new_generation(self):
+        self.generation += 1
+
+    def evict_older_than(self, generations):
+        """
+        Drop the entries last stored or seen more than generations generations ago.
+        """
+
+        oldest = self.generation - generations
+        stale = [key for key, (_, generation) in self._entries.items() if generation < oldest]
+
+        for key in stale:
+            del self._entries[key]
+
+        return len(stale)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,411 @@
+from core.chip8 import Chip8
+from core import quirks
+
+from base64 import b64encode
+from hashlib import sha1
+
+import argparse
+import asyncio
+import re
+import struct
+import threading
+
+# Message kind, frame number, width, height, followed by the RLE payload
+HEADER = struct.Struct('<BIHH')
+# Length prefix of the messages on plain TCP connections
+LENGTH = struct.Struct('<I')
+# Key event sent by clients: 1 pressed / 0 released, key (0x0 - 0xF)
+KEY_EVENT = struct.Struct('<BB')
+
+KEYFRAME = 0
+DELTA    = 1
+
+# Zero runs worth a control byte of their own
+_ZEROS = re.compile(b'\x00{2,}')
+
+_WEBSOCKET_GUID = b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+def rle_encode(data):
+    """
+    PackBits-like encoding tuned for XOR deltas: a control byte c >= 0x80 stands for (c & 0x7F) + 1 zero bytes,
+    c < 0x80 is followed by c + 1 literal bytes. Unchanged rows collapse into zero runs.
+    """
+
+    out = bytearray()
+    position = 0
+
+    for match in _ZEROS.finditer(data):
+        _literals(out, data, position, match.start())
+
+        run = match.end() - match.start()
+
+        while run:
+            count = min(run, 128)
+            out.append(0x80 | (count - 1))
+            run -= count
+
+        position = match.end()
+
+    _literals(out, data, position, len(data))
+
+    return bytes(out)
+
+def _literals(out, data, start, end):
+    while start < end:
+        count = min(end - start, 128)
+        out.append(count - 1)
+        out += data[start:start + count]
+        start += count
+
+def rle_decode(data):
+    out = bytearray()
+    i = 0
+
+    while i < len(data):
+        control = data[i]
+
+        if control & 0x80:
+            out += bytes((control & 0x7F) + 1)
+            i += 1
+        else:
+            out += data[i + 1:i + control + 2]
+            i += control + 2
+
+    return bytes(out)
+
+def xor_bytes(a, b):
+    return (int.from_bytes(a, 'big') ^ int.from_bytes(b, 'big')).to_bytes(len(a), 'big')
+
+def encode(frame, previous=None):
+    """
+    Message for frame (frame number, width, height, packed rows), a delta against previous when it has the same
+    size, a keyframe otherwise. None when nothing changed.
+    """
+
+    number, width, height, data = frame
+
+    if previous is None or previous[1:3] != (width, height):
+        return HEADER.pack(KEYFRAME, number, width, height) + rle_encode(data)
+
+    if data == previous[3]:
+        return None
+
+    return HEADER.pack(DELTA, number, width, height) + rle_encode(xor_bytes(data, previous[3]))
+
+class FrameDecoder:
+    """
+    Client side: rebuilds frames from keyframe and delta messages.
+    """
+
+    def __init__(self):
+        self.frame = None
+
+    def decode(self, message):
+        kind, number, width, height = HEADER.unpack_from(message)
+        data = rle_decode(message[HEADER.size:])
+
+        if kind == DELTA:
+            if self.frame is None:
+                raise ValueError("Delta received before any keyframe")
+
+            data = xor_bytes(data, self.frame[3])
+
+        self.frame = (number, width, height, data)
+
+        return self.frame
+
+class _Client:
+    def __init__(self, writer, websocket):
+        self.writer    = writer
+        self.websocket = websocket
+        self.wakeup    = asyncio.Event()
+
+        # Last frame sent, the base of the next delta
+        self.sent = None
+
+class StreamServer:
+    """
+    Streams a display to TCP and WebSocket clients, each frame as a delta against the last frame that client got.
+
+    Every client has a single "latest frame" slot: frames published while a client is still sending (or waiting
+    for its socket to drain) replace each other, so a slow client skips intermediate frames instead of queuing them.
+    Clients send key events back, applied to keypad.
+
+    Plain TCP messages are prefixed by their 4-byte length, WebSocket ones are binary messages.
+    """
+
+    def __init__(self, keypad=None, high_water=16 * 1024):
+        self._keypad     = keypad
+        self._high_water = high_water
+
+        self._clients = set()
+        self._servers = []
+        self._latest  = None
+
+        self._loop   = None
+        self._thread = None
+        self._display = None
+
+        self.frames_published = 0
+        self.frames_sent      = 0
+        self.bytes_sent       = 0
+
+    async def start(self, port=8809, websocket_port=None, host='127.0.0.1'):
+        self._loop = asyncio.get_running_loop()
+
+        if port is not None:
+            self._servers.append(await asyncio.start_server(self._handle_tcp, host, port))
+        if websocket_port is not None:
+            self._servers.append(await asyncio.start_server(self._handle_websocket, host, websocket_port))
+
+        return [server.sockets[0].getsockname()[1] for server in self._servers]
+
+    async def stop(self):
+        for server in self._servers:
+            server.close()
+
+        for client in list(self._clients):
+            client.writer.close()
+
+        for server in self._servers:
+            await server.wait_closed()
+
+        self._servers = []
+
+    def publish(self, frame):
+        """
+        Make frame (frame number, width, height, packed rows) the latest frame of every client, on the server loop.
+        """
+
+        self._latest = frame
+        self.frames_published += 1
+
+        for client in self._clients:
+            client.wakeup.set()
+
+    def attach(self, display):
+        """
+        Publish display on every render, from any thread.
+        """
+
+        display.subscribe(self.capture)
+        self._display = display
+
+    def capture(self, display):
+        frame = (display.renders, display.width, display.height, display.to_bytes())
+
+        self._loop.call_soon_threadsafe(self.publish, frame)
+
+    def start_thread(self, port=8809, websocket_port=None, host='127.0.0.1'):
+        """
+        Run the server on its own event loop in a daemon thread (next to a blocking emulator loop), returns the
+        ports listened on.
+        """
+
+        started = threading.Event()
+        loop = asyncio.new_event_loop()
+        errors = []
+        ports = []
+
+        def run():
+            asyncio.set_event_loop(loop)
+
+            try:
+                ports.extend(loop.run_until_complete(self.start(port, websocket_port, host)))
+            except Exception as e:
+                # Port in use...: raised again in the caller's thread
+                errors.append(e)
+                loop.run_until_complete(self.stop())
+                loop.close()
+                return
+            finally:
+                started.set()
+
+            loop.run_forever()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        started.wait()
+
+        if errors:
+            self._thread.join()
+            self._thread = None
+
+            raise errors[0]
+
+        return ports
+
+    def close(self):
+        if self._display is not None:
+            self._display.unsubscribe(self.capture)
+            self._display = None
+
+        if self._thread is not None:
+            asyncio.run_coroutine_threadsafe(self.stop(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._thread = None
+
+    @property
+    def clients(self):
+        return len(self._clients)
+
+    # Connections
+
+    async def _handle_tcp(self, reader, writer):
+        async def read_event():
+            return await reader.readexactly(KEY_EVENT.size)
+
+        await self._serve(_Client(writer, websocket=False), read_event)
+
+    async def _handle_websocket(self, reader, writer):
+        if not await _websocket_handshake(reader, writer):
+            writer.close()
+            return
+
+        async def read_event():
+            while True:
+                opcode, payload = await _websocket_read(reader)
+
+                if opcode == 0x8:
+                    raise ConnectionResetError("WebSocket closed by the client")
+                if opcode == 0x2 and len(payload) == KEY_EVENT.size:
+                    return payload
+
+        await self._serve(_Client(writer, websocket=True), read_event)
+
+    async def _serve(self, client, read_event):
+        client.writer.transport.set_write_buffer_limits(high=self._high_water)
+        self._clients.add(client)
+
+        sender = asyncio.ensure_future(self._send_frames(client))
+
+        if self._latest is not None:
+            client.wakeup.set()
+
+        try:
+            while True:
+                pressed, key = KEY_EVENT.unpack(await read_event())
+
+                if self._keypad is not None and key < 16:
+                    if pressed:
+                        self._keypad.press(key)
+                    else:
+                        self._keypad.release(key)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._clients.discard(client)
+            sender.cancel()
+            client.writer.close()
+
+    async def _send_frames(self, client):
+        writer = client.writer
+
+        try:
+            while True:
+                await client.wakeup.wait()
+                client.wakeup.clear()
+
+                frame = self._latest
+                message = encode(frame, client.sent)
+
+                if message is None:
+                    continue
+
+                if client.websocket:
+                    data = _websocket_frame(message)
+                else:
+                    data = LENGTH.pack(len(message)) + message
+
+                writer.write(data)
+                client.sent = frame
+
+                self.frames_sent += 1
+                self.bytes_sent += len(data)
+
+                # Frames published meanwhile only replace the latest one
+                await writer.drain()
+        except ConnectionError:
+            pass
+
+async def _websocket_handshake(reader, writer):
+    request = await reader.readuntil(b'\r\n\r\n')
+    match = re.search(rb'^Sec-WebSocket-Key:\s*(\S+)\s*$', request, re.IGNORECASE | re.MULTILINE)
+
+    if match is None:
+        writer.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n\r\n")
+        return False
+
+    accept = b64encode(sha1(match.group(1) + _WEBSOCKET_GUID).digest())
+
+    writer.write(
+        b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+        b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n"
+    )
+
+    return True
+
+def _websocket_frame(payload):
+    length = len(payload)
+
+    if length < 126:
+        header = struct.pack('!BB', 0x82, length)
+    elif length < 1 << 16:
+        header = struct.pack('!BBH', 0x82, 126, length)
+    else:
+        header = struct.pack('!BBQ', 0x82, 127, length)
+
+    return header + payload
+
+async def _websocket_read(reader):
+    first, second = await reader.readexactly(2)
+    length = second & 0x7F
+
+    if length == 126:
+        length = struct.unpack('!H', await reader.readexactly(2))[0]
+    elif length == 127:
+        length = struct.unpack('!Q', await reader.readexactly(8))[0]
+
+    mask = await reader.readexactly(4) if second & 0x80 else None
+    payload = await reader.readexactly(length)
+
+    if mask is not None:
+        payload = bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+
+    return first & 0x0F, payload
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.stream", description="Stream a headless machine's display")
+    parser.add_argument('rom')
+    parser.add_argument('--port', type=int, default=8809, help="TCP port on 127.0.0.1")
+    parser.add_argument('--websocket-port', type=int, help="WebSocket port on 127.0.0.1")
+    parser.add_argument('--quirks', choices=quirks.PROFILES, default='modern')
+    args = parser.parse_args(argv)
+
+    machine = Chip8(headless=True, quirks=args.quirks)
+    machine.load(args.rom)
+    machine.reset()
+
+    server = StreamServer(machine.keypad)
+
+    async def run():
+        await server.start(args.port, args.websocket_port)
+        server.attach(machine.display)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+
+        while True:
+            machine.frame()
+
+            deadline += 1 / 60
+            await asyncio.sleep(max(0, deadline - loop.time()))
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
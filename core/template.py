@@ -0,0 +1,22 @@
+from core.memory import Memory
+from core import compiler
+
+class MachineTemplate:
+    """
+    Initial state of a machine running a ROM: the memory image (font and ROM) and the compiled program, if any.
+
+    Built once, then shared by every machine resetting to it: a reset is a single bulk copy of the image.
+    """
+
+    def __init__(self, rom, font, starting_address=0x200, memory_size=0x10000, compiled=True):
+        memory = Memory(memory_size)
+        memory.load(0, font)
+        rom.load_into(memory, starting_address)
+
+        self.rom              = rom
+        self.starting_address = starting_address
+        self.image            = memory.dump()
+        self.program          = compiler.load_cached(rom) if compiled else None
+
+    def __repr__(self):
+        return f"MachineTemplate({self.rom.name}, {'compiled' if self.program is not None else 'interpreted'})"
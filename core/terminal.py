@@ -0,0 +1,228 @@
+from core.framebuffer import FrameBuffer
+from core.keypad import LAYOUT as KEY_MAP
+
+import os
+import select
+import sys
+
+# Braille dot bits of the pixel (column, row) of a 2x4 cell
+_BRAILLE_DOTS = [[0x01, 0x08], [0x02, 0x10], [0x04, 0x20], [0x40, 0x80]]
+
+def _braille_table(row):
+    """
+    For every byte (8 pixels of a row at position row in a 4-row band), the dots it sets in its 4 cells.
+    """
+
+    left, right = _BRAILLE_DOTS[row]
+
+    return [
+        tuple(
+            (left if byte & (0x80 >> 2 * cell) else 0) | (right if byte & (0x40 >> 2 * cell) else 0)
+            for cell in range(0, 4)
+        )
+        for byte in range(0, 256)
+    ]
+
+_BRAILLE = [_braille_table(row) for row in range(0, 4)]
+_BRAILLE_CHARS = [chr(0x2800 + dots) for dots in range(0, 256)]
+
+# Top pixel is bit 0, bottom pixel bit 1 of a 1x2 cell
+_HALF_BLOCKS = [' ', '▀', '▄', '█']
+_HALF = [
+    [tuple((byte >> (7 - x) & 1) << bit for x in range(0, 8)) for byte in range(0, 256)]
+    for bit in range(0, 2)
+]
+
+# Cells unchanged between two changed runs below which the run is rewritten rather than moving the cursor
+_MAX_GAP = 4
+
+class TerminalDisplay(FrameBuffer):
+    """
+    Renders the framebuffer into an ANSI terminal, 2x4 pixels per braille character (or 1x2 per half block with
+    mode='half'), a pixel being lit when it is set in any plane.
+
+    Only the bands of pixel rows that changed since the previous render are turned into characters, and only the
+    changed cells are written, with one cursor move per run of changed cells.
+    """
+
+    MODES = ('braille', 'half')
+
+    def __init__(self, width, height, max_width=None, max_height=None, mode='braille', stream=None):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown terminal mode [{mode}], expected one of {', '.join(self.MODES)}")
+
+        super().__init__(width, height, max_width, max_height)
+
+        self._mode   = mode
+        self._stream = stream if stream is not None else sys.stdout
+
+        self._band = 4 if mode == 'braille' else 2
+        # Composited pixel rows and characters of the last render, None before the first one
+        self._last_rows  = None
+        self._last_cells = None
+        self._last_width = None
+
+        self.bytes_written = 0
+
+    def render(self):
+        output = self.render_ansi()
+
+        if output:
+            self._stream.write(output)
+            self._stream.flush()
+            self.bytes_written += len(output.encode())
+
+        super().render()
+
+    def render_ansi(self):
+        """
+        Escape sequences bringing the terminal from the previous render to the current frame.
+        """
+
+        planes = self._planes
+        rows = [a | b for a, b in zip(planes[0], planes[1])]
+        band = self._band
+        output = []
+
+        if self._last_rows is None or len(self._last_rows) != len(rows) or self._last_width != self._width:
+            # First frame or new resolution: clear the screen, hide the cursor and draw everything
+            output.append('\x1b[?25l\x1b[2J')
+            self._last_rows  = [None] * len(rows)
+            self._last_cells = [None] * ((len(rows) + band - 1) // band)
+            self._last_width = self._width
+
+        for index in range(0, len(self._last_cells)):
+            start = index * band
+
+            if rows[start:start + band] == self._last_rows[start:start + band]:
+                continue
+
+            cells = self._cells(rows[start:start + band])
+            output.append(_diff(index, self._last_cells[index], cells))
+
+            self._last_cells[index] = cells
+
+        self._last_rows = rows
+
+        return ''.join(output)
+
+    def close(self):
+        """
+        Move the cursor below the frame and show it again.
+        """
+
+        self._stream.write(f'\x1b[{len(self._last_cells or []) + 1};1H\x1b[0m\x1b[?25h\n')
+        self._stream.flush()
+
+    def _cells(self, rows):
+        size = self._width // 8
+        packed = [row.to_bytes(size, 'big') for row in rows]
+
+        while len(packed) < self._band:
+            packed.append(bytes(size))
+
+        cells = []
+
+        if self._mode == 'braille':
+            t0, t1, t2, t3 = _BRAILLE
+
+            for b0, b1, b2, b3 in zip(*packed):
+                cells.extend(
+                    _BRAILLE_CHARS[a | b | c | d] for a, b, c, d in zip(t0[b0], t1[b1], t2[b2], t3[b3])
+                )
+        else:
+            top, bottom = _HALF
+
+            for b0, b1 in zip(*packed):
+                cells.extend(_HALF_BLOCKS[a | b] for a, b in zip(top[b0], bottom[b1]))
+
+        return cells
+
+def _diff(line, old, new):
+    """
+    Cursor moves and characters rewriting the cells of terminal line that differ between old and new.
+    """
+
+    if old is None:
+        return f'\x1b[{line + 1};1H' + ''.join(new)
+
+    output = []
+    column = 0
+    end = len(new)
+
+    while column < end:
+        if old[column] == new[column]:
+            column += 1
+            continue
+
+        # Extend the run over short unchanged gaps, cheaper than another cursor move
+        run_end = column + 1
+        gap = 0
+
+        while run_end + gap < end and gap <= _MAX_GAP:
+            if old[run_end + gap] != new[run_end + gap]:
+                run_end += gap + 1
+                gap = 0
+            else:
+                gap += 1
+
+        output.append(f'\x1b[{line + 1};{column + 1}H' + ''.join(new[column:run_end]))
+        column = run_end
+
+    return ''.join(output)
+
+class TerminalKeys:
+    """
+    Keypad input from a terminal in cbreak mode, polled once per frame (Escape quits).
+
+    Terminals only report key presses (auto-repeated while held), a key is held for hold frames after its last
+    press.
+    """
+
+    def __init__(self, keypad, stream=None, hold=6):
+        import termios
+        import tty
+
+        self._keypad = keypad
+        self._fd     = (stream if stream is not None else sys.stdin).fileno()
+        self._hold   = hold
+
+        self._termios = termios
+        self._saved   = termios.tcgetattr(self._fd)
+        tty.setcbreak(self._fd)
+
+        # key -> frames left
+        self._held = {}
+
+    def poll(self):
+        """
+        Apply pending key presses to the keypad, returns False when the user asked to quit.
+        """
+
+        keypad = self._keypad
+
+        for key in list(self._held):
+            self._held[key] -= 1
+
+            if self._held[key] == 0:
+                del self._held[key]
+                keypad.release(key)
+
+        while select.select([self._fd], [], [], 0)[0]:
+            data = os.read(self._fd, 64).decode(errors='ignore')
+
+            if not data:
+                return False
+
+            for char in data.lower():
+                if char == '\x1b':
+                    return False
+
+                if char in KEY_MAP:
+                    self._held[KEY_MAP[char]] = self._hold
+                    keypad.press(KEY_MAP[char])
+
+        return True
+
+    def close(self):
+        self._termios.tcsetattr(self._fd, self._termios.TCSADRAIN, self._saved)
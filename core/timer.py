@@ -8,6 +8,9 @@ class Timer:
         self._freq        = freq
         self._interval    = 1000.0 / freq
 
+        # Times the countdown reached 0
+        self.underflows   = 0
+
     def tick(self):
         if self._countdown == 0:
             return
@@ -17,8 +20,20 @@ class Timer:
         self._countdown -= int(self._accumulator / self._interval)
         self._accumulator //= self._interval
 
-        if self._countdown < 0:
+        if self._countdown <= 0:
             self._countdown = 0
+            self.underflows += 1
+
+    def step(self):
+        """
+        Count down one period regardless of the wall clock, for machines stepped frame by frame.
+        """
+
+        if self._countdown > 0:
+            self._countdown -= 1
+
+            if self._countdown == 0:
+                self.underflows += 1
 
     def set(self, value):
         self._countdown = value
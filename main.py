@@ -1,15 +1,104 @@
 from core.chip8 import Chip8
+from core.coverage import Coverage
+from core.profiler import Profiler
+from core import quirks
+from core.recorder import Recorder
+from core import metrics
+from core.terminal import TerminalDisplay, TerminalKeys
 
+import argparse
 import logging
-import sys
 
 logging.basicConfig(level=logging.DEBUG)
 
-if len(sys.argv) < 2:
-    print("Usage: python main.py <rom file>")
-    exit()
+parser = argparse.ArgumentParser(description="CHIP-8 emulator")
+parser.add_argument('rom', help="ROM file")
+parser.add_argument('--coverage', metavar='FILE', help="record executed instructions into FILE (JSON)")
+parser.add_argument('--profile', metavar='FILE', help="write the subroutine profile into FILE (collapsed stacks)")
+parser.add_argument('--publish', metavar='NAME', help="publish frames into shared memory segment NAME")
+parser.add_argument('--stream', metavar='PORT', type=int, help="stream the display on 127.0.0.1:PORT (TCP)")
+parser.add_argument('--record', metavar='FILE', help="record the run into FILE (GIF)")
+parser.add_argument('--turbo', action='store_true', help="run as fast as possible instead of 60 frames per second")
+parser.add_argument('--metrics-file', metavar='FILE', help="write metrics into FILE (Prometheus text) every 10 s")
+parser.add_argument('--metrics-port', metavar='PORT', type=int, help="serve metrics on http://127.0.0.1:PORT/metrics")
+parser.add_argument('--terminal', nargs='?', const='braille', choices=TerminalDisplay.MODES,
+                    help="render into the terminal (braille or half blocks) instead of a window")
+parser.add_argument('--quirks', choices=quirks.PROFILES, default='modern', help="interpreter behaviors to emulate")
+args = parser.parse_args()
 
-chip = Chip8()
+terminal = None
 
-chip.load(sys.argv[1])
-chip.run()
\ No newline at end of file
+if args.terminal:
+    # Logs would scroll the frame away
+    logging.getLogger().setLevel(logging.WARNING)
+
+    terminal = TerminalDisplay(64, 32, 128, 64, mode=args.terminal)
+    chip = Chip8(quirks=args.quirks, headless=True, display=terminal, input=lambda: keys.poll())
+    keys = TerminalKeys(chip.keypad)
+else:
+    chip = Chip8(quirks=args.quirks)
+
+coverage = None
+
+if args.coverage:
+    coverage = Coverage()
+    chip.record_coverage(coverage)
+
+profiler = None
+
+if args.profile:
+    profiler = Profiler()
+    chip.record_profile(profiler)
+
+publisher = chip.display.publish(args.publish) if args.publish else None
+recorder = None
+
+if args.record:
+    recorder = Recorder(args.record, chip.display.max_width, chip.display.max_height, scale=2)
+    recorder.attach(chip.display, chip)
+
+stream = None
+
+# Port 0 picks a free port
+if args.stream is not None:
+    # asyncio is only imported when streaming
+    from core.stream import StreamServer
+
+    stream = StreamServer(chip.keypad)
+    port, = stream.start_thread(args.stream)
+    stream.attach(chip.display)
+
+    logging.info(f"Streaming the display on 127.0.0.1:{port}")
+
+exporters = []
+
+if args.metrics_file or args.metrics_port:
+    registry = metrics.Registry()
+    chip.register_metrics(registry)
+    metrics.register_caches(registry)
+
+    if args.metrics_file:
+        exporters.append(metrics.FileExporter(registry, args.metrics_file))
+    if args.metrics_port:
+        exporters.append(metrics.HttpExporter(registry, args.metrics_port))
+
+chip.load(args.rom)
+
+try:
+    chip.run(turbo=args.turbo)
+finally:
+    if coverage is not None:
+        coverage.save(args.coverage)
+    if profiler is not None:
+        profiler.save(args.profile)
+    if publisher is not None:
+        publisher.close()
+    if recorder is not None:
+        recorder.close()
+    if stream is not None:
+        stream.close()
+    for exporter in exporters:
+        exporter.close()
+    if terminal is not None:
+        keys.close()
+        terminal.close()
@@ -0,0 +1,78 @@
+import io
+import unittest.mock
+import unittest
+from core.cheats import CheatFinder, CheatShell
+from core.chip8 import Chip8
+from core.rom import Rom
+
+# 0x200: LD I, 0x800
+# 0x202: ADD V0, 0x01
+# 0x204: LD [I], V0
+# 0x206: JP 0x200
+# One loop per frame: the counter at 0x800 is incremented every frame
+ROM = bytes([
+    0xA8, 0x00,
+    0x70, 0x01,
+    0xF0, 0x55,
+    0x12, 0x00,
+])
+
+class TestCheatFinder(unittest.TestCase):
+    def setUp(self):
+        self.machine = Chip8(headless=True, cycles_per_frame=4)
+        self.machine.load_rom(Rom('counter', ROM))
+        self.machine.reset(0)
+
+        self.finder = CheatFinder(self.machine, end=0x1000, capacity=2)
+        self.finder.snapshot()
+
+    def test_snapshots(self):
+        self.finder.run(4)
+
+        self.assertEqual(5, len(self.finder))
+        self.assertEqual((5, 0x1000), self.finder.snapshots.shape)
+        self.assertEqual([0, 1, 2, 3, 4], list(self.finder.values(0x800)))
+        self.assertEqual([0, 1, 2, 3, 4], self.finder.frames)
+
+    def test_narrow(self):
+        self.finder.run(1)
+
+        self.assertEqual(1, self.finder.changed())
+        self.assertEqual([0x800], list(self.finder.candidates))
+
+        self.finder.reset()
+        self.finder.run(3, every=3)
+
+        self.assertEqual(1, self.finder.increased())
+        self.assertEqual(1, self.finder.changed_by(3))
+        self.assertEqual(1, self.finder.equal(4))
+        self.assertEqual(0, self.finder.decreased())
+        self.assertTrue(self.finder.undo())
+        self.assertEqual([0x800], list(self.finder.candidates))
+
+    def test_snapshot_sets(self):
+        self.finder.run(4)
+
+        self.assertEqual(0x1000 - 1, self.finder.unchanged(range(0, 5)))
+        self.finder.reset()
+        self.assertEqual(1, self.finder.changed_by(1, before=[0, 1, 2, 3], after=[1, 2, 3, 4]))
+        self.finder.reset()
+        self.assertEqual(0, self.finder.changed_by(1, before=[0, 1], after=[2, 3]))
+
+        with self.assertRaises(ValueError):
+            self.finder.increased(before=[0, 1], after=[2])
+
+    def test_shell(self):
+        output = io.StringIO()
+        shell = CheatShell(self.finder, stdout=output)
+
+        with unittest.mock.patch('sys.stdout', output):
+            for line in ("run 2", "inc", "eq 2", "list", "run 1", "by 1", "poke 0x800 0x40"):
+                shell.onecmd(line)
+
+        self.assertIn("0x0800: 00 02", output.getvalue())
+        self.assertEqual([0x800], list(self.finder.candidates))
+        self.assertEqual(0x40, self.machine.memory[0x800])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+import unittest
+import os
+import tempfile
+from core import compiler
+from core.cpu import Cpu
+from core.memory import Memory
+from core.rom import Rom
+from core.timer import Timer
+
+# 0x200: LD V0, 0x00
+# 0x202: CALL 0x20C
+# 0x204: SE V0, 0x05
+# 0x206: JP 0x202
+# 0x208: JP 0x208
+# 0x20A: (data)
+# 0x20C: ADD V0, 0x01
+# 0x20E: LD V1, V0
+# 0x210: RET
+LOOP = bytes([
+    0x60, 0x00,
+    0x22, 0x0C,
+    0x30, 0x05,
+    0x12, 0x02,
+    0x12, 0x08,
+    0xFF, 0xFF,
+    0x70, 0x01,
+    0x81, 0x00,
+    0x00, 0xEE,
+])
+
+# 0x200: LD I, 0x20A
+# 0x202: LD V0, 0x71      patches 0x20A with ADD V1, 0x05 (0x7105)
+# 0x204: LD V1, 0x05
+# 0x206: LD [I], V1
+# 0x208: JP 0x20A
+# 0x20A: LD V1, 0x01      overwritten before it runs
+# 0x20C: JP 0x20C
+SELF_MODIFYING = bytes([
+    0xA2, 0x0A,
+    0x60, 0x71,
+    0x61, 0x05,
+    0xF1, 0x55,
+    0x12, 0x0A,
+    0x61, 0x01,
+    0x12, 0x0C,
+])
+
+# 0x200: LD V0, 0x00
+# 0x202: SE V0, 0x00      skips the whole 4-byte instruction
+# 0x204: LD I, long 0x1234
+# 0x208: LD I, long 0x2345
+# 0x20C: LD [I], V0-V1
+# 0x20E: JP 0x20E
+LONG_LOAD = bytes([
+    0x60, 0x00,
+    0x30, 0x00,
+    0xF0, 0x00, 0x12, 0x34,
+    0xF0, 0x00, 0x23, 0x45,
+    0x50, 0x12,
+    0x12, 0x0E,
+])
+
+class TestCompiler(unittest.TestCase):
+    def setUp(self):
+        self.cache = tempfile.TemporaryDirectory()
+        os.environ['CHIP8_CACHE_DIR'] = self.cache.name
+
+    def tearDown(self):
+        del os.environ['CHIP8_CACHE_DIR']
+        self.cache.cleanup()
+
+    def make_cpu(self, rom):
+        memory = Memory(0x10000)
+        rom.load_into(memory, 0x200)
+
+        cpu = Cpu(memory, None, delay_timer=Timer(freq=60), sound_timer=Timer(freq=60))
+        cpu.set_starting_address(0x200)
+
+        return cpu
+
+    def assertSameState(self, expected, actual):
+        self.assertEqual(expected._pc, actual._pc)
+        self.assertEqual(expected._sp, actual._sp)
+        self.assertEqual(expected._i.get(), actual._i.get())
+        self.assertEqual([r.get() for r in expected._v], [r.get() for r in actual._v])
+        self.assertEqual(expected._memory._buffer, actual._memory._buffer)
+
+    def test_find_blocks(self):
+        blocks = compiler.find_blocks(Rom('loop', LOOP))
+
+        self.assertEqual(
+            [(0x200, 1), (0x202, 1), (0x204, 1), (0x206, 1), (0x208, 1), (0x20C, 3)],
+            [(block.start, len(block)) for block in blocks]
+        )
+
+    def test_compiled_matches_interpreter(self):
+        rom = Rom('loop', LOOP)
+
+        for cycles in range(0, 40):
+            interpreted = self.make_cpu(rom)
+            for _ in range(0, cycles):
+                interpreted.tick()
+
+            compiled = self.make_cpu(rom)
+            compiler.compile_rom(rom).bind(compiled).run(cycles)
+
+            self.assertSameState(interpreted, compiled)
+
+        self.assertEqual(0x5, compiled._v[0x1].get())
+        self.assertEqual(0x208, compiled._pc)
+
+    def test_self_modifying_code_falls_back_to_interpreter(self):
+        rom = Rom('self modifying', SELF_MODIFYING)
+
+        interpreted = self.make_cpu(rom)
+        for _ in range(0, 10):
+            interpreted.tick()
+
+        compiled = self.make_cpu(rom)
+        compiler.compile_rom(rom).bind(compiled).run(10)
+
+        self.assertSameState(interpreted, compiled)
+        self.assertEqual(0xA, compiled._v[0x1].get())
+
+    def test_compiled_rom_is_cached(self):
+        rom = Rom('loop', LOOP)
+
+        self.assertIsNone(compiler.load_cached(rom))
+
+        compiler.compile_rom(rom)
+        program = compiler.load_cached(Rom('same contents', LOOP))
+
+        self.assertIsNotNone(program)
+        self.assertEqual(6, len(program.blocks))
+
+    def test_long_instructions(self):
+        rom = Rom('long load', LONG_LOAD)
+
+        for cycles in range(0, 8):
+            interpreted = self.make_cpu(rom)
+            for _ in range(0, cycles):
+                interpreted.tick()
+
+            compiled = self.make_cpu(rom)
+            compiler.compile_rom(rom).bind(compiled).run(cycles)
+
+            self.assertSameState(interpreted, compiled)
+
+        self.assertEqual(0x2345, compiled._i.get())
+        self.assertEqual(0x20E, compiled._pc)
@@ -0,0 +1,123 @@
+import unittest
+import os
+import tempfile
+from core.coverage import Coverage
+from core.cpu import Cpu
+from core.memory import Memory
+from core.profiler import Profiler
+from core.rom import Rom
+from core.timer import Timer
+
+# 0x200: LD V0, 0x01
+# 0x202: SE V0, 0x01
+# 0x204: LD V1, 0x02      skipped
+# 0x206: JP 0x206
+ROM = bytes([
+    0x60, 0x01,
+    0x30, 0x01,
+    0x61, 0x02,
+    0x12, 0x06,
+])
+
+class TestCoverage(unittest.TestCase):
+    def setUp(self):
+        self.cache = tempfile.TemporaryDirectory()
+        os.environ['CHIP8_CACHE_DIR'] = self.cache.name
+
+        self.rom = Rom('test', ROM)
+        memory = Memory(0x1000)
+        self.rom.load_into(memory, 0x200)
+
+        self.cpu = Cpu(memory, None, delay_timer=Timer(freq=60), sound_timer=Timer(freq=60))
+        self.cpu.set_starting_address(0x200)
+
+    def tearDown(self):
+        del os.environ['CHIP8_CACHE_DIR']
+        self.cache.cleanup()
+
+    def test_records_executed_addresses(self):
+        coverage = Coverage()
+        coverage.attach(self.cpu)
+
+        for _ in range(0, 4):
+            self.cpu.tick()
+
+        self.assertEqual([0x200, 0x202, 0x206], coverage.executed())
+        self.assertEqual(2, coverage.handlers['_jump_to_address'])
+        self.assertEqual(0, coverage.handler_report()['_draw_sprite'])
+        self.assertEqual(4, self.cpu.instructions)
+
+    def test_detach_restores_plain_tick(self):
+        coverage = Coverage()
+        coverage.attach(self.cpu)
+        coverage.detach()
+
+        self.assertNotIn('tick', vars(self.cpu))
+
+        self.cpu.tick()
+        self.assertEqual([], coverage.executed())
+
+    def test_with_profiler(self):
+        profiler = Profiler()
+        coverage = Coverage()
+
+        profiler.attach(self.cpu)
+        coverage.attach(self.cpu)
+        self.cpu.tick()
+        coverage.detach()
+        self.cpu.tick()
+
+        self.assertEqual([0x200], coverage.executed())
+        self.assertEqual(2, sum(profiler.cycles.values()))
+
+        # Profiler detached under the coverage: the coverage keeps counting, the profiler does not
+        coverage.attach(self.cpu)
+        profiler.detach()
+        self.cpu.tick()
+
+        self.assertEqual([0x200, 0x206], coverage.executed())
+        self.assertEqual(2, sum(profiler.cycles.values()))
+
+        coverage.detach()
+        self.cpu.tick()
+
+        self.assertEqual([0x200, 0x206], coverage.executed())
+        self.assertEqual(2, sum(profiler.cycles.values()))
+        self.assertEqual(4, self.cpu.instructions)
+
+    def test_merge(self):
+        a = Coverage()
+        a.addresses[0x200] = 1
+        a.handlers['_ret'] = 1
+
+        b = Coverage()
+        b.addresses[0x300] = 1
+        b.handlers['_ret'] = 2
+
+        a.merge(b)
+
+        self.assertEqual([0x200, 0x300], a.executed())
+        self.assertEqual(3, a.handlers['_ret'])
+
+    def test_json_roundtrip(self):
+        coverage = Coverage()
+        coverage.attach(self.cpu)
+        self.cpu.tick()
+
+        loaded = Coverage.from_json(coverage.to_json())
+
+        self.assertEqual(coverage.addresses, loaded.addresses)
+        self.assertEqual(coverage.handlers, loaded.handlers)
+
+    def test_annotate(self):
+        coverage = Coverage()
+        coverage.attach(self.cpu)
+
+        for _ in range(0, 3):
+            self.cpu.tick()
+
+        lines = coverage.annotate(self.rom).splitlines()
+
+        self.assertEqual("; 3/4 reachable instructions executed", lines[0])
+        self.assertIn("  * 0x200  6001  LD V0, 0x01", lines)
+        self.assertIn("    0x204  6102  LD V1, 0x02", lines)
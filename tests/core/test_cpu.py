@@ -3,13 +3,16 @@ import random
 from core.cpu import Cpu
 from core.memory import Memory
 from core.timer import Timer
+from core.keypad import Keypad
+from core.framebuffer import FrameBuffer
 
 class TestCpu(unittest.TestCase):
     def setUp(self):
         self.memory = Memory(0x1000)
         self.sound_timer = Timer(freq=60)
         self.delay_timer = Timer(freq=60)
-        self.cpu = Cpu(self.memory, None, delay_timer=self.delay_timer, sound_timer=self.sound_timer)
+        self.keypad = Keypad()
+        self.cpu = Cpu(self.memory, None, delay_timer=self.delay_timer, sound_timer=self.sound_timer, keypad=self.keypad)
 
     @unittest.skip("Not implemented")
     def test_clear_display(self):
@@ -194,9 +197,42 @@ class TestCpu(unittest.TestCase):
     def test_draw_sprite(self):
         pass
 
-    @unittest.skip("Not implemented")
-    def test_skip_on_key_press_event(self):
-        pass
+    def test_skip_if_key_pressed(self):
+        """
+        Ex9E - SKP Vx
+        Skip next instruction if key with the value of Vx is pressed. Checks the keyboard, and if the key corresponding
+        to the value of Vx is currently in the down position, PC is increased by 2.
+        """
+
+        self.cpu._pc = 0x100
+        self.cpu._v[0x0].set(0xA)
+
+        self.cpu._skip_if_key_pressed(0x09E)
+        self.assertEqual(0x100, self.cpu._pc)
+
+        self.keypad.press(0xA)
+
+        self.cpu._skip_if_key_pressed(0x09E)
+        self.assertEqual(0x100 + 2, self.cpu._pc)
+
+    def test_skip_if_key_not_pressed(self):
+        """
+        ExA1 - SKNP Vx
+        Skip next instruction if key with the value of Vx is not pressed. Checks the keyboard, and if the key
+        corresponding to the value of Vx is currently in the up position, PC is increased by 2.
+        """
+
+        self.cpu._pc = 0x100
+        self.cpu._v[0x0].set(0xA)
+        self.keypad.press(0xA)
+
+        self.cpu._skip_if_key_not_pressed(0x0A1)
+        self.assertEqual(0x100, self.cpu._pc)
+
+        self.keypad.release(0xA)
+
+        self.cpu._skip_if_key_not_pressed(0x0A1)
+        self.assertEqual(0x100 + 2, self.cpu._pc)
 
     def test_mov_reg_to_reg(self):
         """
@@ -384,6 +420,25 @@ class TestCpu(unittest.TestCase):
 
         self.assertEqual(0x10, self.cpu._v[0x0].get())
 
+    def test_wait_for_key_press(self):
+        """
+        Fx0A - LD Vx, K
+        Wait for a key press, store the value of the key in Vx. All execution stops until a key is pressed, then the
+        value of that key is stored in Vx.
+        """
+
+        self.cpu._pc = 0x102
+
+        self.cpu._wait_for_key_press(0x00A)
+        self.assertEqual(0x100, self.cpu._pc)
+
+        self.cpu._pc = 0x102
+        self.keypad.press(0x7)
+
+        self.cpu._wait_for_key_press(0x00A)
+        self.assertEqual(0x102, self.cpu._pc)
+        self.assertEqual(0x7, self.cpu._v[0x0].get())
+
     def test_set_delay_to_reg(self):
         """
         Fx15 - LD DT, Vx
@@ -482,4 +537,82 @@ class TestCpu(unittest.TestCase):
         for i in range(0x0, 0xF + 1):
             self.assertEqual(i, self.cpu._v[i].get())
 
-        self.assertEqual(0x110, self.cpu._i.get())
\ No newline at end of file
+        self.assertEqual(0x110, self.cpu._i.get())
+
+    def test_super_chip_display(self):
+        """
+        00Cn/00FB/00FC/00FE/00FF/Dxy0 - SUPER-CHIP scrolling, resolution and 16x16 sprites
+        """
+
+        display = FrameBuffer(64, 32, 128, 64)
+        self.cpu._display = display
+
+        self.cpu._execute(*self.cpu._decode(0x00FF))
+        self.assertEqual((128, 64), (display.width, display.height))
+
+        self.cpu._i.set(0x300)
+        for i in range(0, 32):
+            self.memory[0x300 + i] = 0xFF
+
+        self.cpu._v[0x0].set(112)
+        self.cpu._execute(*self.cpu._decode(0xD010))
+        self.assertEqual(0xFFFF, display.rows()[15])
+        self.assertEqual(0, self.cpu._v[0xF].get())
+
+        self.cpu._execute(*self.cpu._decode(0x00C2))
+        self.assertEqual(0, display.rows()[0])
+        self.assertEqual(0xFFFF, display.rows()[17])
+
+        self.cpu._execute(*self.cpu._decode(0x00FC))
+        self.assertEqual(0xFFFF0, display.rows()[17])
+
+        self.cpu._execute(*self.cpu._decode(0x00FB))
+        self.assertEqual(0xFFFF, display.rows()[17])
+
+        self.cpu._execute(*self.cpu._decode(0x00FE))
+        self.assertEqual((64, 32), (display.width, display.height))
+
+    def test_xo_chip_registers_range(self):
+        """
+        5xy2 / 5xy3 - Save and load Vx to Vy at I (XO-CHIP)
+        """
+
+        self.cpu._i.set(0x300)
+        for reg in range(0x2, 0x5):
+            self.cpu._v[reg].set(reg)
+
+        self.cpu._execute(*self.cpu._decode(0x5242))
+        self.assertEqual([2, 3, 4], [self.memory[0x300 + i] for i in range(0, 3)])
+        self.assertEqual(0x300, self.cpu._i.get())
+
+        # Reverse order
+        self.cpu._execute(*self.cpu._decode(0x5A83))
+        self.assertEqual([2, 3, 4], [self.cpu._v[reg].get() for reg in (0xA, 0x9, 0x8)])
+
+    def test_xo_chip_long_load(self):
+        """
+        F000 nnnn - LD I, long (XO-CHIP)
+        """
+
+        self.cpu.set_starting_address(0x200)
+        self.memory.load(0x200, [0xF0, 0x00, 0xAB, 0xCD])
+
+        self.cpu.tick()
+
+        self.assertEqual(0xABCD, self.cpu._i.get())
+        self.assertEqual(0x204, self.cpu._pc)
+
+    def test_skip_long_instruction(self):
+        self.cpu.set_starting_address(0x200)
+        self.memory.load(0x200, [0x30, 0x00, 0xF0, 0x00, 0xAB, 0xCD])
+
+        self.cpu.tick()
+
+        self.assertEqual(0x206, self.cpu._pc)
+
+    def test_stack_depth(self):
+        for depth in range(0, 16):
+            self.cpu._call_subroutine(0x300)
+
+        with self.assertRaises(IndexError):
+            self.cpu._call_subroutine(0x300)
@@ -0,0 +1,100 @@
+import unittest
+import os
+import tempfile
+import numpy
+from core.chip8 import Chip8
+from core.dataset import Dataset, DatasetWriter, record
+from core.rom import Rom
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+ROM_PATH = os.path.join(ROOT, 'roms', 'test01.ch8')
+
+def hold_key(rng, keys, step):
+    return 1 << (step % 16)
+
+class TestDataset(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'data')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_writer_chunks(self):
+        machine = Chip8(compiled=False, headless=True)
+        machine.load(ROM_PATH)
+        machine.reset(0)
+        machine.memory[0x800] = 0xAB
+
+        with DatasetWriter(self.path, memory=[(0x800, 0x802)], chunk_size=4) as writer:
+            for step in range(0, 10):
+                machine.frame()
+                writer.append(machine, step, episode=3, step=step)
+
+            # Only sealed chunks are visible
+            self.assertEqual(8, len(Dataset(self.path)))
+
+        dataset = Dataset(self.path)
+
+        self.assertEqual(10, len(dataset))
+        self.assertEqual([4, 4, 2], [len(chunk) for chunk in dataset])
+        self.assertEqual((32, 8), dataset[9]['frame'].shape)
+        self.assertEqual(machine.display.to_bytes(), dataset[9]['frame'].tobytes())
+        self.assertEqual([0xAB, 0x00], list(dataset[-1]['memory']))
+        self.assertEqual((9, 3, 9), (dataset[9]['keys'], dataset[9]['episode'], dataset[9]['step']))
+        self.assertEqual((10, 32, 64), Dataset.unpack(numpy.concatenate(list(dataset))['frame']).shape)
+        self.assertEqual([], [name for name in os.listdir(self.path) if name.endswith('.partial')])
+
+    def test_record_hires(self):
+        # 0x200: HIGH
+        # 0x202: LD F, V0
+        # 0x204: DRW V1, V1, 5
+        # 0x206: JP 0x206
+        rom = Rom('hires', bytes([0x00, 0xFF, 0xF0, 0x29, 0xD1, 0x15, 0x12, 0x06]))
+
+        self.assertEqual(3, record(rom, self.path, episodes=1, steps=3, chunk_size=8, compiled=False))
+
+        dataset = Dataset(self.path)
+
+        self.assertEqual((32, 8), dataset[2]['frame'].shape)
+        self.assertEqual(0xC0, dataset[2]['frame'][0, 0])
+        self.assertEqual([], [name for name in os.listdir(self.path) if name.endswith('.partial')])
+
+    def test_append_after_worker_without_index(self):
+        machine = Chip8(compiled=False, headless=True)
+        machine.load(ROM_PATH)
+        machine.reset(0)
+
+        # Worker 1 wrote a chunk, worker 0 wrote nothing and has no index file
+        with DatasetWriter(self.path, worker=1, chunk_size=4) as writer:
+            writer.append(machine, 0, episode=0, step=0)
+
+        record(Rom.from_file(ROM_PATH), self.path, episodes=1, steps=2, chunk_size=4, compiled=False)
+
+        self.assertEqual(['index-001.jsonl', 'index-002.jsonl'], sorted(name for name in os.listdir(self.path) if name.startswith('index-')))
+        self.assertEqual(3, len(Dataset(self.path)))
+
+    def test_settings_mismatch(self):
+        DatasetWriter(self.path, chunk_size=4).close()
+
+        with self.assertRaises(ValueError):
+            DatasetWriter(self.path, chunk_size=8)
+
+    def test_record_workers(self):
+        rom = Rom.from_file(ROM_PATH)
+
+        samples = record(rom, self.path, episodes=4, steps=5, workers=2, chunk_size=8, policy=hold_key, compiled=False)
+        dataset = Dataset(self.path)
+
+        self.assertEqual(20, samples)
+        self.assertEqual(20, len(dataset))
+        self.assertEqual(4, len(dataset.chunks))
+        self.assertEqual([0, 1, 2, 3], sorted(set(numpy.concatenate(list(dataset))['episode'].tolist())))
+
+        # Appending later continues with new workers
+        record(rom, self.path, episodes=1, steps=5, workers=1, chunk_size=8, policy=hold_key, compiled=False)
+
+        self.assertEqual(25, len(Dataset(self.path)))
+
+if __name__ == '__main__':
+    unittest.main()
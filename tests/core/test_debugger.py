@@ -0,0 +1,194 @@
+import io
+import os
+import tempfile
+import unittest
+import unittest.mock
+from core.chip8 import Chip8
+from core import compiler
+from core.debugger import Debugger, DebuggerShell, Condition
+from core.memory import Memory, ObservedMemory
+from core.rom import Rom
+from core.statehash import HashedMemory, StateHash
+
+# 0x200: LD V0, 0x00
+# 0x202: CALL 0x20A
+# 0x204: LD I, 0x300
+# 0x206: LD [I], V0
+# 0x208: JP 0x202
+# 0x20A: ADD V0, 0x01
+# 0x20C: RET
+ROM = bytes([
+    0x60, 0x00,
+    0x22, 0x0A,
+    0xA3, 0x00,
+    0xF0, 0x55,
+    0x12, 0x02,
+    0x70, 0x01,
+    0x00, 0xEE,
+])
+
+class TestDebugger(unittest.TestCase):
+    def setUp(self):
+        self.machine = Chip8(compiled=False, headless=True)
+        self.machine.load_rom(Rom('debug', ROM))
+        self.machine.reset(0)
+
+        self.debugger = Debugger(self.machine)
+        self.cpu = self.machine.cpu
+
+    def test_step(self):
+        self.debugger.step()
+        self.debugger.step()
+
+        self.assertEqual(0x20A, self.cpu._pc)
+        self.assertEqual(1, self.cpu._sp)
+        self.assertIs(Memory, type(self.machine.memory))
+
+    def test_breakpoint(self):
+        self.debugger.break_at(0x206)
+
+        self.assertEqual(('breakpoint', 0x206), self.debugger.cont())
+        self.assertEqual(1, self.cpu._v[0].get())
+
+        # Continuing from a breakpoint executes it first
+        self.assertEqual(('breakpoint', 0x206), self.debugger.cont())
+        self.assertEqual(2, self.cpu._v[0].get())
+
+    def test_watchpoint(self):
+        self.debugger.watch(0x300)
+
+        self.assertEqual(('watchpoint', 0x300, 0x00, 0x01), self.debugger.cont())
+        self.assertEqual(0x208, self.cpu._pc)
+        self.assertIs(Memory, type(self.machine.memory))
+
+    def test_condition(self):
+        self.debugger.when("V0 == 3")
+
+        self.assertEqual('condition', self.debugger.cont()[0])
+        self.assertEqual(3, self.cpu._v[0].get())
+
+        with self.assertRaises(ValueError):
+            Condition("V0 = 3")
+
+    def test_cont_frames_without_stops(self):
+        self.assertIsNone(self.debugger.cont(frames=3))
+        self.assertEqual(3, self.machine.frames)
+
+    def test_step_over_and_out(self):
+        self.debugger.step()
+        self.debugger.step_over()
+
+        self.assertEqual(0x204, self.cpu._pc)
+        self.assertEqual(1, self.cpu._v[0].get())
+
+        self.debugger.step()
+        self.debugger.step()
+        self.debugger.step()
+        self.debugger.step()
+
+        self.assertEqual(0x20A, self.cpu._pc)
+
+        self.debugger.step_out()
+
+        self.assertEqual(0x204, self.cpu._pc)
+        self.assertEqual(0, self.cpu._sp)
+
+    def test_reverse(self):
+        for _ in range(0, 6):
+            self.debugger.step()
+
+        self.assertEqual(1, self.machine.memory[0x300])
+
+        self.debugger.reverse()
+
+        self.assertEqual(0x206, self.cpu._pc)
+        self.assertEqual(0, self.machine.memory[0x300])
+        self.assertEqual(0x300, self.cpu._i.get())
+
+        while self.debugger.reverse():
+            pass
+
+        self.assertEqual(0x200, self.cpu._pc)
+        self.assertEqual(0, self.cpu._i.get())
+
+    def test_reverse_crosses_frames(self):
+        self.machine.cpu._delay_timer.set(5)
+
+        for _ in range(0, 10):
+            self.debugger.step()
+
+        self.assertEqual(1, self.machine.frames)
+        self.assertEqual(4, self.machine.cpu._delay_timer.get())
+
+        self.debugger.reverse()
+
+        self.assertEqual(5, self.machine.cpu._delay_timer.get())
+
+    def test_shell_step_and_back(self):
+        output = io.StringIO()
+        shell = DebuggerShell(self.debugger, stdout=output)
+
+        with unittest.mock.patch('sys.stdout', output):
+            for line in ("step", "step 2", "back", "back"):
+                shell.onecmd(line)
+
+        self.assertEqual(0x202, self.cpu._pc)
+        self.assertIn("ADD V0, 0x01", output.getvalue())
+
+    def test_writes_invalidate_compiled_blocks(self):
+        # 0x200: LD V0, 0x05
+        # 0x202: LD I, 0x20D
+        # 0x204: LD [I], V0       ADD V2, 0x01 becomes ADD V2, 0x05
+        # 0x206: CLS
+        # 0x208: JP 0x20C
+        # 0x20C: ADD V2, 0x01
+        # 0x20E: JP 0x20E
+        rom = Rom('smc', bytes([
+            0x60, 0x05, 0xA2, 0x0D, 0xF0, 0x55, 0x00, 0xE0, 0x12, 0x0C, 0x00, 0x00, 0x72, 0x01, 0x12, 0x0E,
+        ]))
+
+        with tempfile.TemporaryDirectory() as cache, unittest.mock.patch.dict(os.environ, CHIP8_CACHE_DIR=cache):
+            compiler.compile_rom(rom)
+
+            # The stepped write ends the first frame, the next ones run in the compiled loop
+            machine = Chip8(compiled=True, headless=True, cycles_per_frame=3)
+            machine.load_rom(rom)
+            machine.reset(0)
+
+        self.assertIsNotNone(machine._executor)
+        debugger = Debugger(machine)
+
+        for _ in range(0, 3):
+            debugger.step()
+
+        debugger.cont(frames=2)
+
+        self.assertEqual(0x20E, machine.cpu._pc)
+        self.assertEqual(5, machine.cpu._v[2].get())
+
+    def test_keeps_hashed_memory(self):
+        state = StateHash(self.machine)
+
+        for _ in range(0, 6):
+            self.debugger.step()
+
+        self.assertIs(HashedMemory, type(self.machine.memory))
+        self.assertEqual(state.full(), state.digest())
+
+        self.debugger.reverse()
+
+        self.assertEqual(state.full(), state.digest())
+        state.detach()
+
+    def test_observed_memory(self):
+        memory = Memory(0x10)
+        writes = []
+
+        ObservedMemory.observe(memory, lambda *write: writes.append(write))
+        memory[2] = 5
+        memory.load(4, [1, 0])
+        ObservedMemory.unobserve(memory)
+        memory[3] = 1
+
+        self.assertEqual([(2, 0, 5), (4, 0, 1)], writes)
+        self.assertIs(Memory, type(memory))
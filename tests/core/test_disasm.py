@@ -0,0 +1,97 @@
+import unittest
+import os
+import tempfile
+from core import disasm
+from core.rom import Rom
+
+# 0x200: LD I, 0x20C
+# 0x202: DRW V0, V1, 2
+# 0x204: CALL 0x20A
+# 0x206: SE V0, 0x00
+# 0x208: JP 0x200
+# 0x20A: RET
+# 0x20C: sprite (2 rows)
+# 0x20E: data
+ROM = bytes([
+    0xA2, 0x0C,
+    0xD0, 0x12,
+    0x22, 0x0A,
+    0x30, 0x00,
+    0x12, 0x00,
+    0x00, 0xEE,
+    0xF0, 0x90,
+    0x01, 0x02,
+])
+
+class TestDisasm(unittest.TestCase):
+    def setUp(self):
+        self.cache = tempfile.TemporaryDirectory()
+        os.environ['CHIP8_CACHE_DIR'] = self.cache.name
+
+    def tearDown(self):
+        del os.environ['CHIP8_CACHE_DIR']
+        self.cache.cleanup()
+
+    def test_mnemonics(self):
+        self.assertEqual(
+            ["LD I, 0x20C", "DRW V0, V1, 2", "CALL 0x20A", "SE V0, 0x00", "JP 0x200", "RET", "DW 0xF090", "DW 0x0102"],
+            [i.mnemonic for i in disasm.disassemble(ROM)]
+        )
+
+    def test_timer_mnemonics(self):
+        self.assertEqual("LD DT, V3", disasm.decode(0x200, 0xF315).mnemonic)
+        self.assertEqual("LD ST, V3", disasm.decode(0x200, 0xF318).mnemonic)
+
+    def test_control_flow_graph(self):
+        analysis = disasm.analyze(Rom('test', ROM), cache=False)
+
+        self.assertEqual(
+            sorted([
+                (0x204, 0x20A, 'call'), (0x204, 0x206, 'return'),
+                (0x206, 0x208, 'next'), (0x206, 0x20A, 'skip'),
+                (0x208, 0x200, 'jump'),
+            ]),
+            sorted(analysis.edges)
+        )
+        self.assertEqual([0x20A], analysis.subroutines())
+        self.assertEqual(
+            [(0x200, 3), (0x206, 1), (0x208, 1), (0x20A, 1)],
+            [(block.start, len(block)) for block in analysis.blocks]
+        )
+
+    def test_skip_over_long_load(self):
+        # 0x200: SE V0, 0x00
+        # 0x202: LD I, 0x1234     F000 1234
+        # 0x206: JP 0x206
+        analysis = disasm.analyze(Rom('long', bytes([0x30, 0x00, 0xF0, 0x00, 0x12, 0x34, 0x12, 0x06])), cache=False)
+
+        self.assertIn((0x200, 0x206, 'skip'), analysis.edges)
+        self.assertNotIn(0x204, analysis.code)
+        self.assertEqual([0x200, 0x202, 0x206], sorted(analysis.code))
+
+    def test_code_and_data_separation(self):
+        analysis = disasm.analyze(Rom('test', ROM), cache=False)
+
+        self.assertEqual({0x20C: 2}, analysis.sprites)
+        self.assertEqual('code', analysis.kind(0x20B))
+        self.assertEqual('sprite', analysis.kind(0x20D))
+        self.assertEqual('data', analysis.kind(0x20E))
+
+    def test_analysis_is_cached(self):
+        rom = Rom('test', ROM)
+        analysis = disasm.analyze(rom)
+        cached = disasm.analyze(rom)
+
+        self.assertEqual(sorted(analysis.code), sorted(cached.code))
+        self.assertEqual(sorted(analysis.edges), sorted(cached.edges))
+        self.assertEqual(analysis.sprites, cached.sprites)
+        self.assertEqual(analysis.listing(), cached.listing())
+
+    def test_cache_keyed_on_analysis_version(self):
+        rom = Rom('test', ROM)
+        disasm.analyze(rom)
+
+        self.assertEqual(
+            [f"{rom.hash}-200-{disasm.VERSION}-{disasm.ANALYSIS_VERSION}.json"],
+            os.listdir(os.path.join(self.cache.name, 'disasm'))
+        )
@@ -0,0 +1,120 @@
+import unittest
+import os
+import tempfile
+from core.env import Chip8Env
+from core.rom import Rom
+
+# 0x200: LD V0, K         wait for a key
+# 0x202: LD F, V0         draw its hex digit at (0, 0)
+# 0x204: CLS
+# 0x206: DRW V1, V1, 5
+# 0x208: JP 0x200
+ROM = Rom('keys', bytes([
+    0xF0, 0x0A,
+    0xF0, 0x29,
+    0x00, 0xE0,
+    0xD1, 0x15,
+    0x12, 0x00,
+]))
+
+def failing_reward(machine):
+    raise ValueError("reward failed")
+
+class TestChip8Env(unittest.TestCase):
+    def setUp(self):
+        self.cache = tempfile.TemporaryDirectory()
+        os.environ['CHIP8_CACHE_DIR'] = self.cache.name
+
+    def tearDown(self):
+        del os.environ['CHIP8_CACHE_DIR']
+        self.cache.cleanup()
+
+    def test_observations_are_preallocated(self):
+        env = Chip8Env(ROM, num_envs=2)
+
+        observations = env.reset(seed=0)
+        self.assertEqual((2, 32, 64), observations.shape)
+        self.assertEqual(0, observations.sum())
+
+        stepped, rewards, dones, infos = env.step([0, 0])
+        self.assertIs(observations, stepped)
+
+    def test_step_with_keys(self):
+        env = Chip8Env(ROM, num_envs=2, frame_skip=1)
+        env.reset(seed=0)
+
+        # Key 0x1 held in env 0, nothing in env 1
+        observations, rewards, dones, infos = env.step([1 << 0x1, 0])
+
+        self.assertEqual([0, 0, 1, 0], observations[0, 0, 0:4].tolist())   # top row of "1" is 0x20
+        self.assertEqual([0, 1, 1, 1], observations[0, 4, 0:4].tolist())   # bottom row of "1" is 0x70
+        self.assertEqual(0, observations[1].sum())
+        self.assertEqual([False, False], dones.tolist())
+
+    def test_packed_observations(self):
+        env = Chip8Env(ROM, num_envs=1, frame_skip=1, packed=True)
+        env.reset()
+
+        observations, *_ = env.step([1 << 0x1])
+
+        self.assertEqual((1, 32, 8), observations.shape)
+        self.assertEqual(0x20, observations[0, 0, 0])
+
+    def test_hires_observations(self):
+        # 0x200: HIGH
+        # 0x202: LD F, V0         digit 0 at (0, 0), 4x5 hires pixels
+        # 0x204: DRW V1, V1, 5
+        # 0x206: JP 0x206
+        rom = Rom('hires', bytes([0x00, 0xFF, 0xF0, 0x29, 0xD1, 0x15, 0x12, 0x06]))
+        env = Chip8Env(rom, num_envs=1, frame_skip=1)
+        env.reset()
+
+        observations, *_ = env.step([0])
+
+        # Top row of "0" (0xF0) and the next one (0x90) ORed into one row of 2 pixels
+        self.assertEqual((1, 32, 64), observations.shape)
+        self.assertEqual([1, 1, 0], observations[0, 0, 0:3].tolist())
+        self.assertEqual([1, 1, 0], observations[0, 2, 0:3].tolist())
+        self.assertEqual(0, observations[0, 3].sum())
+
+    def test_reward(self):
+        env = Chip8Env(ROM, num_envs=1, reward=lambda machine: machine.memory[0x200])
+        env.reset()
+
+        _, rewards, *_ = env.step([0])
+
+        self.assertEqual([0xF0], rewards.tolist())
+
+    def test_crash_ends_episode(self):
+        env = Chip8Env(Rom('crash', bytes([0xFF, 0xFF])), num_envs=1)
+        env.reset()
+
+        _, _, dones, infos = env.step([0])
+
+        self.assertEqual([True], dones.tolist())
+        self.assertIn(0, infos['errors'])
+
+    def test_sharded_matches_in_process(self):
+        actions = [1 << 0x1, 1 << 0x2, 0]
+
+        with Chip8Env(ROM, num_envs=3, frame_skip=1) as env:
+            env.reset(seed=0)
+            expected, *_ = env.step(actions)
+            expected = expected.copy()
+
+        with Chip8Env(ROM, num_envs=3, frame_skip=1, shards=2) as env:
+            env.reset(seed=0)
+            observations, *_ = env.step(actions)
+
+            self.assertEqual(expected.tolist(), observations.tolist())
+
+    def test_shard_errors_are_raised(self):
+        with Chip8Env(ROM, num_envs=2, frame_skip=1, shards=2, reward=failing_reward) as env:
+            env.reset(seed=0)
+
+            with self.assertRaisesRegex(ValueError, "reward failed"):
+                env.step([0, 0])
+
+            # The shards are still in sync with their pipes
+            with self.assertRaisesRegex(ValueError, "reward failed"):
+                env.step([0, 0])
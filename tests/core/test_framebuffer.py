@@ -0,0 +1,193 @@
+import unittest
+from core.framebuffer import FrameBuffer
+
+class TestFrameBuffer(unittest.TestCase):
+    def setUp(self):
+        self.fb = FrameBuffer(64, 32)
+
+    def test_draw(self):
+        collided = self.fb.draw(2, 1, [0xF0, 0x90])
+
+        self.assertFalse(collided)
+        self.assertEqual(0, self.fb.rows()[0])
+        self.assertEqual(0xF0 << (64 - 8 - 2), self.fb.rows()[1])
+        self.assertEqual(1, self.fb.pixel(2, 2))
+        self.assertEqual(0, self.fb.pixel(3, 2))
+        self.assertEqual(1, self.fb.pixel(5, 2))
+
+    def test_draw_collision(self):
+        self.fb.draw(0, 0, [0x80])
+
+        self.assertFalse(self.fb.draw(1, 0, [0x80]))
+        self.assertTrue(self.fb.draw(0, 0, [0x80]))
+        self.assertEqual(0, self.fb.pixel(0, 0))
+
+    def test_draw_wraps_around(self):
+        self.fb.draw(60, 31, [0xFF, 0x81])
+
+        self.assertEqual([1, 1, 1, 1], [self.fb.pixel(x, 31) for x in range(60, 64)])
+        self.assertEqual([1, 1, 1, 1], [self.fb.pixel(x, 31) for x in range(0, 4)])
+        self.assertEqual(1, self.fb.pixel(60, 0))
+        self.assertEqual(1, self.fb.pixel(3, 0))
+        self.assertEqual(0, self.fb.pixel(2, 0))
+
+    def test_clear(self):
+        self.fb.draw(0, 0, [0xFF])
+        self.fb.clear()
+
+        self.assertEqual([0] * 32, self.fb.rows())
+
+    def test_to_bytes(self):
+        self.fb.draw(8, 1, [0xA5])
+
+        data = self.fb.to_bytes()
+
+        self.assertEqual(256, len(data))
+        self.assertEqual(0xA5, data[8 + 1])
+        self.assertEqual(1, sum(1 for b in data if b))
+
+    def test_digest(self):
+        self.assertEqual(0, self.fb.digest())
+
+        self.fb.draw(3, 4, [0x81, 0x42])
+        digest = self.fb.digest()
+
+        self.assertNotEqual(0, digest)
+
+        # Same contents drawn differently hash the same
+        other = FrameBuffer(64, 32)
+        other.draw(3, 4, [0x80, 0x40])
+        other.draw(10, 4, [0x80])
+        other.draw(9, 5, [0x80])
+        self.assertEqual(digest, other.digest())
+
+        self.fb.draw(3, 4, [0x81, 0x42])
+        self.assertEqual(0, self.fb.digest())
+
+    def test_digest_depends_on_row(self):
+        other = FrameBuffer(64, 32)
+
+        self.fb.draw(0, 0, [0x80])
+        other.draw(0, 1, [0x80])
+
+        self.assertNotEqual(self.fb.digest(), other.digest())
+
+    def test_set_resolution(self):
+        fb = FrameBuffer(64, 32, 128, 64)
+        fb.draw(0, 0, [0x80])
+
+        fb.set_resolution(128, 64)
+
+        self.assertEqual((128, 64), (fb.width, fb.height))
+        self.assertEqual([0] * 64, fb.rows())
+        self.assertEqual(0, fb.digest())
+
+        fb.draw(127, 63, [0x80])
+        self.assertEqual(1, fb.pixel(127, 63))
+
+        with self.assertRaises(ValueError):
+            fb.set_resolution(256, 64)
+
+    def test_draw_16(self):
+        fb = FrameBuffer(128, 64)
+
+        self.assertFalse(fb.draw(120, 0, [0xFFFF, 0x8001], sprite_width=16))
+        self.assertEqual([1] * 8, [fb.pixel(x, 0) for x in range(120, 128)])
+        self.assertEqual([1] * 8, [fb.pixel(x, 0) for x in range(0, 8)])
+        self.assertEqual((1, 0, 1), (fb.pixel(120, 1), fb.pixel(121, 1), fb.pixel(7, 1)))
+        self.assertTrue(fb.draw(0, 1, [0x0100], sprite_width=16))
+
+    def test_scroll(self):
+        self.fb.draw(8, 0, [0xF0])
+
+        self.fb.scroll_down(3)
+        self.assertEqual([0, 0, 0, 0xF0 << 48], self.fb.rows()[:4])
+
+        self.fb.scroll_right(4)
+        self.assertEqual(0x0F << 48, self.fb.rows()[3])
+
+        self.fb.scroll_left(12)
+        self.assertEqual(0x0F << 60, self.fb.rows()[3])
+
+        self.fb.scroll_left(4)
+        self.assertEqual(0, self.fb.rows()[3])
+
+    def test_scroll_updates_digest(self):
+        other = FrameBuffer(64, 32)
+        other.draw(4, 2, [0x80])
+
+        self.fb.draw(0, 0, [0x80])
+        self.fb.scroll_down(2)
+        self.fb.scroll_right(4)
+
+        self.assertEqual(other.digest(), self.fb.digest())
+
+    def test_to_bytes_scaled(self):
+        self.fb.draw(0, 0, [0xA0])
+
+        data = self.fb.to_bytes(128, 64)
+
+        self.assertEqual(128 // 8 * 64, len(data))
+        self.assertEqual(b'\xCC\x00', data[0:2])
+        self.assertEqual(data[0:16], data[16:32])
+        self.assertEqual(bytes(16), data[32:48])
+
+    def test_write_into(self):
+        self.fb.draw(3, 2, [0xA5, 0x18])
+        buffer = bytearray(128 // 8 * 64)
+
+        self.fb.write_into(memoryview(buffer), 128, 64)
+
+        self.assertEqual(self.fb.to_bytes(128, 64), bytes(buffer))
+
+    def test_to_bytes_downscaled(self):
+        self.fb = FrameBuffer(64, 32, 128, 64)
+        self.fb.set_resolution(128, 64)
+        self.fb.draw(4, 1, [0x80])
+        self.fb.draw(127, 63, [0x80])
+
+        data = self.fb.to_bytes(64, 32)
+
+        self.assertEqual(64 // 8 * 32, len(data))
+        self.assertEqual(b'\x20', data[0:1])
+        self.assertEqual(b'\x01', data[-1:])
+        self.assertEqual(2, sum(bin(byte).count('1') for byte in data))
+
+        with self.assertRaises(ValueError):
+            self.fb.to_bytes(48, 32)
+
+    def test_planes(self):
+        self.fb.draw(0, 0, [0x80])
+
+        self.fb.select_planes(2)
+        self.assertEqual([1], self.fb.selected_planes)
+
+        self.fb.draw(0, 0, [0x80], plane=1)
+
+        self.assertEqual([0x80 << 56] + [0] * 31, self.fb.rows(plane=1))
+        self.assertNotEqual(0, self.fb.digest())
+
+        # Only the selected plane is cleared
+        self.fb.clear()
+
+        self.assertEqual([0] * 32, self.fb.rows(plane=1))
+        self.assertEqual(1, self.fb.pixel(0, 0))
+
+        only_plane_0 = FrameBuffer(64, 32)
+        only_plane_0.draw(0, 0, [0x80])
+        self.assertEqual(only_plane_0.digest(), self.fb.digest())
+
+    def test_plane_digests_differ(self):
+        other = FrameBuffer(64, 32)
+
+        self.fb.draw(0, 0, [0x80])
+        other.draw(0, 0, [0x80], plane=1)
+
+        self.assertNotEqual(self.fb.digest(), other.digest())
+
+    def test_scroll_up(self):
+        self.fb.draw(0, 5, [0x80])
+        self.fb.scroll_up(5)
+
+        self.assertEqual(1, self.fb.pixel(0, 0))
+        self.assertEqual(0, self.fb.pixel(0, 5))
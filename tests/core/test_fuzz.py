@@ -0,0 +1,115 @@
+import unittest
+import random
+from core.fuzz import Case, CompiledEngine, Lockstep, fuzz, fuzz_chunk, mutate, random_case, random_instruction, _snapshot, _restore
+
+# 0x200: LD V0, 0x01
+# 0x202: LD V1, 0x02
+# 0x204: LD V2, 0x03
+# 0x206: LD V3, 0x04
+# 0x208: LD V4, 0x05
+# 0x20A: ADD V0, 0x05
+# 0x20C: JP 0x20C
+PROGRAM = bytes([
+    0x60, 0x01,
+    0x61, 0x02,
+    0x62, 0x03,
+    0x63, 0x04,
+    0x64, 0x05,
+    0x70, 0x05,
+    0x12, 0x0C,
+])
+
+class OffByOneAdd(CompiledEngine):
+    """
+    Interprets one instruction per step, with a wrong ADD Vx, kk.
+    """
+
+    name = 'broken'
+
+    def __init__(self, machine, rom):
+        self._cpu = machine.cpu
+
+    def step(self):
+        cpu = self._cpu
+        word = cpu._memory[cpu._pc] << 8 | cpu._memory[cpu._pc + 1]
+
+        cpu.tick()
+
+        if word & 0xF000 == 0x7000:
+            register = cpu._v[(word & 0x0F00) >> 8]
+            register.set((register.get() + 1) & 0xFF)
+
+        return 1
+
+    def snapshot(self):
+        return None
+
+    def restore(self, snapshot):
+        pass
+
+    def block_at(self, pc):
+        return 1
+
+def case(program=PROGRAM):
+    return Case(program, [0] * 16, 0x300, 0, 0, 0, seed=1, quirks='modern')
+
+class TestFuzz(unittest.TestCase):
+    def test_compiled_engine_agrees(self):
+        self.assertIsNone(Lockstep(case()).run(32))
+
+    def test_bisects_to_first_diverging_step(self):
+        divergence = Lockstep(case(), OffByOneAdd, check_every=16).run(32)
+
+        self.assertEqual(6, divergence.step)
+        self.assertEqual(0x20A, divergence.pc)
+        self.assertEqual(['v'], divergence.fields)
+        self.assertEqual(6, divergence.reference['v'][0])
+        self.assertEqual(7, divergence.actual['v'][0])
+        self.assertEqual('ADD V0, 0x05', divergence.instructions[0].mnemonic)
+
+    def test_matching_errors_are_not_divergences(self):
+        # Jumps into empty memory: both stop on the same unknown opcode
+        self.assertIsNone(Lockstep(case(bytes([0x13, 0x00]))).run(8))
+
+    def test_random_cases(self):
+        divergences, cases, instructions = fuzz_chunk(7, 20)
+
+        self.assertEqual([], divergences)
+        self.assertEqual(20, cases)
+        self.assertGreater(instructions, 0)
+
+    def test_snapshot_restores_random_and_keys(self):
+        machine = case().machine()
+        snapshot = _snapshot(machine)
+        values = [machine._random.randint(0, 0xFF) for _ in range(0, 4)]
+        machine.keypad.set_state(0x1234)
+
+        _restore(machine, snapshot)
+
+        self.assertEqual(values, [machine._random.randint(0, 0xFF) for _ in range(0, 4)])
+        self.assertEqual(case().keys, machine.keypad.get_state())
+
+    def test_generates_long_loads(self):
+        rng = random.Random(5)
+        instructions = [random_instruction(rng, 128) for _ in range(0, 200)]
+
+        self.assertTrue(any(len(code) == 4 and code[:2] == bytes([0xF0, 0x00]) for code in instructions))
+        self.assertTrue(all(len(code) in (2, 4) for code in instructions))
+
+    def test_mutate_keeps_program_size(self):
+        rng = random.Random(3)
+        original = random_case(rng)
+
+        for _ in range(0, 20):
+            mutated = mutate(rng, original)
+            self.assertEqual(len(original.program), len(mutated.program))
+
+        self.assertEqual(vars(original), vars(Case.from_dict(original.to_dict())))
+
+    def test_parallel(self):
+        divergences, cases, _ = fuzz(10, seed=1, workers=2, chunk=5)
+
+        self.assertEqual(([], 10), (divergences, cases))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+import json
+import os
+import tempfile
+from core.golden import Golden, run_rom
+
+GOLDEN = os.path.join(os.path.dirname(__file__), '..', 'golden', 'frames.json')
+ROMS = os.path.join(os.path.dirname(__file__), '..', '..', 'roms')
+
+class TestGolden(unittest.TestCase):
+    def test_corpus_matches_golden_frames(self):
+        failures = Golden(GOLDEN).check()
+
+        self.assertEqual([], failures)
+
+    def test_run_is_deterministic(self):
+        rom = os.path.join(ROMS, 'stars.ch8')
+
+        self.assertEqual(run_rom(rom, [10, 50], seed=3), run_rom(rom, [10, 50], seed=3))
+
+    def test_mismatch_is_reported(self):
+        with tempfile.TemporaryDirectory() as dir:
+            path = os.path.join(dir, 'frames.json')
+
+            golden = Golden(path)
+            golden.add(os.path.join(ROMS, 'test01.ch8'), checkpoints=[5])
+            golden.update(workers=1)
+            golden.save()
+
+            with open(path) as f:
+                data = json.load(f)
+
+            data['roms']['test01.ch8']['checkpoints']['5'] = '0' * 16
+
+            with open(path, 'w') as f:
+                json.dump(data, f)
+
+            failures = Golden(path).check(workers=1)
+
+            self.assertEqual(1, len(failures))
+            self.assertEqual(('test01.ch8', 5, '0' * 16), failures[0][:3])
+
+    def test_changed_rom_is_reported(self):
+        with tempfile.TemporaryDirectory() as dir:
+            rom = os.path.join(dir, 'loop.ch8')
+
+            with open(rom, 'wb') as f:
+                f.write(bytes([0x12, 0x00]))
+
+            golden = Golden(os.path.join(dir, 'frames.json'))
+            golden.add(rom, checkpoints=[2])
+            golden.update(workers=1)
+
+            with open(rom, 'wb') as f:
+                f.write(bytes([0x00, 0xE0, 0x12, 0x00]))
+
+            failures = golden.check(workers=1)
+
+            self.assertEqual(1, len(failures))
+            self.assertEqual(('loop.ch8', None, golden.roms['loop.ch8']['sha1']), failures[0][:3])
+
+    def test_empty_checkpoints_are_rejected(self):
+        with self.assertRaises(ValueError):
+            Golden(os.path.join(ROMS, 'missing.json')).add(os.path.join(ROMS, 'test01.ch8'), checkpoints=[])
+
@@ -0,0 +1,160 @@
+import unittest
+import asyncio
+import os
+import tempfile
+from core.host import Host, FRAME_HEADER, KEYS, RUNNING, PARKED_KEY, PARKED_TIME
+from core.rom import Rom
+
+# 0x200: LD V0, K
+# 0x202: LD F, V0
+# 0x204: DRW V0, V0, 5
+# 0x206: JP 0x206
+WAIT_KEY = bytes([
+    0xF0, 0x0A,
+    0xF0, 0x29,
+    0xD0, 0x05,
+    0x12, 0x06,
+])
+
+# 0x200: LD V0, 0x05
+# 0x202: LD DT, V0
+# 0x204: LD V1, DT
+# 0x206: SE V1, 0x00
+# 0x208: JP 0x204
+# 0x20A: ADD V2, 0x01
+# 0x20C: JP 0x20C
+WAIT_TIMER = bytes([
+    0x60, 0x05,
+    0xF0, 0x15,
+    0xF1, 0x07,
+    0x31, 0x00,
+    0x12, 0x04,
+    0x72, 0x01,
+    0x12, 0x0C,
+])
+
+class TestHost(unittest.TestCase):
+    def setUp(self):
+        self.host = Host(compiled=False)
+        self.host.add_rom('key', Rom('key', WAIT_KEY))
+        self.host.add_rom('timer', Rom('timer', WAIT_TIMER))
+
+    def tick(self, count=1):
+        for _ in range(0, count):
+            asyncio.run(self.host.tick())
+
+    def test_parks_on_key_wait(self):
+        session = self.host.open('key')
+
+        self.tick()
+        self.assertEqual(PARKED_KEY, session.state)
+
+        instructions = session.machine.cpu.instructions
+        self.tick(5)
+
+        self.assertEqual(instructions, session.machine.cpu.instructions)
+        self.assertEqual(5, session.parked_frames)
+
+        session.set_keys(1 << 0x7)
+        self.tick()
+
+        self.assertEqual(RUNNING, session.state)
+        self.assertEqual(0x7, session.machine.cpu._v[0].get())
+
+    def test_parks_on_delay_loop(self):
+        session = self.host.open('timer')
+
+        self.tick()
+        self.assertEqual(PARKED_TIME, session.state)
+
+        self.tick(5)
+
+        self.assertEqual(RUNNING, session.state)
+        self.assertEqual(1, session.machine.cpu._v[2].get())
+        self.assertEqual(0x20C, session.machine.cpu._pc)
+
+    def test_sessions_get_one_frame_per_tick(self):
+        sessions = [self.host.open('timer') for _ in range(0, 20)]
+
+        self.tick(3)
+
+        self.assertEqual([3] * 20, [session.frames for session in sessions])
+
+        sessions[0].close()
+
+        self.assertEqual(19, len(self.host.sessions))
+
+    def test_crashed_session_is_closed(self):
+        self.host.add_rom('bad', Rom('bad', bytes([0xFF, 0xFF])))
+        healthy = self.host.open('timer')
+        crashed = self.host.open('bad')
+
+        with self.assertLogs(level='WARNING'):
+            self.tick(2)
+
+        self.assertTrue(crashed.closed)
+        self.assertIn("UnknownOpcodeError", crashed.error)
+        self.assertEqual([healthy], self.host.sessions)
+        self.assertEqual(2, healthy.frames)
+
+    def test_session_closed_during_tick(self):
+        self.host = Host(compiled=False, yield_every=1)
+        self.host.add_rom('timer', Rom('timer', WAIT_TIMER))
+        first = self.host.open('timer')
+        second = self.host.open('timer')
+
+        async def close_second():
+            # Runs when the tick yields after the first session
+            second.close()
+
+        async def tick():
+            closer = asyncio.ensure_future(close_second())
+            await self.host.tick()
+            await closer
+
+        asyncio.run(tick())
+
+        self.assertTrue(second.closed)
+        self.assertEqual(1, first.frames)
+        self.assertEqual(0, second.frames)
+        self.assertEqual(0, second.machine.cpu.instructions)
+
+    def test_unknown_rom(self):
+        with self.assertRaises(KeyError):
+            self.host.open('missing')
+
+    def test_socket_session(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'host.sock')
+
+            async def client():
+                await self.host.serve(path=path)
+                runner = asyncio.ensure_future(self.host.run())
+
+                reader, writer = await asyncio.open_unix_connection(path)
+                writer.write(b"key\n")
+                writer.write(KEYS.pack(1 << 0xA))
+                await writer.drain()
+
+                # The first frame may be sent before the key press reaches the session
+                frame = b''
+
+                while not any(frame):
+                    header = await asyncio.wait_for(reader.readexactly(FRAME_HEADER.size), 5)
+                    _, width, height = FRAME_HEADER.unpack(header)
+                    frame = await reader.readexactly(width * height // 8)
+
+                writer.close()
+                runner.cancel()
+                await self.host.close_servers()
+
+                return width, height, frame
+
+            width, height, frame = asyncio.run(client())
+
+            # Sprite of A drawn at (10, 10)
+            self.assertEqual((64, 32), (width, height))
+            self.assertEqual(0xF0 >> 2, frame[10 * 8 + 1])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,20 @@
+import unittest
+from core.keypad import Keypad
+
+class TestKeypad(unittest.TestCase):
+    def test_press_release(self):
+        k = Keypad()
+
+        k.press(0xA)
+        self.assertTrue(k.is_pressed(0xA))
+        self.assertFalse(k.is_pressed(0xB))
+
+        k.release(0xA)
+        self.assertFalse(k.is_pressed(0xA))
+
+    def test_first_pressed(self):
+        k = Keypad()
+        self.assertIsNone(k.first_pressed())
+
+        k.set_state(0b1010_0000)
+        self.assertEqual(0x5, k.first_pressed())
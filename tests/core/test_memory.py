@@ -24,4 +24,28 @@ class TestMemory(unittest.TestCase):
         m = Memory(32)
 
         self.assertRaises(IndexError, m.__getitem__, 32)
-        self.assertRaises(IndexError, m.__getitem__, -1)
\ No newline at end of file
+        self.assertRaises(IndexError, m.__getitem__, -1)
+
+    def test_memory_bulk_load(self):
+        m = Memory(8)
+
+        m.load(2, b'\x01\x02\x03')
+
+        self.assertEqual([0, 0, 1, 2, 3, 0, 0, 0], [m[i] for i in range(0, 8)])
+
+    def test_memory_bulk_load_out_of_bounds(self):
+        m = Memory(8)
+
+        self.assertRaises(IndexError, m.load, 6, b'\x01\x02\x03')
+        self.assertEqual(0, m[6])
+
+    def test_memory_bulk_load_value_too_big(self):
+        m = Memory(8, cell_bit_size=4)
+
+        self.assertRaises(OverflowError, m.load, 0, [0x1, 0xFF])
+
+    def test_memory_bulk_load_negative_value(self):
+        m = Memory(8)
+
+        self.assertRaises(OverflowError, m.load, 0, [0x1, -1])
+        self.assertEqual(0, m[1])
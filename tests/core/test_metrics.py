@@ -0,0 +1,96 @@
+import unittest
+import json
+import os
+import tempfile
+import urllib.request
+from core import metrics
+from core.chip8 import Chip8
+from core.rom import Rom
+
+# 0x200: LD I, 0x000 (font "0")
+# 0x202: DRW V0, V0, 5
+# 0x204: JP 0x202
+DRAW_LOOP = bytes([0xA0, 0x00, 0xD0, 0x05, 0x12, 0x02])
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.registry = metrics.Registry()
+
+    def test_histogram(self):
+        histogram = metrics.Histogram([1, 5])
+
+        for value in [0.5, 1, 3, 10]:
+            histogram.observe(value)
+
+        self.assertEqual([(1, 2), (5, 3), (float('inf'), 4)], histogram.cumulative())
+        self.assertEqual(14.5, histogram.sum)
+
+    def test_prometheus_format(self):
+        counter = {'value': 3}
+        histogram = metrics.Histogram([0.5])
+        histogram.observe(0.25)
+
+        self.registry.counter('calls_total', "Calls", lambda: counter['value'], machine='a')
+        self.registry.histogram('work_seconds', "Work", histogram)
+
+        self.assertEqual(
+            "# HELP calls_total Calls\n"
+            "# TYPE calls_total counter\n"
+            'calls_total{machine="a"} 3\n'
+            "# HELP work_seconds Work\n"
+            "# TYPE work_seconds histogram\n"
+            'work_seconds_bucket{le="0.5"} 1\n'
+            'work_seconds_bucket{le="+Inf"} 1\n'
+            "work_seconds_sum 0.25\n"
+            "work_seconds_count 1\n",
+            self.registry.to_prometheus()
+        )
+
+        # Values are read on export
+        counter['value'] = 4
+        self.assertEqual(4, self.registry.to_json()['calls_total'][0]['value'])
+
+        self.registry.remove(machine='a')
+        self.assertEqual([], self.registry.to_json()['calls_total'])
+
+    def test_machine_counters(self):
+        machine = Chip8(compiled=False, headless=True)
+        machine.load_rom(Rom('draw loop', DRAW_LOOP))
+        machine.reset(0)
+        machine.register_metrics(self.registry, machine='0')
+
+        for _ in range(0, 3):
+            machine.frame()
+
+        values = {name: samples[0]['value'] for name, samples in self.registry.to_json().items()}
+
+        self.assertEqual(3, values['chip8_frames_total'])
+        self.assertEqual(30, values['chip8_instructions_total'])
+        self.assertEqual(15, values['chip8_draw_calls_total'])
+        # Every other draw erases the previous one
+        self.assertEqual(7, values['chip8_collisions_total'])
+        self.assertEqual(3, values['chip8_renders_total'])
+        self.assertGreater(values['chip8_memory_bytes'], 0x10000)
+
+    def test_file_exporter(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'metrics.json')
+            self.registry.gauge('up', "Up", lambda: 1)
+
+            exporter = metrics.FileExporter(self.registry, path, interval=60, format='json')
+            exporter.close()
+
+            with open(path) as f:
+                self.assertEqual([{'labels': {}, 'value': 1}], json.load(f)['up'])
+
+    def test_http_exporter(self):
+        self.registry.gauge('up', "Up", lambda: 1)
+        exporter = metrics.HttpExporter(self.registry, port=0)
+
+        try:
+            host, port = exporter.address
+
+            with urllib.request.urlopen(f"http://{host}:{port}/metrics") as response:
+                self.assertIn("up 1", response.read().decode())
+        finally:
+            exporter.close()
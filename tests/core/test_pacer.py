@@ -0,0 +1,72 @@
+import unittest
+from core.pacer import FramePacer
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+class TestFramePacer(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def pacer(self, **options):
+        return FramePacer(fps=100, clock=self.clock, sleep=self.clock.sleep, **options)
+
+    def run_frame(self, pacer, work):
+        pacer.start_frame()
+        self.clock.now += work
+        render = pacer.should_render()
+        pacer.end_frame()
+
+        return render
+
+    def test_sleeps_remainder(self):
+        pacer = self.pacer()
+
+        self.assertTrue(self.run_frame(pacer, 0.004))
+        self.assertTrue(self.run_frame(pacer, 0.002))
+
+        self.assertEqual(2, len(self.clock.slept))
+        self.assertAlmostEqual(0.006, self.clock.slept[0])
+        self.assertAlmostEqual(0.008, self.clock.slept[1])
+        self.assertAlmostEqual(0.02, self.clock.now)
+
+    def test_drops_renders_when_behind(self):
+        pacer = self.pacer(max_dropped=2)
+
+        renders = [self.run_frame(pacer, work) for work in [0.015, 0.015, 0.015, 0.015, 0.001, 0.001, 0.001]]
+
+        # Emulation ran every frame, renders resumed once caught up and never skipped more than 2 in a row
+        self.assertEqual(7, pacer.frames)
+        self.assertEqual([False, False, True, False, False, True, True], renders)
+        self.assertEqual(4, pacer.dropped)
+
+    def test_turbo(self):
+        pacer = self.pacer(turbo=True)
+
+        renders = [self.run_frame(pacer, 0.001) for _ in range(0, 25)]
+
+        self.assertEqual([], self.clock.slept)
+        self.assertEqual(3, renders.count(True))
+        self.assertTrue(renders[0])
+
+    def test_percentiles(self):
+        pacer = self.pacer()
+
+        for work in range(1, 101):
+            self.run_frame(pacer, work / 100000)
+
+        p = pacer.percentiles(50, 99)
+
+        self.assertAlmostEqual(0.5, p[50], delta=0.011)
+        self.assertAlmostEqual(0.99, p[99], delta=0.011)
+        self.assertAlmostEqual(100, pacer.fps_average(), places=0)
+        self.assertIn("fps", pacer.report())
@@ -0,0 +1,93 @@
+import unittest
+import os
+import tempfile
+from core import compiler
+from core.chip8 import Chip8
+from core.pool import MachinePool
+from core.rom import Rom
+
+# 0x200: LD I, 0x20A
+# 0x202: LD V0, 0x71      patches 0x20A with ADD V1, 0x05 (0x7105)
+# 0x204: LD V1, 0x05
+# 0x206: LD [I], V1
+# 0x208: RND V2, 0xFF
+# 0x20A: LD V1, 0x01      overwritten before it runs
+# 0x20C: DRW V2, V2, 5
+# 0x20E: JP 0x20E
+SELF_MODIFYING = bytes([
+    0xA2, 0x0A,
+    0x60, 0x71,
+    0x61, 0x05,
+    0xF1, 0x55,
+    0xC2, 0xFF,
+    0x61, 0x01,
+    0xD2, 0x25,
+    0x12, 0x0E,
+])
+
+class TestMachinePool(unittest.TestCase):
+    def setUp(self):
+        self.rom = Rom('self modifying', SELF_MODIFYING)
+
+    def run_episode(self, machine, frames=2):
+        for _ in range(0, frames):
+            machine.frame()
+
+        return machine.display.digest(), [machine.memory[a] for a in range(0x200, 0x210)], machine.cpu.snapshot()
+
+    def test_reset_restores_power_on_state(self):
+        machine = Chip8(compiled=False, headless=True)
+        machine.load_rom(self.rom)
+        machine.reset(1)
+
+        first = self.run_episode(machine)
+
+        machine.display.select_planes(3)
+        machine.display.set_resolution(128, 64)
+        machine.reset(1)
+
+        self.assertEqual((64, 32), (machine.display.width, machine.display.height))
+        self.assertEqual([0], machine.display.selected_planes)
+        self.assertEqual(list(SELF_MODIFYING), [machine.memory[a] for a in range(0x200, 0x210)])
+        self.assertEqual(first, self.run_episode(machine))
+
+    def test_pool_reuses_machines(self):
+        pool = MachinePool(self.rom, size=2, compiled=False)
+
+        with pool.machine(seed=1) as machine:
+            first = self.run_episode(machine)
+
+        self.assertEqual(2, len(pool))
+
+        machines = [pool.acquire(seed=1) for _ in range(0, 3)]
+
+        self.assertEqual(3, pool.created)
+        self.assertIn(machine, machines)
+        self.assertEqual(0, len(pool))
+
+        for m in machines:
+            self.assertEqual(first, self.run_episode(m))
+            pool.release(m)
+
+        self.assertEqual(3, len(pool))
+
+    def test_compiled_blocks_restored_on_reset(self):
+        pool = MachinePool(self.rom, size=1, compiled=False)
+        interpreted = self.run_episode(pool.acquire(seed=4))
+
+        with tempfile.TemporaryDirectory() as cache:
+            os.environ['CHIP8_CACHE_DIR'] = cache
+
+            try:
+                compiler.compile_rom(self.rom)
+
+                machine = Chip8(compiled=True, headless=True)
+                machine.load_rom(self.rom)
+            finally:
+                del os.environ['CHIP8_CACHE_DIR']
+
+        self.assertIsNotNone(machine._executor)
+
+        for _ in range(0, 2):
+            machine.reset(4)
+            self.assertEqual(interpreted, self.run_episode(machine))
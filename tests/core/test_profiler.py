@@ -0,0 +1,64 @@
+import unittest
+from core.chip8 import Chip8
+from core.profiler import Profiler
+from core.rom import Rom
+
+# 0x200: CALL 0x208
+# 0x202: CALL 0x20C
+# 0x204: JP 0x204
+# 0x206: (padding)
+# 0x208: CALL 0x20C
+# 0x20A: RET
+# 0x20C: ADD V0, 0x01
+# 0x20E: RET
+ROM = bytes([
+    0x22, 0x08,
+    0x22, 0x0C,
+    0x12, 0x04,
+    0x00, 0x00,
+    0x22, 0x0C,
+    0x00, 0xEE,
+    0x70, 0x01,
+    0x00, 0xEE,
+])
+
+class TestProfiler(unittest.TestCase):
+    def run_profiler(self, profiler):
+        machine = Chip8(headless=True, cycles_per_frame=10)
+        machine.record_profile(profiler)
+        machine.load_rom(Rom('profile', ROM))
+        machine.reset(0)
+        machine.frame()
+
+        return machine
+
+    def test_collapsed_stacks(self):
+        profiler = Profiler()
+        self.run_profiler(profiler)
+
+        self.assertEqual(
+            "start 4\nstart;sub_208 2\nstart;sub_208;sub_20C 2\nstart;sub_20C 2\n",
+            profiler.collapsed()
+        )
+
+    def test_routines(self):
+        profiler = Profiler()
+        machine = self.run_profiler(profiler)
+
+        routines = profiler.routines()
+
+        self.assertEqual((4, 4, 2), routines[0x20C])
+        self.assertEqual((2, 4, 1), routines[0x208])
+        self.assertEqual((4, 10, 0), routines[0x200])
+        self.assertIsNone(machine._executor)
+        self.assertIn("sub_20C", profiler.report())
+
+    def test_addresses(self):
+        profiler = Profiler(addresses=True)
+        self.run_profiler(profiler)
+
+        self.assertIn("start;sub_20C;0x20C 1", profiler.collapsed())
+        self.assertIn("start;0x204 2", profiler.collapsed({0x200: 'start'}))
+
+if __name__ == '__main__':
+    unittest.main()
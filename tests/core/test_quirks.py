@@ -0,0 +1,103 @@
+import unittest
+from core.cpu import Cpu
+from core.memory import Memory
+from core import quirks
+
+class TestQuirks(unittest.TestCase):
+    def cpu(self, profile):
+        return Cpu(Memory(0x1000), None, delay_timer=None, sound_timer=None, quirks=profile)
+
+    def run_instruction(self, cpu, instruction):
+        opcode, operands = cpu._decode(instruction)
+        cpu._execute(opcode, operands)
+
+        return opcode
+
+    def test_get(self):
+        self.assertIs(quirks.COSMAC_VIP, quirks.get('cosmac-vip'))
+        self.assertIs(quirks.CHIP_48, quirks.get(quirks.CHIP_48))
+
+        with self.assertRaises(ValueError):
+            quirks.get('chip-9')
+
+        with self.assertRaises(ValueError):
+            quirks.Quirks('broken', load_store='decrement')
+
+    def test_tables_bound_once(self):
+        modern = self.cpu('modern')
+        vip = self.cpu('cosmac-vip')
+
+        self.assertEqual('_right_shift', modern._decode(0x8016)[0].__name__)
+        self.assertEqual('_right_shift_vy', vip._decode(0x8016)[0].__name__)
+        self.assertEqual('_bitwise_or_reset_vf', vip._decode(0x8011)[0].__name__)
+        self.assertEqual('_jump_to_address_plus_vx', self.cpu('chip-48')._decode(0xB123)[0].__name__)
+        self.assertEqual('_load_regs_keep_i', self.cpu('super-chip')._decode(0xF165)[0].__name__)
+
+        # Tables are per instance
+        self.assertEqual('_right_shift', self.cpu('modern')._decode(0x8016)[0].__name__)
+
+    def test_shift(self):
+        for profile, expected in [('modern', 0x02), ('chip-48', 0x02), ('super-chip', 0x02), ('cosmac-vip', 0x08)]:
+            cpu = self.cpu(profile)
+            cpu._v[0x0].set(0x04)
+            cpu._v[0x1].set(0x11)
+
+            self.run_instruction(cpu, 0x8016)
+
+            self.assertEqual(expected, cpu._v[0x0].get(), profile)
+            self.assertEqual(0x11, cpu._v[0x1].get(), profile)
+            self.assertEqual(0 if expected == 0x02 else 1, cpu._v[0xF].get(), profile)
+
+        cpu = self.cpu('cosmac-vip')
+        cpu._v[0x1].set(0x81)
+
+        self.run_instruction(cpu, 0x801E)
+
+        self.assertEqual(0x02, cpu._v[0x0].get())
+        self.assertEqual(1, cpu._v[0xF].get())
+
+    def test_vf_reset(self):
+        for profile, expected in [('modern', 1), ('cosmac-vip', 0)]:
+            cpu = self.cpu(profile)
+            cpu._v[0xF].set(1)
+            cpu._v[0x0].set(0x0C)
+            cpu._v[0x1].set(0x0A)
+
+            self.run_instruction(cpu, 0x8012)
+
+            self.assertEqual(0x08, cpu._v[0x0].get())
+            self.assertEqual(expected, cpu._v[0xF].get(), profile)
+
+    def test_jump(self):
+        for profile, expected in [('modern', 0x320), ('chip-48', 0x330)]:
+            cpu = self.cpu(profile)
+            cpu._v[0x0].set(0x20)
+            cpu._v[0x3].set(0x30)
+
+            self.run_instruction(cpu, 0xB300)
+
+            self.assertEqual(expected, cpu._pc, profile)
+
+    def test_load_store(self):
+        profiles = [
+            ('modern', 0x303, 0x302), ('cosmac-vip', 0x303, 0x302), ('chip-48', 0x302, 0x301), ('super-chip', 0x300, 0x300)
+        ]
+
+        for profile, after_store, after_load in profiles:
+            cpu = self.cpu(profile)
+            cpu._i.set(0x300)
+
+            for reg in range(0, 3):
+                cpu._v[reg].set(reg + 1)
+
+            self.run_instruction(cpu, 0xF255)
+
+            self.assertEqual(after_store, cpu._i.get(), profile)
+            self.assertEqual([1, 2, 3], [cpu._memory[0x300 + i] for i in range(0, 3)])
+
+            cpu._i.set(0x300)
+            cpu._v[0x0].set(0)
+            self.run_instruction(cpu, 0xF165)
+
+            self.assertEqual(after_load, cpu._i.get(), profile)
+            self.assertEqual(1, cpu._v[0x0].get())
@@ -0,0 +1,161 @@
+import unittest
+import os
+import struct
+import tempfile
+from core.chip8 import Chip8
+from core.framebuffer import FrameBuffer
+from core.recorder import Recorder
+from core.rom import Rom
+
+def read_gif(path):
+    """
+    Delays and LZW data of the frames of a GIF written by GifWriter.
+    """
+
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    assert data[:6] == b'GIF89a'
+    width, height = struct.unpack_from('<HH', data, 6)
+
+    i = 13 + 6  # Logical Screen Descriptor + 2-entry color table
+    frames = []
+    delay = None
+
+    def sub_blocks(i):
+        payload = b''
+        while data[i]:
+            payload += data[i + 1:i + 1 + data[i]]
+            i += 1 + data[i]
+        return payload, i + 1
+
+    while data[i] != 0x3B:
+        if data[i] == 0x21:
+            if data[i + 1] == 0xF9:
+                delay = struct.unpack_from('<H', data, i + 4)[0]
+            _, i = sub_blocks(i + 2)
+        elif data[i] == 0x2C:
+            min_code_size = data[i + 10]
+            payload, i = sub_blocks(i + 11)
+            frames.append((delay, lzw_decode(payload, min_code_size)))
+        else:
+            raise ValueError(f"Unexpected block 0x{data[i]:x}")
+
+    return width, height, frames
+
+def lzw_decode(data, min_code_size):
+    clear = 1 << min_code_size
+    end = clear + 1
+    value = int.from_bytes(data, 'little')
+    position = 0
+    out = bytearray()
+
+    table = None
+    previous = None
+    code_size = min_code_size + 1
+
+    while True:
+        code = (value >> position) & ((1 << code_size) - 1)
+        position += code_size
+
+        if code == clear:
+            table = [bytes([i]) for i in range(clear)] + [b'', b'']
+            previous = None
+            code_size = min_code_size + 1
+            continue
+        if code == end:
+            return bytes(out)
+
+        if code < len(table):
+            entry = table[code]
+            if previous is not None:
+                table.append(previous + entry[:1])
+        else:
+            entry = previous + previous[:1]
+            table.append(entry)
+
+        out += entry
+        previous = entry
+
+        if len(table) == 1 << code_size and code_size < 12:
+            code_size += 1
+
+class TestRecorder(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'run.gif')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_duplicate_frames_are_held(self):
+        fb = FrameBuffer(64, 32)
+        recorder = Recorder(self.path, scale=1)
+        recorder.attach(fb)
+
+        for _ in range(0, 6):
+            fb.render()
+
+        fb.draw(0, 0, [0x80])
+
+        for _ in range(0, 3):
+            fb.render()
+
+        recorder.close()
+
+        width, height, frames = read_gif(self.path)
+
+        self.assertEqual((64, 32), (width, height))
+        self.assertEqual([10, 5], [delay for delay, _ in frames])
+
+        pixels = frames[1][1]
+        self.assertEqual(64 * 32, len(pixels))
+        self.assertEqual(1, pixels[0])
+        self.assertEqual(1, sum(pixels))
+
+    def test_frames_held_across_skipped_renders(self):
+        machine = Chip8(compiled=False, headless=True)
+        machine.load_rom(Rom('loop', bytes([0x12, 0x00])))
+        machine.reset(0)
+
+        recorder = Recorder(self.path, scale=1)
+        recorder.attach(machine.display, machine)
+
+        # 6 frames, the pacer only rendering the first 2, then 3 frames rendering only the first
+        for render in (True, True, False, False, False, False):
+            machine.frame(render)
+
+        machine.display.draw(0, 0, [0x80])
+
+        for render in (True, False, False):
+            machine.frame(render)
+
+        recorder.close()
+
+        self.assertEqual([10, 5], [delay for delay, _ in read_gif(self.path)[2]])
+
+    def test_scaled_frames(self):
+        fb = FrameBuffer(64, 32)
+        fb.draw(0, 0, [0xAA] * 32)
+
+        recorder = Recorder(self.path, scale=2)
+        recorder.attach(fb)
+        fb.render()
+        recorder.close()
+
+        width, height, frames = read_gif(self.path)
+        pixels = frames[0][1]
+
+        self.assertEqual((128, 64), (width, height))
+        self.assertEqual(bytes([1, 1, 0, 0] * 4 + [0] * 112), pixels[:128])
+        self.assertEqual(pixels[:128], pixels[128:256])
+
+    def test_detached_on_close(self):
+        fb = FrameBuffer(64, 32)
+        recorder = Recorder(self.path)
+        recorder.attach(fb)
+        recorder.close()
+
+        fb.render()
+
+        self.assertEqual([], read_gif(self.path)[2])
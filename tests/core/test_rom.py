@@ -0,0 +1,61 @@
+import unittest
+import hashlib
+import os
+import tempfile
+from core.exceptions import RomTooLargeError
+from core.memory import Memory
+from core.rom import Rom, RomLibrary
+
+class TestRom(unittest.TestCase):
+    def test_rom_hash(self):
+        rom = Rom('test', b'\x00\xE0\x12\x00')
+
+        self.assertEqual(hashlib.sha1(b'\x00\xE0\x12\x00').hexdigest(), rom.hash)
+
+    def test_rom_load_into_memory(self):
+        m = Memory(0x1000)
+        rom = Rom('test', b'\x00\xE0\x12\x00')
+
+        rom.load_into(m, 0x200)
+
+        self.assertEqual([0x00, 0xE0, 0x12, 0x00], [m[0x200 + i] for i in range(0, 4)])
+
+    def test_rom_too_large(self):
+        m = Memory(0x1000)
+
+        Rom('fits', bytes(0xE00)).load_into(m, 0x200)
+        self.assertRaises(RomTooLargeError, Rom('too large', bytes(0xE01)).load_into, m, 0x200)
+
+class TestRomLibrary(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.files = []
+
+        for name, data in [('a.ch8', b'\x12\x00'), ('b.ch8', b'\x60\x01\x70\x02'), ('empty.ch8', b'')]:
+            path = os.path.join(self.dir.name, name)
+
+            with open(path, 'wb') as f:
+                f.write(data)
+
+            self.files.append(path)
+
+        self.path = os.path.join(self.dir.name, 'library.c8rl')
+        RomLibrary.build(self.path, self.files)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_library_roundtrip(self):
+        with RomLibrary(self.path) as library:
+            self.assertEqual(['a.ch8', 'b.ch8', 'empty.ch8'], library.names())
+            self.assertEqual(3, len(library))
+
+            for path in self.files:
+                expected = Rom.from_file(path)
+                rom = library[expected.name]
+
+                self.assertEqual(expected.data, rom.data)
+                self.assertEqual(expected.hash, rom.hash)
+
+    def test_library_rejects_other_files(self):
+        self.assertRaises(ValueError, RomLibrary, self.files[1])
@@ -0,0 +1,33 @@
+import unittest
+from core.framebuffer import FrameBuffer
+from core.sharedframe import FrameReader
+
+class TestSharedFrame(unittest.TestCase):
+    def setUp(self):
+        self.fb = FrameBuffer(64, 32)
+        self.publisher = self.fb.publish()
+        self.reader = FrameReader(self.publisher.name)
+
+    def tearDown(self):
+        self.reader.close()
+        self.publisher.close()
+
+    def test_no_frame_before_first_render(self):
+        self.assertIsNone(self.reader.read())
+
+    def test_frames_published_on_render(self):
+        self.fb.draw(0, 0, [0xFF])
+        self.fb.render()
+
+        frame, width, height, data = self.reader.read()
+
+        self.assertEqual((1, 64, 32), (frame, width, height))
+        self.assertEqual(self.fb.to_bytes(), data)
+
+        self.fb.clear()
+        self.fb.render()
+
+        self.assertEqual((2, bytes(256)), self.reader.wait(1, timeout=1)[::3])
+
+    def test_wait_timeout(self):
+        self.assertIsNone(self.reader.wait(0, timeout=0.01))
@@ -0,0 +1,71 @@
+import unittest
+from core.sound import Sound, RecordingSink, AudioPattern
+from core.timer import Timer
+
+class TestSound(unittest.TestCase):
+    def setUp(self):
+        self.timer = Timer(freq=60)
+        self.sink = RecordingSink()
+        self.sound = Sound(self.timer, sink=self.sink)
+
+    def test_no_beep_when_timer_is_zero(self):
+        for _ in range(0, 5):
+            self.sound.play()
+
+        self.assertEqual([], self.sink.timeline)
+
+    def test_sink_driven_by_transitions_only(self):
+        self.sound.play()           # frame 0: silent
+
+        self.timer._countdown = 3
+        self.sound.play()           # frame 1: start
+        self.sound.play()           # frame 2: still playing, no event
+
+        self.timer._countdown = 0
+        self.sound.play()           # frame 3: stop
+        self.sound.play()           # frame 4: silent
+
+        self.assertEqual([[1, 3]], self.sink.timeline)
+
+    def test_beep_still_playing(self):
+        self.timer._countdown = 1
+        self.sound.play()
+
+        self.assertEqual([[0, None]], self.sink.timeline)
+
+    def test_samples_loop_seamlessly(self):
+        samples = Sound.build_samples(rate=44100)
+
+        self.assertEqual(2205, len(samples))
+        self.assertEqual(0, samples[0])
+        # Wrapping around from the last sample continues the sine wave
+        self.assertEqual(-samples[1], samples[-1])
+
+    def test_audio_pattern_samples(self):
+        audio = AudioPattern()
+        audio.load([0xFF] * 8 + [0x00] * 8)
+
+        self.assertEqual(4000, audio.rate)
+
+        samples = audio.build_samples(rate=8000)
+
+        # 128 samples at 4000 Hz played at 8000 Hz: every sample twice
+        self.assertEqual(256, len(samples))
+        self.assertEqual([Sound.AMPLITUDE] * 128 + [-Sound.AMPLITUDE] * 128, samples.tolist())
+
+        audio.set_pitch(112)
+        self.assertEqual(8000, audio.rate)
+        self.assertEqual(128, len(audio.build_samples(rate=8000)))
+
+    def test_pattern_change_restarts_sound(self):
+        audio = AudioPattern()
+        sound = Sound(self.timer, sink=self.sink, audio=audio)
+
+        self.timer._countdown = 5
+        sound.play()                # frame 0: start
+        sound.play()                # frame 1: no event
+
+        audio.set_pitch(80)
+        sound.play()                # frame 2: restart with the new pitch
+
+        self.assertEqual([[0, 2], [2, None]], self.sink.timeline)
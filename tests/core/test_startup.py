@@ -0,0 +1,27 @@
+import unittest
+import os
+import subprocess
+import sys
+from core import startup
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+ROM_PATH = os.path.join(ROOT, 'roms', 'test01.ch8')
+
+class TestStartup(unittest.TestCase):
+    def test_headless_imports_no_backend(self):
+        code = (
+            "import sys; from core.chip8 import Chip8; Chip8(headless=True); "
+            "print(sorted(m for m in ('pygame', 'numpy', 'asyncio', 'http.server') if m in sys.modules))"
+        )
+        output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True, stdout=subprocess.PIPE).stdout
+
+        self.assertEqual("[]", output.decode().strip())
+
+    def test_measure_headless(self):
+        times = startup.report(startup.measure(ROM_PATH, headless=True, runs=1))
+
+        self.assertEqual(list(startup.MILESTONES), list(times))
+        self.assertTrue(0 < times['import'] <= times['machine'] <= times['first_instruction'] <= times['first_frame'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+import os
+from core.chip8 import Chip8
+from core.memory import Memory
+from core.register import Register
+from core.statehash import StateHash, TranspositionTable
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+ROM_PATH = os.path.join(ROOT, 'roms', 'test01.ch8')
+
+class TestStateHash(unittest.TestCase):
+    def setUp(self):
+        self.machine = Chip8(compiled=False, headless=True)
+        self.machine.load(ROM_PATH)
+        self.machine.reset(0)
+
+        self.state = StateHash(self.machine)
+
+    def tearDown(self):
+        self.state.detach()
+
+    def test_incremental_matches_full(self):
+        for _ in range(0, 30):
+            self.machine.frame()
+            self.assertEqual(self.state.full(), self.state.digest())
+
+    def test_reset_returns_to_same_hash(self):
+        start = self.state.digest()
+
+        for _ in range(0, 10):
+            self.machine.frame()
+
+        self.assertNotEqual(start, self.state.digest())
+
+        self.machine.reset(0)
+
+        self.assertEqual(start, self.state.digest())
+        self.assertEqual(self.state.full(), self.state.digest())
+
+    def test_undo_write_restores_hash(self):
+        memory = self.machine.memory
+        start = self.state.digest()
+
+        memory[0x800] = 0x12
+        self.assertNotEqual(start, self.state.digest())
+
+        memory[0x800] = 0x00
+        self.assertEqual(start, self.state.digest())
+
+        self.machine.cpu._v[3].set(7)
+        self.machine.cpu._v[3].set(0)
+        self.assertEqual(start, self.state.digest())
+
+    def test_detach(self):
+        self.state.detach()
+
+        self.assertIs(Memory, type(self.machine.memory))
+        self.assertIs(Register, type(self.machine.cpu._v[0]))
+
+class TestTranspositionTable(unittest.TestCase):
+    def test_seen(self):
+        table = TranspositionTable()
+
+        self.assertFalse(table.seen(1))
+        self.assertTrue(table.seen(1))
+        self.assertEqual((1, 1), (table.hits, table.misses))
+
+    def test_lru_eviction(self):
+        table = TranspositionTable(capacity=2)
+
+        table.put(1, 'a')
+        table.put(2, 'b')
+        table.get(1)
+        table.put(3, 'c')
+
+        self.assertIn(1, table)
+        self.assertNotIn(2, table)
+        self.assertEqual(2, len(table))
+
+    def test_age_eviction(self):
+        table = TranspositionTable()
+
+        table.put(1)
+        table.new_generation()
+        table.put(2)
+        table.new_generation()
+        table.seen(1)
+        table.new_generation()
+
+        self.assertEqual(1, table.evict_older_than(1))
+        self.assertEqual([1], [key for key in (1, 2) if key in table])
@@ -0,0 +1,181 @@
+import unittest
+import asyncio
+import os
+import socket
+import struct
+from core.framebuffer import FrameBuffer
+from core.keypad import Keypad
+from core.stream import (
+    StreamServer, FrameDecoder, rle_encode, rle_decode, encode, LENGTH, KEY_EVENT, HEADER, KEYFRAME, DELTA
+)
+
+def frame(number, data, width=64, height=32):
+    return (number, width, height, bytes(data))
+
+class TestEncoding(unittest.TestCase):
+    def test_rle_round_trip(self):
+        for data in [b'', bytes(256), b'\x01\x00\x02', os.urandom(300), bytes(200) + b'\xff' * 3 + bytes(1)]:
+            self.assertEqual(data, rle_decode(rle_encode(data)))
+
+    def test_unchanged_frame_is_tiny(self):
+        self.assertEqual(2, len(rle_encode(bytes(256))))
+
+    def test_delta(self):
+        first = bytearray(256)
+        first[10] = 0xF0
+        second = bytearray(first)
+        second[100] = 0x18
+
+        key = encode(frame(1, first))
+        delta = encode(frame(2, second), frame(1, first))
+
+        self.assertEqual(KEYFRAME, key[0])
+        self.assertEqual(DELTA, delta[0])
+        self.assertLess(len(delta), HEADER.size + 8)
+        self.assertIsNone(encode(frame(3, second), frame(2, second)))
+
+        decoder = FrameDecoder()
+        decoder.decode(key)
+
+        self.assertEqual(frame(2, second), decoder.decode(delta))
+
+    def test_resolution_change_sends_keyframe(self):
+        message = encode(frame(2, bytes(1024), 128, 64), frame(1, bytes(256)))
+
+        self.assertEqual(KEYFRAME, message[0])
+
+class TestStreamServer(unittest.TestCase):
+    def setUp(self):
+        self.keypad = Keypad()
+        self.server = StreamServer(self.keypad)
+
+    def run_client(self, client):
+        async def run():
+            port, websocket_port = await self.server.start(port=0, websocket_port=0)
+
+            try:
+                return await asyncio.wait_for(client(port, websocket_port), 5)
+            finally:
+                await self.server.stop()
+
+        return asyncio.run(run())
+
+    async def read_message(self, reader):
+        length = LENGTH.unpack(await reader.readexactly(LENGTH.size))[0]
+
+        return await reader.readexactly(length)
+
+    async def wait_for_clients(self, count):
+        while self.server.clients < count:
+            await asyncio.sleep(0.001)
+
+    def test_tcp_stream_and_keys(self):
+        async def client(port, _):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            await self.wait_for_clients(1)
+
+            decoder = FrameDecoder()
+            display = FrameBuffer(64, 32)
+
+            display.draw(0, 0, [0xFF])
+            self.server.publish((1, 64, 32, display.to_bytes()))
+            first = decoder.decode(await self.read_message(reader))
+
+            display.draw(8, 4, [0x81])
+            self.server.publish((2, 64, 32, display.to_bytes()))
+            message = await self.read_message(reader)
+            second = decoder.decode(message)
+
+            writer.write(KEY_EVENT.pack(1, 0xC))
+            await writer.drain()
+
+            while not self.keypad.is_pressed(0xC):
+                await asyncio.sleep(0.001)
+
+            writer.close()
+
+            return first, message, second, display.to_bytes()
+
+        first, message, second, expected = self.run_client(client)
+
+        self.assertEqual(0xFF, first[3][0])
+        self.assertEqual(DELTA, message[0])
+        self.assertEqual(expected, second[3])
+
+    def test_slow_client_gets_latest_frame(self):
+        async def client(port, _):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            await self.wait_for_clients(1)
+
+            # Published without yielding: the sender only ever sees the last one
+            for number in range(1, 11):
+                self.server.publish((number, 64, 32, bytes([number]) + bytes(255)))
+
+            message = await self.read_message(reader)
+            writer.close()
+
+            return message
+
+        message = self.run_client(client)
+
+        self.assertEqual(10, HEADER.unpack_from(message)[1])
+        self.assertEqual(1, self.server.frames_sent)
+        self.assertEqual(10, self.server.frames_published)
+
+    def test_websocket(self):
+        async def client(_, websocket_port):
+            reader, writer = await asyncio.open_connection('127.0.0.1', websocket_port)
+            writer.write(
+                b"GET / HTTP/1.1\r\nHost: localhost\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                b"Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\nSec-WebSocket-Version: 13\r\n\r\n"
+            )
+            response = await reader.readuntil(b'\r\n\r\n')
+            await self.wait_for_clients(1)
+
+            self.server.publish(frame(1, b'\x42' + bytes(255)))
+
+            first, length = await reader.readexactly(2)
+            message = await reader.readexactly(length)
+
+            # Masked key event
+            mask = b'\x01\x02\x03\x04'
+            payload = bytes(b ^ mask[i] for i, b in enumerate(KEY_EVENT.pack(1, 0x3)))
+            writer.write(struct.pack('!BB', 0x82, 0x80 | len(payload)) + mask + payload)
+            await writer.drain()
+
+            while not self.keypad.is_pressed(0x3):
+                await asyncio.sleep(0.001)
+
+            writer.close()
+
+            return response, first, message
+
+        response, first, message = self.run_client(client)
+
+        self.assertIn(b"s3pPLMBiTxaQ9kYGzzhZRbK+xOo=", response)
+        self.assertEqual(0x82, first)
+        self.assertEqual(0x42, FrameDecoder().decode(message)[3][0])
+
+    def test_thread_on_free_port(self):
+        port, = self.server.start_thread(port=0)
+
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=5):
+                pass
+        finally:
+            self.server.close()
+
+        self.assertNotEqual(0, port)
+
+    def test_thread_start_error(self):
+        with socket.socket() as taken:
+            taken.bind(('127.0.0.1', 0))
+            taken.listen()
+
+            with self.assertRaises(OSError):
+                self.server.start_thread(port=taken.getsockname()[1])
+
+        self.server.close()
+
+if __name__ == '__main__':
+    unittest.main()
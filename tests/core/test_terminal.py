@@ -0,0 +1,101 @@
+import unittest
+import io
+import os
+from core.keypad import Keypad
+from core.terminal import TerminalDisplay, TerminalKeys
+
+class TestTerminalDisplay(unittest.TestCase):
+    def setUp(self):
+        self.stream = io.StringIO()
+
+    def display(self, mode='braille'):
+        return TerminalDisplay(64, 32, 128, 64, mode=mode, stream=self.stream)
+
+    def test_braille_cells(self):
+        display = self.display()
+        display.draw(0, 0, [0x80, 0x40, 0x00, 0xC0])
+
+        output = display.render_ansi()
+
+        self.assertTrue(output.startswith('\x1b[?25l\x1b[2J\x1b[1;1H'))
+        # (0,0) dot 1, (1,1) dot 5, (0,3) and (1,3) dots 7 and 8
+        self.assertIn(chr(0x2800 + 0x01 + 0x10 + 0x40 + 0x80), output)
+        self.assertEqual(8, output.count('\x1b[') - 2)
+
+    def test_half_blocks(self):
+        display = self.display('half')
+        display.draw(0, 0, [0xC0, 0x80])
+
+        output = display.render_ansi()
+
+        self.assertIn('█▀' + ' ' * 62, output)
+        self.assertEqual(16, output.count('H'))
+
+    def test_only_changed_cells_are_written(self):
+        display = self.display()
+        display.render_ansi()
+
+        self.assertEqual('', display.render_ansi())
+
+        display.draw(16, 9, [0x80])
+        display.draw(40, 9, [0x80])
+
+        output = display.render_ansi()
+
+        # Two runs on the third line of cells, each a single braille character
+        self.assertEqual(f'\x1b[3;9H{chr(0x2802)}\x1b[3;21H{chr(0x2802)}', output)
+
+        display.draw(50, 9, [0x80])
+        display.draw(56, 9, [0x80])
+
+        # A short gap is written through instead of moving the cursor
+        self.assertEqual(f'\x1b[3;26H{chr(0x2802)}⠀⠀{chr(0x2802)}', display.render_ansi())
+
+    def test_resolution_change_redraws(self):
+        display = self.display()
+        display.render_ansi()
+        display.set_resolution(128, 64)
+
+        output = display.render_ansi()
+
+        self.assertIn('\x1b[2J', output)
+        self.assertIn('\x1b[16;1H' + '⠀' * 64, output)
+
+    def test_render_writes_stream(self):
+        display = self.display()
+        display.render()
+        display.close()
+
+        self.assertTrue(self.stream.getvalue().endswith('\x1b[?25h\n'))
+        self.assertEqual(1, display.renders)
+        self.assertGreater(display.bytes_written, 0)
+
+class TestTerminalKeys(unittest.TestCase):
+    def test_poll(self):
+        master, slave = os.openpty()
+        keypad = Keypad()
+
+        try:
+            with os.fdopen(slave, 'rb', buffering=0) as stream:
+                keys = TerminalKeys(keypad, stream=stream, hold=2)
+
+                os.write(master, b'wv')
+
+                self.assertTrue(keys.poll())
+                self.assertEqual((1 << 0x5) | (1 << 0xF), keypad.get_state())
+
+                keys.poll()
+                keys.poll()
+
+                self.assertEqual(0, keypad.get_state())
+
+                os.write(master, b'\x1b')
+
+                self.assertFalse(keys.poll())
+
+                keys.close()
+        finally:
+            os.close(master)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,4 +3,22 @@ from core.timer import Timer
 from unittest.mock import Mock
 
 class TestTimer(unittest.TestCase):
-    pass
\ No newline at end of file
+    def test_step(self):
+        t = Timer(freq=60)
+        t.set(2)
+
+        t.step()
+        self.assertEqual(1, t.get())
+
+        t.step()
+        t.step()
+        self.assertEqual(0, t.get())
+
+    def test_underflows(self):
+        t = Timer(freq=60)
+        t.set(1)
+
+        t.step()
+        t.step()
+
+        self.assertEqual(1, t.underflows)